@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+python build_svod.py — Сборка Свода (лист "Отчет") без Excel и Power Query.
+
+Заменяет запросы "Массовые проблемы" (mass_problem.txt) и "Свод по заметкам" (pivot.txt):
+читает выгрузки, соединяет их и записывает лист "Отчет", который затем обрабатывает main.py.
+С --reasons-db колонки "Всего жалоб" и "Жалоб по региону" заполняются по разобранному отчету
+по причинам обращений.
+
+Пример:
+    python build_svod.py --notes massive_reports.accdb --massive massive_reports.accdb \\
+        --mass-problems mass_problems.xlsx --macro r_mr.xlsx --out svod.xlsx --reasons-db reasons.sqlite
+    python main.py svod.xlsx --pending-dates
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from loguru import logger
+
+from modules.mass_problems import load_mass_problems, MASS_PROBLEMS_SHEET
+from modules.svod_builder import read_table, build_svod, write_svod_sheet, NOTES_TABLE, MASSIVE_TABLE
+from modules.complaints import fill_complaints
+
+
+def parse_arguments():
+    """
+    Парсит аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Парсированные аргументы
+    """
+    parser = argparse.ArgumentParser(
+        description="Сборка Свода по заметкам (лист 'Отчет') из выгрузок"
+    )
+
+    parser.add_argument('--notes', required=True,
+                        help='"Свод по заметкам": CSV/XLSX или база Access')
+    parser.add_argument('--notes-table', default=NOTES_TABLE,
+                        help=f'Таблица/лист заметок (по умолчанию: {NOTES_TABLE})')
+    parser.add_argument('--massive', required=True,
+                        help='MassiveIncidents: CSV/XLSX или база Access')
+    parser.add_argument('--massive-table', default=MASSIVE_TABLE,
+                        help=f'Таблица/лист MassiveIncidents (по умолчанию: {MASSIVE_TABLE})')
+    parser.add_argument('--mass-problems', required=True,
+                        help='Выгрузка массовых проблем (xlsx)')
+    parser.add_argument('--mass-problems-sheet', default=MASS_PROBLEMS_SHEET,
+                        help=f'Лист выгрузки массовых проблем (по умолчанию: {MASS_PROBLEMS_SHEET})')
+    parser.add_argument('--macro', required=True,
+                        help='Справочник р_мр (колонки "регион", "мр"): CSV/XLSX')
+    parser.add_argument('--macro-table', default=None,
+                        help='Лист справочника р_мр (по умолчанию: первый)')
+    parser.add_argument('--out', required=True,
+                        help='Книга для записи листа "Отчет"')
+    parser.add_argument('--reasons-db', default=None,
+                        help='База разобранного отчета по причинам обращений (заполняет "Всего жалоб")')
+
+    return parser.parse_args()
+
+
+def main():
+    """Основная функция."""
+    args = parse_arguments()
+    logger.info("🚀 Сборка Свода по заметкам")
+
+    try:
+        notes = read_table(Path(args.notes), args.notes_table)
+        massive = read_table(Path(args.massive), args.massive_table)
+        macro = read_table(Path(args.macro), args.macro_table)
+        mass_problems = load_mass_problems(Path(args.mass_problems), args.mass_problems_sheet)
+
+        svod = build_svod(notes, mass_problems, massive, macro)
+        write_svod_sheet(svod, Path(args.out))
+
+        if args.reasons_db:
+            fill_complaints(Path(args.out), Path(args.reasons_db))
+    except Exception as e:
+        logger.error(f"❌ Не удалось собрать Свод: {e}")
+        return 1
+
+    logger.info("✅ Скрипт завершен успешно")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,12 @@ wfm_single.py — Рефакторированная версия скрипта
 - Сохраняет результаты в исходный файл в колонки "Потерянные" и "Полученные"
 - Создает эти колонки автоматически, если их нет
 
+ХРАНИЛИЩЕ РЕЗУЛЬТАТОВ (--results-db, по умолчанию results.sqlite):
+- Каждый результат сразу записывается в SQLite по ключу (Номер массовой, Дата, окно);
+  повторный запуск перезаписывает результат (upsert)
+- Рядом хранится детализация по 15-минутным интервалам отчета
+- CSV и запись в исходный файл строятся из хранилища одной пачкой в конце запуска
+
 Модульная структура:
 - modules/selenium_helpers.py - Настройка WebDriver и вспомогательные функции
 - modules/date_time_utils.py - Работа с датами и временными интервалами
@@ -31,6 +37,58 @@ wfm_single.py — Рефакторированная версия скрипта
 - modules/data_processing.py - Обработка данных и вычисления
 - modules/download_manager.py - Скачивание отчетов
 - modules/excel_manager.py - Работа с Excel файлами
+- modules/browser_session.py - Сессия браузера: сторож памяти и пересоздание WebDriver
+- modules/run_profile.py - Профиль запуска (runs/<run_id>/profile.json)
+- modules/task_planner.py - Планирование задач выгрузки (строка × окно)
+- modules/cdp_client.py - Асинхронный клиент Chrome DevTools Protocol
+- modules/multi_tab_executor.py - Параллельная выгрузка в нескольких вкладках
+- modules/results_store.py - Хранилище результатов (SQLite) и проекции в CSV/книгу
+- modules/task_executor.py - Выполнение списка задач с кэшем окон
+- modules/work_queue.py - Общая очередь задач (SQLite / в памяти), координатор и воркеры
+- modules/watch_service.py - Режим службы: слежение за папкой или файлом Свода
+- modules/dry_run.py - План запуска без браузера (--plan)
+
+СТОРОЖ ПАМЯТИ БРАУЗЕРА:
+- После каждой задачи измеряется RSS дерева процессов Chrome (psutil или /proc)
+- Браузер пересоздается (CDP настройки и навыки применяются заново) при превышении порогов:
+  --recycle-rss-mb 2048 --recycle-every 200 --recycle-error-rate 0.5 (0 - отключить порог)
+- Пересоздания и кривая памяти записываются в профиль запуска
+
+МНОГОВКЛАДОЧНЫЙ РЕЖИМ:
+   python main.py ваш_файл.xlsx --auto-date-processing --tabs 3
+- Один браузер, K вкладок заполняют формы одновременно (asyncio + CDP, нужен пакет websockets)
+- Каждая вкладка скачивает отчеты в свою папку downloads/tab_<N>
+- В этом режиме память браузера только записывается в профиль, пересоздание не выполняется
+
+МНОГОДАТНЫЙ РЕЖИМ (догон за неделю одним запуском):
+   python main.py ваш_файл.xlsx --date-from 01.09.2025 --date-to 07.09.2025
+   python main.py ваш_файл.xlsx --pending-dates
+- Задачи по всем датам строятся сразу (calculate_time_window_for_date для строки и даты)
+- Одинаковые окна выгружаются один раз за сессию
+- Результаты пишутся в исходный файл пачками (--save-every 20)
+
+ОБЩАЯ ОЧЕРЕДЬ (несколько машин на один запуск):
+   python main.py ваш_файл.xlsx --auto-date-processing --coordinator --queue-db \\\\share\\wfm_queue.sqlite
+   python main.py --worker --queue-db \\\\share\\wfm_queue.sqlite      (на каждой машине)
+- Координатор раскладывает строки в задачи, воркеры берут их в аренду (--lease-seconds)
+- Задачи умерших воркеров возвращаются в очередь по истечении аренды
+- Книгу (или CSV) пишет только координатор
+
+РЕЖИМ СЛУЖБЫ (слежение за Сводом):
+   python main.py --watch inbox --with-skills
+   python main.py --watch Свод.xlsx --watch-interval 10
+- Браузер и навыки настраиваются один раз и остаются готовыми к работе
+- При появлении/изменении файла обрабатываются только новые и измененные строки
+  (каждая строка считается за свою "ДатаБезВремени")
+- Результаты сохраняются в хранилище (--results-db) и пишутся в Свод одной пачкой
+- Отпечатки строк и результаты хранятся в runs/watch_state.json; остановка - Ctrl+C
+
+ПЛАН ЗАПУСКА (без браузера):
+   python main.py ваш_файл.xlsx --auto-date-processing --plan
+- Печатает задачи и источник каждого результата: кэш окна, сохраненные интервалы,
+  архив отчетов или выгрузка браузером
+- Оценивает длительность по средним фазам прошлых запусков (runs/*/profile.json)
+- Selenium и запись Excel при этом не загружаются, папки и хранилища не создаются
 """
 
 from __future__ import annotations
@@ -38,39 +96,316 @@ from __future__ import annotations
 import sys
 import argparse
 import yaml
+from datetime import date, datetime, timedelta
+from typing import List
 from pathlib import Path
 from loguru import logger
-from tqdm import tqdm
 
-# Импорты из наших модулей
-from modules.selenium_helpers import get_driver, setup_proxy, apply_cdp_download_settings
+# Импорты из наших модулей. Selenium и вкладки CDP загружаются лениво - только
+# когда запуск действительно открывает браузер (--help и --plan обходятся без них)
 from modules.data_processing import (
     process_excel_data,
-    validate_region_in_config,
-    calc_metrics,
-    create_result_record,
-    save_results_to_csv
+    create_result_record
 )
-from modules.date_time_utils import windows_for_row, prepare_datetime_for_report
-from modules.skills import setup_skills, prepare_skills_from_config, show_page_diagnostics
-from modules.download_manager import download_report
 from modules.excel_manager import (
     get_date_from_first_row,
     filter_problems_by_date,
-    calculate_time_window_for_date,
-    save_single_result_to_original_file
+    save_results_batch_to_original_file,
+    get_pending_dates
 )
 from modules.post_processor import post_process_excel_file
-from modules.cleanup_manager import cleanup_downloaded_files
+from modules.cleanup_manager import cleanup_downloaded_files, cleanup_report_archive
+from modules.report_archive import (
+    configure_report_archive,
+    get_report_archive,
+    DEFAULT_ARCHIVE_DIR,
+    DEFAULT_MAX_MB as DEFAULT_ARCHIVE_MAX_MB
+)
+from modules.browser_session import (
+    BrowserSession,
+    DEFAULT_MAX_RSS_MB,
+    DEFAULT_MAX_TASKS,
+    DEFAULT_MAX_ERROR_RATE
+)
+from modules.run_profile import RunProfile, load_phase_history
+from modules.phase_profiler import parse_profile_phases
+from modules.run_metrics import start_metrics_exporter, DEFAULT_METRICS_INTERVAL
+from modules.results_store import ResultsStore, DEFAULT_RESULTS_DB
+from modules.task_planner import build_tasks_for_date, build_tasks_for_all_windows, build_tasks_for_dates
+from modules.task_executor import run_tasks
+from modules.pipeline_executor import DEFAULT_PARSERS
+from modules.work_queue import SqliteWorkQueue, run_coordinator, run_worker, DEFAULT_LEASE_SECONDS
+from modules.watch_service import WatchService, DEFAULT_WATCH_INTERVAL
+from modules.dry_run import classify_tasks, print_plan
 
 # Константы
 BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_SAVE_EVERY = 20
+
+
+def run_watch_mode(args, cfg, skills_ids, headless: bool) -> None:
+    """
+    Режим службы: держит готовый браузер и обрабатывает Свод при его изменении.
+
+    Args:
+        args: Аргументы командной строки
+        cfg: Конфигурация из YAML
+        skills_ids: Навыки (или None)
+        headless: Запуск в headless режиме
+    """
+    profile = RunProfile()
+    if args.profile:
+        profile.enable_profiler(parse_profile_phases(args.profile))
+    exporter = start_metrics_exporter(profile, args.metrics_port, args.metrics_textfile, args.metrics_interval)
+    session = BrowserSession(
+        headless=headless,
+        skills_ids=skills_ids,
+        profile=profile,
+        max_rss_mb=args.recycle_rss_mb,
+        max_tasks=args.recycle_every,
+        max_error_rate=args.recycle_error_rate
+    )
+    try:
+        if not session.start():
+            logger.error("❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось настроить навыки!")
+            return
+        service = WatchService(session, profile, cfg, Path(args.watch), interval=args.watch_interval,
+                               store=ResultsStore(Path(args.results_db)), parsers=args.parsers)
+        service.run_forever()
+    finally:
+        session.close()
+        if exporter is not None:
+            exporter.stop()
+        try:
+            profile.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить профиль запуска: {e}")
+
+
+def run_worker_mode(args, cfg, skills_ids, headless: bool) -> None:
+    """
+    Режим воркера: берет задачи из общей очереди и выполняет их в своем браузере.
+
+    Args:
+        args: Аргументы командной строки
+        cfg: Конфигурация из YAML
+        skills_ids: Навыки (или None)
+        headless: Запуск в headless режиме
+    """
+    queue = SqliteWorkQueue(Path(args.queue_db), lease_seconds=args.lease_seconds)
+    profile = RunProfile()
+    if args.profile:
+        profile.enable_profiler(parse_profile_phases(args.profile))
+    exporter = start_metrics_exporter(profile, args.metrics_port, args.metrics_textfile, args.metrics_interval)
+    session = BrowserSession(
+        headless=headless,
+        skills_ids=skills_ids,
+        profile=profile,
+        max_rss_mb=args.recycle_rss_mb,
+        max_tasks=args.recycle_every,
+        max_error_rate=args.recycle_error_rate
+    )
+    try:
+        if not session.start():
+            logger.error("❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось настроить навыки!")
+            return
+        run_worker(queue, session, profile)
+    finally:
+        session.close()
+        if exporter is not None:
+            exporter.stop()
+        try:
+            profile.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить профиль запуска: {e}")
+        cleanup_downloaded_files()
+
+
+def run_coordinator_mode(args, tasks, input_xlsx_path: Path, out_csv_path: Path, write_workbook: bool) -> None:
+    """
+    Режим координатора: кладет задачи в общую очередь и один пишет результаты.
+
+    Args:
+        args: Аргументы командной строки
+        tasks: Задачи task_planner
+        input_xlsx_path: Исходный файл Свода
+        out_csv_path: CSV для стандартного режима
+        write_workbook: Писать результаты в исходный файл (режимы по датам) или в CSV
+    """
+    queue = SqliteWorkQueue(Path(args.queue_db), lease_seconds=args.lease_seconds)
+    store = ResultsStore(Path(args.results_db))
+    run_id = RunProfile().run_id
+    results = []
+
+    def on_results(batch):
+        done = [r for r in batch if r["error"] is None]
+        for record in batch:
+            if record["error"] is not None:
+                logger.error(f"❌ Задача не выполнена: {record['task']['mass_number']} - {record['error']}")
+        for r in done:
+            store.upsert(r["task"]["mass_number"], r["task"]["win_start"], r["task"]["win_end"],
+                         r["lost"], r["excess"], region=r["task"]["region"], run_id=run_id)
+        if write_workbook and done:
+            save_results_batch_to_original_file([{
+                "row_index": r["task"]["row_index"],
+                "mass_number": r["task"]["mass_number"],
+                "date": r["task"]["win_start"].date(),
+                "lost": r["lost"],
+                "excess": r["excess"],
+            } for r in done], input_xlsx_path)
+        results.extend(create_result_record(
+            r["task"]["mass_number"], r["task"]["win_start"].date().isoformat(), r["lost"], r["excess"]
+        ) for r in done)
+
+    counts = run_coordinator(queue, run_id, tasks, on_results)
+    logger.info(f"🎉 Запуск {run_id} завершен: готово {counts['done']}, ошибок {counts['failed']}")
+
+    if write_workbook:
+        if results:
+            try:
+                post_process_excel_file(input_xlsx_path)
+            except Exception as e:
+                logger.error(f"❌ Ошибка при постобработке данных: {e}")
+    else:
+        store.export_csv(out_csv_path, run_id=run_id)
+
+
+def build_run_tasks(df, cfg, use_multi_date: bool, use_auto_date_processing: bool,
+                    target_dates: List[date] = None) -> List[dict]:
+    """
+    Строит задачи выбранного режима (многодатный, по дате первой строки, стандартный).
+
+    Args:
+        df: Данные Свода
+        cfg: Конфигурация из YAML
+        use_multi_date: Многодатный режим
+        use_auto_date_processing: Режим --auto-date-processing
+        target_dates: Даты многодатного режима
+
+    Returns:
+        List[dict]: Задачи task_planner
+    """
+    if use_multi_date:
+        return build_tasks_for_dates(df, target_dates, cfg)
+    if use_auto_date_processing:
+        target_date = get_date_from_first_row(df)
+        return build_tasks_for_date(filter_problems_by_date(df, target_date), target_date, cfg)
+    return build_tasks_for_all_windows(df, cfg)
+
+
+def run_plan_mode(args, cfg, input_xlsx_path: Path) -> None:
+    """
+    Режим плана (--plan): задачи, ожидаемые попадания в кэш и оценка длительности без браузера.
+
+    Args:
+        args: Аргументы командной строки
+        cfg: Конфигурация из YAML
+        input_xlsx_path: Файл Свода
+    """
+    df = process_excel_data(input_xlsx_path)
+    use_multi_date = bool(args.date_from or args.pending_dates)
+    target_dates = resolve_target_dates(df, args) if use_multi_date else None
+    if use_multi_date and not target_dates:
+        print("Нет дат для обработки")
+        return
+    tasks = build_run_tasks(df, cfg, use_multi_date, args.auto_date_processing, target_dates)
+
+    # План ничего не создает: хранилище и архив читаются, только если они уже есть
+    results_db = Path(args.results_db)
+    store = ResultsStore(results_db) if results_db.exists() else None
+    archive = get_report_archive() if (DEFAULT_ARCHIVE_DIR / "index.sqlite").exists() else None
+
+    sources = classify_tasks(tasks, store=store, archive=archive)
+    print_plan(tasks, sources, load_phase_history(), tabs=args.tabs, parsers=args.parsers)
+
+
+def resolve_target_dates(df, args) -> List[date]:
+    """
+    Определяет даты многодатного режима: диапазон --date-from/--date-to или незаполненные даты.
+
+    Args:
+        df: Данные Свода
+        args: Аргументы командной строки
+
+    Returns:
+        List[date]: Даты для обработки
+    """
+    if args.pending_dates:
+        return get_pending_dates(df)
+
+    date_from = datetime.strptime(args.date_from, "%d.%m.%Y").date()
+    date_to = datetime.strptime(args.date_to, "%d.%m.%Y").date() if args.date_to else date_from
+    days = (date_to - date_from).days
+    return [date_from + timedelta(days=i) for i in range(days + 1)]
+
+
+def process_multiple_dates(session, profile, df, target_dates, cfg, input_xlsx_path: Path,
+                           tabs: int = 1, save_every: int = DEFAULT_SAVE_EVERY, store=None,
+                           parsers: int = DEFAULT_PARSERS) -> List[dict]:
+    """
+    Обрабатывает несколько дат за один запуск: общий список задач, кэш окон и пакетное сохранение.
+
+    Args:
+        session: Запущенная BrowserSession
+        profile: RunProfile
+        df: Данные Свода
+        target_dates: Даты для обработки
+        cfg: Конфигурация из YAML
+        input_xlsx_path: Исходный файл (результаты пишутся в него)
+        tabs: Количество вкладок
+        save_every: Размер пачки для сохранения
+        store: ResultsStore
+        parsers: Размер пула разбора отчетов (0 - без конвейера)
+
+    Returns:
+        List[dict]: Записи результатов (create_result_record)
+    """
+    with profile.phase("task_planner"):
+        tasks = build_tasks_for_dates(df, target_dates, cfg)
+    results = []
+    pending_saves = []
+
+    def flush():
+        if not pending_saves:
+            return
+        with profile.phase("save_results"):
+            save_results_batch_to_original_file(pending_saves, input_xlsx_path)
+        pending_saves.clear()
+
+    def on_result(record):
+        if record["error"] is not None:
+            return
+        task = record["task"]
+        pending_saves.append({
+            "row_index": task["row_index"],
+            "mass_number": task["mass_number"],
+            "date": task["win_start"].date(),
+            "lost": record["lost"],
+            "excess": record["excess"],
+        })
+        results.append(create_result_record(
+            task["mass_number"],
+            task["win_start"].date().isoformat(),
+            record["lost"],
+            record["excess"]
+        ))
+        if len(pending_saves) >= save_every:
+            flush()
+
+    try:
+        run_tasks(session, profile, tasks, on_result, tabs=tabs, store=store, parsers=parsers)
+    finally:
+        # Сохраняем накопленное даже при аварийном завершении
+        flush()
+
+    logger.info(f"🎉 Обработка завершена! Успешно {len(results)}/{len(tasks)} задач по {len(target_dates)} датам")
+    return results
 
 
 def main():
     """Основная функция."""
     parser = argparse.ArgumentParser(description="WFM script for extracting lost calls and excess traffic from Teleopti")
-    parser.add_argument("input_xlsx", help="Файл Power Query (Свод.xlsx)")
+    parser.add_argument("input_xlsx", nargs="?", help="Файл Power Query (Свод.xlsx)")
     parser.add_argument("--yaml-cfg", help="region_skills.yml", default=None)
     parser.add_argument("--out-csv", help="Файл вывода", default="wfm_metrics_daily.csv")
     parser.add_argument("--headless", help="Запуск в headless режиме", action="store_true", default=True)
@@ -79,13 +414,60 @@ def main():
     parser.add_argument("--auto-date-processing", help="Автоматически определять дату из первой строки и обрабатывать только строки с этой датой", action="store_true")
     parser.add_argument("--log-level", help="Уровень логирования (DEBUG, INFO, WARNING, ERROR)",
                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="ERROR")
+    parser.add_argument("--recycle-rss-mb", help="Пересоздавать браузер, если память его процессов превышает порог (МБ, 0 - выкл.)",
+                       type=float, default=DEFAULT_MAX_RSS_MB)
+    parser.add_argument("--recycle-every", help="Пересоздавать браузер каждые N задач (0 - выкл.)",
+                       type=int, default=DEFAULT_MAX_TASKS)
+    parser.add_argument("--recycle-error-rate", help="Пересоздавать браузер при доле ошибок в последних задачах не ниже порога (0 - выкл.)",
+                       type=float, default=DEFAULT_MAX_ERROR_RATE)
+    parser.add_argument("--tabs", help="Количество вкладок одного браузера для параллельной выгрузки (1 - последовательно)",
+                       type=int, default=1)
+    parser.add_argument("--parsers", help="Процессов разбора отчетов: браузер не ждет разбор и запись (0 - последовательно)",
+                       type=int, default=DEFAULT_PARSERS)
+    parser.add_argument("--watch", help="Режим службы: следить за папкой-инбоксом или файлом Свода", default=None)
+    parser.add_argument("--watch-interval", help="Период опроса в режиме службы (секунды)",
+                       type=float, default=DEFAULT_WATCH_INTERVAL)
+    parser.add_argument("--date-from", help="Обработать все даты начиная с DD.MM.YYYY (результаты в исходный файл)", default=None)
+    parser.add_argument("--date-to", help="Последняя дата диапазона DD.MM.YYYY (по умолчанию = --date-from)", default=None)
+    parser.add_argument("--pending-dates", help="Обработать все даты, где есть строки без результатов", action="store_true")
+    parser.add_argument("--save-every", help="Сохранять результаты в файл пачками по N строк (многодатный режим)",
+                       type=int, default=DEFAULT_SAVE_EVERY)
+    parser.add_argument("--results-db", help="Хранилище результатов SQLite (upsert, детализация по интервалам)",
+                       default=str(DEFAULT_RESULTS_DB))
+    parser.add_argument("--plan", help="Показать задачи, ожидаемые попадания в кэш и оценку длительности без запуска браузера",
+                       action="store_true")
+    parser.add_argument("--coordinator", help="Разложить задачи в общую очередь (--queue-db) и собрать результаты", action="store_true")
+    parser.add_argument("--worker", help="Выполнять задачи из общей очереди (--queue-db)", action="store_true")
+    parser.add_argument("--queue-db", help="Файл очереди SQLite (например, на общей сетевой папке)", default=None)
+    parser.add_argument("--lease-seconds", help="Длительность аренды задачи воркером (секунды)",
+                       type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--no-archive", help="Не брать отчеты из архива и не сохранять их туда", action="store_true")
+    parser.add_argument("--archive-max-mb", help="Предельный размер архива отчетов (МБ), старые вытесняются по LRU",
+                       type=float, default=DEFAULT_ARCHIVE_MAX_MB)
+    parser.add_argument("--metrics-port", help="Отдавать живые метрики запуска на http://127.0.0.1:PORT/metrics (0 - выкл.)",
+                       type=int, default=0)
+    parser.add_argument("--metrics-textfile", help="Файл метрик Prometheus (*.prom), перезаписывается каждые --metrics-interval секунд",
+                       default=None)
+    parser.add_argument("--metrics-interval", help="Период записи файла метрик (секунды)",
+                       type=float, default=DEFAULT_METRICS_INTERVAL)
+    parser.add_argument("--profile", help="Профилировать фазы (cProfile + сэмплы стеков) в runs/<run_id>/profiles: "
+                       "all или имена через запятую (process_excel_data,task_planner,calc_metrics,...)",
+                       nargs="?", const="all", default=None)
 
     args = parser.parse_args()
 
-    input_xlsx_path = Path(args.input_xlsx)
+    if not args.input_xlsx and not args.watch and not args.worker:
+        parser.error("укажите входной файл, --watch или --worker")
+    if (args.coordinator or args.worker) and not args.queue_db:
+        parser.error("для --coordinator/--worker нужен --queue-db")
+    if args.plan and (args.watch or args.worker or not args.input_xlsx):
+        parser.error("--plan работает только с входным файлом (без --watch и --worker)")
+
+    input_xlsx_path = Path(args.input_xlsx) if args.input_xlsx else None
     yaml_path = Path(args.yaml_cfg) if args.yaml_cfg else BASE_DIR / "region_skills.yml"
     out_csv_path = Path(args.out_csv)
     headless = args.headless and not args.no_headless
+    configure_report_archive(enabled=not args.no_archive, max_mb=args.archive_max_mb)
 
     # Настраиваем логирование
     logger.remove()  # Удаляем стандартный обработчик
@@ -96,27 +478,61 @@ def main():
         colorize=True
     )
 
-    # Настраиваем прокси
-    setup_proxy()
+    if args.profile and args.parsers:
+        profile_phases = parse_profile_phases(args.profile)
+        if profile_phases is None or "calc_metrics" in profile_phases:
+            # В пуле конвейера разбор идет в других процессах - профайлер его не видит
+            logger.info("🔬 Профилирование calc_metrics: отчеты разбираются в основном процессе (--parsers 0)")
+            args.parsers = 0
 
     # Загружаем конфигурацию
     cfg = yaml.safe_load(yaml_path.read_text(encoding="utf-8"))
 
+    if args.plan:
+        run_plan_mode(args, cfg, input_xlsx_path)
+        return
+
+    # Настраиваем прокси
+    from modules.selenium_helpers import setup_proxy
+    setup_proxy()
+
     # Подготавливаем навыки, если включен флаг --with-skills
     skills_ids = None
     if args.with_skills:
         logger.info("🎯 Включена работа с навыками (флаг --with-skills)")
+        from modules.skills import prepare_skills_from_config
         skills_ids = prepare_skills_from_config(cfg)
     else:
         logger.info("ℹ️ Работа с навыками отключена (добавьте флаг --with-skills для включения)")
 
+    if args.watch:
+        run_watch_mode(args, cfg, skills_ids, headless)
+        return
+
+    if args.worker:
+        run_worker_mode(args, cfg, skills_ids, headless)
+        return
+
+    profile = RunProfile()
+    if args.profile:
+        profile.enable_profiler(parse_profile_phases(args.profile))
+
     # Обрабатываем Excel данные
-    df = process_excel_data(input_xlsx_path)
+    with profile.phase("process_excel_data"):
+        df = process_excel_data(input_xlsx_path)
 
     # Определяем режим работы
     use_auto_date_processing = args.auto_date_processing
-
-    if use_auto_date_processing:
+    use_multi_date = bool(args.date_from or args.pending_dates)
+    target_dates = None
+
+    if use_multi_date:
+        target_dates = resolve_target_dates(df, args)
+        if not target_dates:
+            logger.warning("⚠️ Нет дат для обработки")
+            return
+        logger.info(f"🆕 Многодатный режим: {len(target_dates)} дат в одной сессии браузера")
+    elif use_auto_date_processing:
         logger.info("🆕 Включен новый режим автоматической обработки по дате")
         logger.info("📅 Дата будет автоматически определена из первой строки данных")
         logger.info("💾 Результаты будут сохранены в исходный Excel файл")
@@ -124,41 +540,51 @@ def main():
     else:
         logger.info("📋 Используется стандартный режим работы (обработка всех проблем)")
 
-    # Инициализируем WebDriver
-    driver = get_driver(headless=headless)
+    if args.coordinator:
+        tasks = build_run_tasks(df, cfg, use_multi_date, use_auto_date_processing, target_dates)
+        run_coordinator_mode(
+            args, tasks, input_xlsx_path, out_csv_path,
+            write_workbook=use_multi_date or use_auto_date_processing
+        )
+        return
+
+    # Инициализируем сессию браузера (WebDriver + CDP + навыки, сторож памяти)
+    exporter = start_metrics_exporter(profile, args.metrics_port, args.metrics_textfile, args.metrics_interval)
+    session = BrowserSession(
+        headless=headless,
+        skills_ids=skills_ids,
+        profile=profile,
+        max_rss_mb=args.recycle_rss_mb,
+        max_tasks=args.recycle_every,
+        max_error_rate=args.recycle_error_rate
+    )
+    store = ResultsStore(Path(args.results_db))
     results = []
 
     try:
         # --- НАВЫКИ: Добавляем ОДИН РАЗ В НАЧАЛЕ (если включены) ----------------------------
-        if skills_ids:
-            logger.info(f"🎯 Настраиваем навыки (БЕЗ ОЧИСТКИ): {skills_ids}")
-            logger.info("🔍 Переходим на страницу отчета для настройки навыков...")
-
-            # Переходим на страницу отчета для настройки навыков
-            from modules.selenium_helpers import REPORT_URL
-            driver.get(REPORT_URL)
-
-            # Применяем CDP настройки
-            apply_cdp_download_settings(driver)
-
-            # Ждем загрузки страницы (простое ожидание)
-            logger.info("⏳ Ждем загрузки страницы...")
-            import time
-            time.sleep(5)  # Просто ждем 5 секунд
+        if not session.start():
+            logger.error("❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось настроить навыки!")
+            return
 
-            # Показываем диагностику что загрузилось
-            show_page_diagnostics(driver)
-
-            logger.info("✅ Продолжаем к поиску навыков...")
+        logger.info("🚀 Начинаем обработку данных из Excel...")
 
-            # Настраиваем навыки
-            if not setup_skills(driver, skills_ids):
-                logger.error("❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось настроить навыки!")
-                return
+        if use_multi_date:
+            results = process_multiple_dates(
+                session, profile, df, target_dates, cfg, input_xlsx_path,
+                tabs=args.tabs, save_every=args.save_every, store=store, parsers=args.parsers
+            )
 
-        logger.info("🚀 Начинаем обработку данных из Excel...")
+            logger.info("🔧 Начинаем постобработку данных...")
+            try:
+                with profile.phase("post_process_excel_file"):
+                    post_process_excel_file(input_xlsx_path)
+                logger.info("✅ Постобработка данных завершена успешно")
+            except Exception as e:
+                logger.error(f"❌ Ошибка при постобработке данных: {e}")
+                logger.exception("Полный traceback:")
 
-        if use_auto_date_processing:
+        elif use_auto_date_processing:
             # Новый режим: автоматически определяем дату из первой строки данных
             target_date = get_date_from_first_row(df)
             df_to_process = filter_problems_by_date(df, target_date)
@@ -169,112 +595,46 @@ def main():
 
             logger.info(f"📊 Найдено {len(df_to_process)} проблем для даты {target_date.strftime('%d.%m.%Y')}")
 
-            # Обрабатываем каждую строку из выбранного DataFrame с индикатором прогресса
-            progress_bar = tqdm(
-                df_to_process.iterrows(),
-                total=len(df_to_process),
-                desc="Обработка проблем",
-                unit="строка",
-                colour="green",
-                bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]"
-            )
-
-            for idx, row in progress_bar:
-                region = row["Регион"]
-                mass_number = row["Номер массовой"]
-
-                # Обновляем описание прогресс-бара
-                progress_bar.set_description(f"Обработка: {mass_number} ({region})")
+            # Задачи дня - через общий исполнитель: кэш окон, сохраненные интервалы,
+            # вкладки (--tabs) или конвейер разбора (--parsers), как в остальных режимах
+            with profile.phase("task_planner"):
+                tasks = build_tasks_for_date(df_to_process, target_date, cfg)
+
+            def on_result(record):
+                if record["error"] is not None:
+                    return
+                task = record["task"]
+                results.append(create_result_record(
+                    task["mass_number"],
+                    task["win_start"].date().isoformat(),
+                    record["lost"],
+                    record["excess"]
+                ))
+                logger.info(f"✅ Успешно обработан {task['mass_number']} - {task['region']}: "
+                            f"lost={record['lost']}, excess={record['excess']}")
+
+            run_tasks(session, profile, tasks, on_result, tabs=args.tabs, store=store, parsers=args.parsers)
 
-                logger.info(f"🔄 Обрабатываем строку #{idx}: {mass_number} - {region}")
-
-                # Проверяем есть ли регион в конфигурации
-                if not validate_region_in_config(region, cfg):
-                    logger.warning(f"⚠️ Регион '{region}' не найден в конфигурации, пропускаем")
-                    continue
-
-                workload_params = cfg["regions"][region]
-
-                # ОТЛАДКА: Показываем исходные времена из Excel
-                logger.info(f"📅 Исходные данные из Excel:")
-                logger.info(f"   Старт: {row['Старт']} (тип: {type(row['Старт'])})")
-                logger.info(f"   Окончание: {row['Окончание']} (тип: {type(row['Окончание'])})")
-
-                # Получаем временное окно для указанной даты
-                win_start, win_end = calculate_time_window_for_date(row, target_date)
-
-                logger.info(f"🕒 Временное окно (исходное):")
-                logger.info(f"   win_start: {win_start} (тип: {type(win_start)})")
-                logger.info(f"   win_end: {win_end} (тип: {type(win_end)})")
-
-                # Преобразуем в datetime без изменения часового пояса
-                # Время уже в МСК как в Excel файле - НЕ МЕНЯЕМ часовой пояс!
-                win_start = prepare_datetime_for_report(win_start)
-                win_end = prepare_datetime_for_report(win_end)
-
-                logger.info(f"🕒 Временное окно (финальное МСК):")
-                logger.info(f"   win_start: {win_start}")
-                logger.info(f"   win_end: {win_end}")
+            logger.info(f"🎉 Обработка завершена! Обработано {len(results)} проблем")
 
-                try:
-                    logger.info(f"🚀 Запускаем download_report для {mass_number} {win_start.date()}")
-                    xlsx_path = download_report(driver, workload_params, win_start, win_end)
-                    logger.info(f"📊 Обрабатываем метрики из файла: {xlsx_path}")
-                    lost, excess = calc_metrics(xlsx_path)
-
-                    # Сохраняем результат сразу в исходный файл
-                    try:
-                        save_single_result_to_original_file(
-                            mass_number=mass_number,
-                            lost_calls=lost,
-                            excess_traffic=excess,
-                            original_file_path=input_xlsx_path,
-                            row_index=idx
-                        )
-                        logger.info(f"✅ Результат сохранен в файл: {mass_number} → lost={lost}, excess={excess}")
-                    except PermissionError as pe:
-                        logger.error(f"❌ ОШИБКА ДОСТУПА: Файл {input_xlsx_path} открыт в Excel или заблокирован")
-                        logger.error(f"   Закройте файл в Excel и попробуйте снова")
-                        logger.error(f"   Детали: {pe}")
-                        # Продолжаем выполнение, но не добавляем в results
-                        continue
-                    except Exception as save_exc:
-                        logger.error(f"❌ ОШИБКА СОХРАНЕНИЯ для {mass_number}: {save_exc}")
-                        logger.error(f"   Продолжаем выполнение без сохранения в файл")
-                        # Продолжаем выполнение, но не добавляем в results
-                        continue
-
-                    # Создаем запись результата для возможного сохранения в CSV
-                    result = create_result_record(
-                        mass_number,
-                        win_start.date().isoformat(),
-                        lost,
-                        excess
+            # Записываем результаты в исходный файл одной пачкой из хранилища результатов
+            try:
+                with profile.phase("save_results"):
+                    save_results_batch_to_original_file(
+                        store.workbook_rows(df_to_process, target_date), input_xlsx_path
                     )
-                    results.append(result)
-
-                    logger.info(f"✅ Успешно обработан {mass_number} - {region}: lost={lost}, excess={excess}")
-                except Exception as exc:
-                    logger.error(f"❌ ОШИБКА для строки #{idx} MassID {mass_number} {region}")
-                    try:
-                        logger.error(f"   Период: {win_start.date()} - {win_end.date()}")
-                    except:
-                        logger.error(f"   Период: не удалось определить")
-                    logger.error(f"   Детали ошибки: {exc}")
-                    logger.exception("   Полный traceback:")
-                    continue
-
-            # Закрываем прогресс-бар
-            progress_bar.close()
-
-            logger.info(f"🎉 Обработка завершена! Обработано {len(results)} проблем")
-            logger.info(f"💾 Результаты сохранены в исходный файл: {input_xlsx_path}")
+                logger.info(f"💾 Результаты сохранены в исходный файл: {input_xlsx_path}")
+            except PermissionError as pe:
+                logger.error(f"❌ ОШИБКА ДОСТУПА: Файл {input_xlsx_path} открыт в Excel или заблокирован")
+                logger.error(f"   Результаты сохранены в {store.db_path} - закройте файл и запустите снова")
+                logger.error(f"   Детали: {pe}")
             logger.info(f"📊 Статистика: {len(results)}/{len(df_to_process)} строк обработано успешно")
 
             # Выполняем постобработку данных
             logger.info("🔧 Начинаем постобработку данных...")
             try:
-                post_process_excel_file(input_xlsx_path)
+                with profile.phase("post_process_excel_file"):
+                    post_process_excel_file(input_xlsx_path)
                 logger.info("✅ Постобработка данных завершена успешно")
             except Exception as e:
                 logger.error(f"❌ Ошибка при постобработке данных: {e}")
@@ -285,87 +645,35 @@ def main():
             # Стандартный режим: обработка всех проблем
             logger.info("📋 Используется стандартный режим обработки всех проблем")
 
-            # Обрабатываем каждую строку с индикатором прогресса
-            progress_bar = tqdm(
-                df.iterrows(),
-                total=len(df),
-                desc="Обработка проблем",
-                unit="строка",
-                colour="blue",
-                bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]"
-            )
-
-            for idx, row in progress_bar:
-                region = row["Регион"]
-                mass_number = row["Номер массовой"]
-
-                # Обновляем описание прогресс-бара
-                progress_bar.set_description(f"Обработка: {mass_number} ({region})")
-
-                logger.info(f"🔄 Обрабатываем строку #{idx}: {mass_number} - {region}")
-
-                # Проверяем есть ли регион в конфигурации
-                if not validate_region_in_config(region, cfg):
-                    continue
-
-                workload_params = cfg["regions"][region]
-
-                # Разбиваем на дневные окна
-                time_windows = list(windows_for_row(row))
-                logger.info(f"📊 Создано временных окон: {len(time_windows)}")
-
-                for window_idx, (win_start, win_end) in enumerate(time_windows):
-                    logger.info(f"🔸 Обрабатываем окно #{window_idx + 1}/{len(time_windows)}")
-                    logger.info(f"🕒 Временное окно (исходное):")
-                    logger.info(f"   win_start: {win_start} (тип: {type(win_start)})")
-                    logger.info(f"   win_end: {win_end} (тип: {type(win_end)})")
-
-                    # Преобразуем в datetime без изменения часового пояса
-                    win_start = prepare_datetime_for_report(win_start)
-                    win_end = prepare_datetime_for_report(win_end)
-
-                    logger.info(f"🕒 Временное окно (финальное МСК):")
-                    logger.info(f"   win_start: {win_start}")
-                    logger.info(f"   win_end: {win_end}")
-
-                    try:
-                        logger.info(f"🚀 Запускаем download_report для {mass_number} {win_start.date()}")
-                        xlsx_path = download_report(driver, workload_params, win_start, win_end)
-                        logger.info(f"📊 Обрабатываем метрики из файла: {xlsx_path}")
-                        lost, excess = calc_metrics(xlsx_path)
-
-                        # Создаем запись результата
-                        result = create_result_record(
-                            mass_number,
-                            win_start.date().isoformat(),
-                            lost,
-                            excess
-                        )
-                        results.append(result)
-
-                        logger.info(f"✅ Успешно обработан {mass_number} - {region}: lost={lost}, excess={excess}")
-                    except Exception as exc:
-                        logger.error(f"❌ ОШИБКА для строки #{idx} MassID {mass_number} {region}")
-                        try:
-                            logger.error(f"   Период: {win_start.date()} - {win_end.date()}")
-                        except:
-                            logger.error(f"   Период: не удалось определить")
-                        logger.error(f"   Детали ошибки: {exc}")
-                        logger.exception("   Полный traceback:")
-                        continue
-
-            # Закрываем прогресс-бар
-            progress_bar.close()
-
-            # Сохраняем в CSV файл (стандартный режим)
-            save_results_to_csv(results, out_csv_path)
+            # Все дневные окна всех строк - одной таблицей задач (интервалы уже посчитаны)
+            with profile.phase("task_planner"):
+                tasks = build_tasks_for_all_windows(df, cfg)
+
+            def on_result(record):
+                if record["error"] is not None:
+                    return
+                task = record["task"]
+                results.append(create_result_record(
+                    task["mass_number"],
+                    task["win_start"].date().isoformat(),
+                    record["lost"],
+                    record["excess"]
+                ))
+                logger.info(f"✅ Успешно обработан {task['mass_number']} - {task['region']}: "
+                            f"lost={record['lost']}, excess={record['excess']}")
+
+            run_tasks(session, profile, tasks, on_result, tabs=args.tabs, store=store, parsers=args.parsers)
+
+            # Строим CSV файл из хранилища результатов (стандартный режим)
+            store.export_csv(out_csv_path, run_id=profile.run_id)
             logger.info(f"📊 Статистика: {len(results)}/{len(df)} строк обработано успешно")
 
             # Выполняем постобработку данных (только если есть результаты)
             if results:
                 logger.info("🔧 Начинаем постобработку данных...")
                 try:
-                    post_process_excel_file(input_xlsx_path)
+                    with profile.phase("post_process_excel_file"):
+                        post_process_excel_file(input_xlsx_path)
                     logger.info("✅ Постобработка данных завершена успешно")
                 except Exception as e:
                     logger.error(f"❌ Ошибка при постобработке данных: {e}")
@@ -374,12 +682,21 @@ def main():
 
     finally:
         # Закрываем браузер
-        driver.quit()
+        session.close()
+        if exporter is not None:
+            exporter.stop()
+
+        # Сохраняем профиль запуска (кривая памяти, пересоздания браузера, фазы)
+        try:
+            profile.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить профиль запуска: {e}")
 
         # Очищаем скачанные файлы
         logger.info("🧹 Начинаем очистку скачанных файлов...")
         try:
             cleanup_downloaded_files()
+            cleanup_report_archive()
             logger.info("✅ Очистка скачанных файлов завершена")
         except Exception as e:
             logger.error(f"❌ Ошибка при очистке скачанных файлов: {e}")
@@ -1,15 +1,26 @@
 """
 Модули для автоматизации работы с отчетами по трафику.
+
+Экспорт ленивый: Selenium загружается только при обращении к get_driver и т.п.,
+поэтому планирование (main.py --plan) и --help не поднимают стек браузера.
 """
 
-from .selenium_helpers import get_driver, setup_proxy, apply_cdp_download_settings
-from .new_site_handler import NewSiteHandler
-from .page_analyzer import PageAnalyzer
-
-__all__ = [
-    'get_driver',
-    'setup_proxy',
-    'apply_cdp_download_settings',
-    'NewSiteHandler',
-    'PageAnalyzer'
-]
\ No newline at end of file
+from importlib import import_module
+
+_EXPORTS = {
+    'get_driver': '.selenium_helpers',
+    'setup_proxy': '.selenium_helpers',
+    'apply_cdp_download_settings': '.selenium_helpers',
+    'NewSiteHandler': '.new_site_handler',
+    'PageAnalyzer': '.page_analyzer',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,321 @@
+"""
+Модуль для управления сессией браузера.
+
+Следит за памятью дерева процессов Chrome после каждой задачи и прозрачно
+пересоздает WebDriver (с повторным применением CDP настроек и навыков),
+когда превышены пороги по памяти, числу задач или доле ошибок.
+
+Стек браузера (Selenium, навыки, скачивание) импортируется при запуске браузера и
+выполнении задачи, а не при импорте модуля: пороги и BrowserRecycleError доступны
+планированию (main.py --plan) без Selenium.
+"""
+
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from .run_profile import task_label
+
+try:
+    import psutil
+except ImportError:  # psutil необязателен: на Linux читаем /proc напрямую
+    psutil = None
+
+
+# === Пороги по умолчанию ===
+DEFAULT_MAX_RSS_MB = 2048
+DEFAULT_MAX_TASKS = 200
+DEFAULT_MAX_ERROR_RATE = 0.5
+DEFAULT_ERROR_WINDOW = 10
+
+
+class BrowserRecycleError(RuntimeError):
+    """Браузер не удалось пересоздать - продолжать обработку нельзя."""
+
+
+def _proc_children_map() -> Dict[int, List[int]]:
+    """Строит карту ppid → [pid] по /proc (fallback без psutil)."""
+    children: Dict[int, List[int]] = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            # Имя процесса в скобках может содержать пробелы - берем поля после ')'
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry.name))
+    return children
+
+
+def _proc_rss_bytes(pid: int) -> int:
+    """Читает VmRSS процесса из /proc/<pid>/status."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return 0
+
+
+def process_tree_rss_mb(root_pid: int) -> Optional[float]:
+    """
+    Возвращает суммарный RSS процесса и всех его потомков в мегабайтах.
+
+    Args:
+        root_pid: PID корневого процесса (chromedriver)
+
+    Returns:
+        float | None: RSS в МБ или None, если измерить нельзя
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            total = 0
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return total / (1024 * 1024)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    if not Path("/proc").is_dir():
+        return None
+
+    children = _proc_children_map()
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += _proc_rss_bytes(pid)
+        stack.extend(children.get(pid, []))
+    return total / (1024 * 1024)
+
+
+class BrowserSession:
+    """Класс-обертка над WebDriver со сторожем памяти и автоматическим пересозданием"""
+
+    def __init__(
+        self,
+        headless: bool = True,
+        skills_ids: List[str] = None,
+        profile=None,
+        max_rss_mb: float = DEFAULT_MAX_RSS_MB,
+        max_tasks: int = DEFAULT_MAX_TASKS,
+        max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+        error_window: int = DEFAULT_ERROR_WINDOW,
+    ):
+        """
+        Инициализация сессии (браузер запускается в start()).
+
+        Args:
+            headless: Запуск в headless режиме
+            skills_ids: Навыки для настройки после каждого запуска браузера
+            profile: RunProfile для записи кривой памяти и пересозданий
+            max_rss_mb: Порог RSS дерева процессов браузера (0 - не проверять)
+            max_tasks: Пересоздавать браузер каждые N задач (0 - не проверять)
+            max_error_rate: Порог доли ошибок в последних error_window задачах (0 - не проверять)
+            error_window: Размер окна для расчета доли ошибок
+        """
+        self.headless = headless
+        self.skills_ids = skills_ids
+        self.profile = profile
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        self.max_error_rate = max_error_rate
+        self.error_window = error_window
+
+        self.driver = None
+        self.recycle_count = 0
+        self.tasks_in_session = 0
+        self._outcomes = deque(maxlen=error_window)
+
+    def start(self) -> bool:
+        """
+        Запускает браузер и подготавливает его (CDP настройки, навыки).
+
+        Returns:
+            bool: True если браузер готов к работе
+        """
+        from .selenium_helpers import get_driver
+
+        self.driver = get_driver(headless=self.headless)
+        self.tasks_in_session = 0
+        self._outcomes.clear()
+        return self._prepare_driver()
+
+    def _prepare_driver(self) -> bool:
+        """Применяет CDP настройки и, если нужно, навыки к свежему драйверу."""
+        from .selenium_helpers import apply_cdp_download_settings, REPORT_URL
+        from .skills import setup_skills, show_page_diagnostics
+
+        apply_cdp_download_settings(self.driver)
+
+        if not self.skills_ids:
+            return True
+
+        logger.info(f"🎯 Настраиваем навыки (БЕЗ ОЧИСТКИ): {self.skills_ids}")
+        logger.info("🔍 Переходим на страницу отчета для настройки навыков...")
+        self.driver.get(REPORT_URL)
+
+        # Применяем CDP настройки на странице отчета
+        apply_cdp_download_settings(self.driver)
+
+        # Ждем загрузки страницы (простое ожидание)
+        logger.info("⏳ Ждем загрузки страницы...")
+        time.sleep(5)
+
+        # Показываем диагностику что загрузилось
+        show_page_diagnostics(self.driver)
+
+        logger.info("✅ Продолжаем к поиску навыков...")
+        return setup_skills(self.driver, self.skills_ids)
+
+    def sample_rss_mb(self) -> Optional[float]:
+        """
+        Измеряет RSS дерева процессов браузера (chromedriver + chrome).
+
+        Returns:
+            float | None: RSS в МБ или None, если измерить нельзя
+        """
+        try:
+            process = self.driver.service.process
+            if process is None:
+                return None
+            return process_tree_rss_mb(process.pid)
+        except Exception as e:
+            logger.debug(f"Не удалось измерить память браузера: {e}")
+            return None
+
+    def after_task(self, success: bool) -> None:
+        """
+        Вызывается после каждой задачи: снимает память и при необходимости пересоздает браузер.
+
+        Args:
+            success: Завершилась ли задача успешно
+        """
+        self.tasks_in_session += 1
+        self._outcomes.append(bool(success))
+
+        rss_mb = self.sample_rss_mb()
+        if rss_mb is not None:
+            logger.debug(f"🧠 Память браузера: {rss_mb:.0f} MB (задача #{self.tasks_in_session})")
+            if self.profile is not None:
+                self.profile.record_memory(rss_mb, self.tasks_in_session)
+
+        reason = self._recycle_reason(rss_mb)
+        if reason:
+            self.recycle(reason, rss_mb)
+
+    def _recycle_reason(self, rss_mb: Optional[float]) -> Optional[str]:
+        """Возвращает причину пересоздания браузера или None."""
+        if self.max_rss_mb and rss_mb is not None and rss_mb > self.max_rss_mb:
+            return f"память {rss_mb:.0f} MB > {self.max_rss_mb} MB"
+
+        if self.max_tasks and self.tasks_in_session >= self.max_tasks:
+            return f"выполнено {self.tasks_in_session} задач"
+
+        if self.max_error_rate and len(self._outcomes) == self._outcomes.maxlen:
+            error_rate = self._outcomes.count(False) / len(self._outcomes)
+            if error_rate >= self.max_error_rate:
+                return f"доля ошибок {error_rate:.0%} в последних {len(self._outcomes)} задачах"
+
+        return None
+
+    def recycle(self, reason: str, rss_mb: Optional[float] = None) -> None:
+        """
+        Закрывает текущий браузер и запускает новый с той же подготовкой.
+
+        Args:
+            reason: Причина пересоздания (для логов и профиля)
+            rss_mb: Память браузера на момент пересоздания
+        """
+        logger.warning(f"♻️ Пересоздаем браузер: {reason}")
+        tasks_done = self.tasks_in_session
+        started = time.perf_counter()
+
+        self._quit_driver()
+        try:
+            ready = self.start()
+        except Exception as e:
+            raise BrowserRecycleError(f"Не удалось запустить браузер после пересоздания: {e}") from e
+        if not ready:
+            raise BrowserRecycleError("Не удалось подготовить браузер после пересоздания (навыки)")
+
+        self.recycle_count += 1
+        duration = time.perf_counter() - started
+        logger.info(f"✅ Браузер пересоздан за {duration:.1f}с (пересозданий: {self.recycle_count})")
+
+        if self.profile is not None:
+            self.profile.record_event(
+                "browser_recycle",
+                reason=reason,
+                rss_mb=round(rss_mb, 1) if rss_mb is not None else None,
+                tasks_in_session=tasks_done,
+                duration_s=round(duration, 2),
+            )
+
+    def _quit_driver(self) -> None:
+        """Закрывает драйвер, игнорируя ошибки уже упавшего браузера."""
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка при закрытии браузера: {e}")
+        self.driver = None
+
+    def close(self) -> None:
+        """Закрывает браузер в конце работы."""
+        self._quit_driver()
+
+
+def run_report_task(session: BrowserSession, profile, workload_params, win_start, win_end,
+                    store=None, mass_number: str = None, region: str = None,
+                    intervals: Optional[Tuple[str, str]] = None) -> Tuple[int, float]:
+    """
+    Скачивает отчет за окно и считает метрики, сообщая сессии браузера об исходе задачи.
+
+    Args:
+        session: Сессия браузера
+        profile: RunProfile для замера фаз
+        workload_params: ID регионов рабочей нагрузки
+        win_start: Начало окна
+        win_end: Конец окна
+        store: ResultsStore для сохранения результата с детализацией (необязательно)
+        mass_number: Номер массовой (ключ в хранилище)
+        region: Регион (для хранилища)
+        intervals: Готовые ("Интервал от", "Интервал до") из task_planner (None - посчитать)
+
+    Returns:
+        Tuple[int, float]: (lost, excess)
+    """
+    from .download_manager import download_report
+    from .data_processing import calc_metrics_detailed
+
+    profile.start_task(task_label(mass_number, win_start, win_end))
+    try:
+        with profile.phase("download_report"):
+            xlsx_path = download_report(session.driver, workload_params, win_start, win_end, intervals=intervals)
+        logger.info(f"📊 Обрабатываем метрики из файла: {xlsx_path}")
+        with profile.phase("calc_metrics"):
+            lost, excess, intervals = calc_metrics_detailed(xlsx_path)
+    except Exception:
+        profile.record_task(success=False)
+        session.after_task(success=False)
+        raise
+
+    profile.record_task(success=True)
+    session.after_task(success=True)
+
+    if store is not None:
+        with profile.phase("store_result"):
+            store.upsert(mass_number, win_start, win_end, lost, excess,
+                         region=region, intervals=intervals, run_id=profile.run_id)
+    return lost, excess
@@ -0,0 +1,222 @@
+"""
+Модуль для асинхронной работы с Chrome DevTools Protocol через websocket.
+
+Подключается к браузеру, уже запущенному через Selenium (debuggerAddress),
+и позволяет управлять несколькими вкладками (targets) из одного asyncio цикла.
+Использует "flatten" сессии: все вкладки обслуживаются одним websocket соединением.
+"""
+
+import asyncio
+import itertools
+import json
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+try:
+    import websockets
+except ImportError:  # websockets нужен только для многовкладочного режима
+    websockets = None
+
+
+class CdpError(RuntimeError):
+    """Ошибка, возвращенная браузером в ответ на CDP команду."""
+
+
+def get_browser_ws_url(driver) -> str:
+    """
+    Возвращает websocket URL браузера, запущенного через Selenium.
+
+    Args:
+        driver: WebDriver instance (Chrome)
+
+    Returns:
+        str: webSocketDebuggerUrl браузера
+    """
+    debugger_address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    # Локальный адрес не должен идти через корпоративный прокси
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    with opener.open(f"http://{debugger_address}/json/version", timeout=10) as response:
+        version = json.loads(response.read().decode("utf-8"))
+    return version["webSocketDebuggerUrl"]
+
+
+class CdpClient:
+    """Асинхронный клиент CDP поверх одного websocket соединения"""
+
+    def __init__(self, ws_url: str):
+        self.ws_url = ws_url
+        self._ws = None
+        self._reader_task = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._listeners: List[Dict[str, Any]] = []
+
+    async def connect(self) -> "CdpClient":
+        """Открывает websocket соединение с браузером."""
+        if websockets is None:
+            raise RuntimeError("Для многовкладочного режима установите пакет websockets: pip install websockets")
+
+        self._ws = await websockets.connect(self.ws_url, max_size=None, ping_interval=None)
+        self._reader_task = asyncio.create_task(self._read_loop())
+        logger.info("🔌 CDP соединение с браузером установлено")
+        return self
+
+    async def close(self) -> None:
+        """Закрывает соединение (браузер продолжает работать)."""
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    async def send(self, method: str, params: Dict[str, Any] = None,
+                   session_id: str = None, timeout: float = 60) -> Dict[str, Any]:
+        """
+        Отправляет CDP команду и ждет ответ.
+
+        Args:
+            method: Метод CDP (например, "Page.navigate")
+            params: Параметры команды
+            session_id: Сессия вкладки (None - команда уровня браузера)
+            timeout: Таймаут ожидания ответа в секундах
+
+        Returns:
+            Dict[str, Any]: Поле result ответа
+        """
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        await self._ws.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def add_listener(self, method: str, callback: Callable[[Dict[str, Any]], None],
+                     session_id: str = None) -> Dict[str, Any]:
+        """
+        Подписывается на событие CDP.
+
+        Args:
+            method: Имя события (например, "Browser.downloadProgress")
+            callback: Функция, получающая params события
+            session_id: Только события этой сессии (None - любые)
+
+        Returns:
+            Dict[str, Any]: Описание подписки (для remove_listener)
+        """
+        listener = {"method": method, "callback": callback, "session_id": session_id}
+        self._listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener: Dict[str, Any]) -> None:
+        """Отменяет подписку на событие."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def _read_loop(self) -> None:
+        """Читает сообщения из websocket и раздает ответы и события."""
+        try:
+            async for raw in self._ws:
+                message = json.loads(raw)
+
+                if "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CdpError(message["error"].get("message", str(message["error"]))))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+
+                method = message.get("method")
+                session_id = message.get("sessionId")
+                for listener in list(self._listeners):
+                    if listener["method"] != method:
+                        continue
+                    if listener["session_id"] and listener["session_id"] != session_id:
+                        continue
+                    try:
+                        listener["callback"](message.get("params", {}))
+                    except Exception as e:
+                        logger.warning(f"⚠️ Ошибка в обработчике CDP события {method}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ CDP соединение прервано: {e}")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CdpError(f"CDP соединение прервано: {e}"))
+
+    async def evaluate(self, expression: str, session_id: str, timeout: float = 60) -> Any:
+        """
+        Выполняет JavaScript во вкладке и возвращает значение.
+
+        Args:
+            expression: JavaScript выражение
+            session_id: Сессия вкладки
+            timeout: Таймаут в секундах
+
+        Returns:
+            Any: Результат выражения (returnByValue)
+        """
+        result = await self.send(
+            "Runtime.evaluate",
+            {"expression": expression, "returnByValue": True, "awaitPromise": True},
+            session_id=session_id,
+            timeout=timeout,
+        )
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            text = details.get("exception", {}).get("description") or details.get("text")
+            raise CdpError(f"Ошибка JavaScript: {text}")
+        return result.get("result", {}).get("value")
+
+    async def create_tab(self, url: str = "about:blank", isolated_context: bool = True) -> Dict[str, Optional[str]]:
+        """
+        Открывает новую вкладку и подключается к ней.
+
+        Args:
+            url: Начальный URL вкладки
+            isolated_context: Создать отдельный контекст браузера (свои cookies и папка загрузок)
+
+        Returns:
+            Dict: {"target_id", "session_id", "context_id"}
+        """
+        context_id = None
+        if isolated_context:
+            context = await self.send("Target.createBrowserContext", {"disposeOnDetach": True})
+            context_id = context["browserContextId"]
+
+        params = {"url": url}
+        if context_id:
+            params["browserContextId"] = context_id
+        target = await self.send("Target.createTarget", params)
+        attached = await self.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+
+        return {
+            "target_id": target["targetId"],
+            "session_id": attached["sessionId"],
+            "context_id": context_id,
+        }
+
+    async def close_tab(self, tab: Dict[str, Optional[str]]) -> None:
+        """Закрывает вкладку и ее контекст браузера."""
+        try:
+            await self.send("Target.closeTarget", {"targetId": tab["target_id"]}, timeout=10)
+        except Exception as e:
+            logger.debug(f"Не удалось закрыть вкладку {tab['target_id']}: {e}")
+        if tab.get("context_id"):
+            try:
+                await self.send("Target.disposeBrowserContext", {"browserContextId": tab["context_id"]}, timeout=10)
+            except Exception as e:
+                logger.debug(f"Не удалось удалить контекст {tab['context_id']}: {e}")
@@ -2,11 +2,11 @@
 Модуль для очистки скачанных файлов после завершения работы скрипта.
 """
 
-import os
-import time
 from pathlib import Path
 from loguru import logger
 
+from .report_archive import get_report_archive
+
 
 def cleanup_downloaded_files(download_dir: Path = None) -> None:
     """
@@ -97,46 +97,21 @@ def cleanup_downloaded_files(download_dir: Path = None) -> None:
         logger.exception("Полный traceback:")
 
 
-def cleanup_old_files(download_dir: Path = None, max_age_hours: int = 24) -> None:
+def cleanup_report_archive(max_mb: float = None) -> int:
     """
-    Удаляет старые файлы из папки загрузок (старше указанного возраста).
+    Ограничивает размер архива отчетов, удаляя давно не использованные (LRU).
 
-    Args:
-        download_dir: Путь к папке загрузок
-        max_age_hours: Максимальный возраст файлов в часах
-    """
-    if download_dir is None:
-        project_root = Path(__file__).resolve().parent.parent
-        download_dir = project_root / "downloads"
-
-    if not download_dir.exists():
-        return
+    Скачанные файлы в downloads - рабочие копии и удаляются cleanup_downloaded_files;
+    отчеты для повторных запусков хранит архив (report_archive).
 
-    current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
-
-    logger.info(f"🧹 Очистка старых файлов (старше {max_age_hours} часов) в папке: {download_dir}")
-
-    old_files = []
-    for file_path in download_dir.glob("*"):
-        if file_path.is_file():
-            file_age = current_time - file_path.stat().st_mtime
-            if file_age > max_age_seconds:
-                old_files.append(file_path)
-
-    if not old_files:
-        logger.info("✅ Старых файлов не найдено")
-        return
-
-    logger.info(f"📊 Найдено {len(old_files)} старых файлов для удаления")
-
-    deleted_count = 0
-    for file_path in old_files:
-        try:
-            file_path.unlink()
-            deleted_count += 1
-            logger.debug(f"🗑️ Удален старый файл: {file_path.name}")
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось удалить старый файл {file_path.name}: {e}")
+    Args:
+        max_mb: Предельный размер архива в МБ (по умолчанию - из настроек архива)
 
-    logger.info(f"✅ Удалено {deleted_count} старых файлов")
+    Returns:
+        int: Количество удаленных отчетов
+    """
+    archive = get_report_archive()
+    if archive is None:
+        return 0
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+    return archive.evict(max_bytes)
@@ -0,0 +1,108 @@
+"""
+Модуль для подсчета жалоб по массовым проблемам (колонка "Всего жалоб" в Своде).
+
+Обращения из разобранного отчета по причинам (reasons_parser) группируются одним
+groupby по (Номер массовой, дата, регион); из этой таблицы получаются счетчики по
+строкам Свода и по регионам. Счетчики пишутся в лист "Отчет" тем же пакетным
+writer'ом, что и "Потерянные"/"Превышение": "Всего жалоб" - по (Номер массовой, дата)
+строки, "Жалоб по региону" - по (Регион, дата) строки.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from loguru import logger
+
+from .date_time_utils import parse_datetime_series
+from .excel_manager import save_results_batch_to_original_file
+from .reasons_parser import load_reasons, DEFAULT_REASONS_DB
+
+
+def aggregate_complaints(reasons: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Считает жалобы по номеру массовой и дате, а также по региону и дате.
+
+    Args:
+        reasons: Обращения из load_reasons
+
+    Returns:
+        Tuple[pd.Series, pd.DataFrame]: (счетчики с индексом (Номер массовой, ДатаБезВремени),
+            счетчики по колонкам Регион, ДатаБезВремени, Всего жалоб)
+    """
+    counts = (
+        reasons.groupby(["Номер массовой", "ДатаБезВремени", "Регион"], observed=True, dropna=False)
+        .size()
+        .rename("Всего жалоб")
+    )
+    by_mass = counts.groupby(level=["Номер массовой", "ДатаБезВремени"], dropna=False).sum()
+    by_region = counts.groupby(level=["Регион", "ДатаБезВремени"], observed=True).sum().reset_index()
+    return by_mass, by_region
+
+
+def complaints_rows(svod: pd.DataFrame, by_mass: pd.Series,
+                    by_region: Optional[pd.DataFrame] = None) -> List[Dict[str, Any]]:
+    """
+    Строит пачку для save_results_batch_to_original_file по строкам Свода.
+
+    Args:
+        svod: Строки Свода (индекс - индекс строки листа "Отчет")
+        by_mass: Счетчики по массовым из aggregate_complaints
+        by_region: Счетчики по регионам из aggregate_complaints (нужна колонка "Регион" в Своде)
+
+    Returns:
+        List[Dict[str, Any]]: {"row_index", "mass_number", "date", "complaints"[, "region_complaints"]}
+            для каждой строки с датой
+    """
+    dates = parse_datetime_series(svod["ДатаБезВремени"], "%d.%m.%Y").dt.normalize()
+    keys = pd.MultiIndex.from_arrays([
+        pd.to_numeric(svod["Номер массовой"], errors="coerce").astype("Int64"),
+        dates,
+    ])
+    # Строкам без обращений пишется 0, чтобы колонка была заполнена целиком
+    complaints = by_mass.reindex(keys).fillna(0).astype(int).to_numpy()
+
+    region_complaints = None
+    if by_region is not None:
+        region_counts = by_region.set_index([by_region["Регион"].astype(str), "ДатаБезВремени"])["Всего жалоб"]
+        region_keys = pd.MultiIndex.from_arrays([svod["Регион"].astype(str), dates])
+        region_complaints = region_counts.reindex(region_keys).fillna(0).astype(int).to_numpy()
+
+    rows = []
+    for position, (idx, mass_number) in enumerate(zip(svod.index, svod["Номер массовой"])):
+        if pd.isna(dates.iloc[position]):
+            continue
+        row = {"row_index": idx, "mass_number": mass_number, "date": dates.iloc[position].date(),
+               "complaints": int(complaints[position])}
+        if region_complaints is not None:
+            row["region_complaints"] = int(region_complaints[position])
+        rows.append(row)
+    return rows
+
+
+def fill_complaints(svod_path: Path, reasons_db: Path = DEFAULT_REASONS_DB) -> int:
+    """
+    Заполняет колонку "Всего жалоб" в листе "Отчет" по разобранным обращениям.
+
+    Args:
+        svod_path: Путь к книге Свода
+        reasons_db: База SQLite из reasons_parser
+
+    Returns:
+        int: Количество записанных строк
+    """
+    svod = pd.read_excel(svod_path, sheet_name="Отчет",
+                         usecols=lambda column: column in ("Номер массовой", "ДатаБезВремени", "Регион"))
+    dates = parse_datetime_series(svod["ДатаБезВремени"], "%d.%m.%Y").dropna()
+    if dates.empty:
+        logger.warning("⚠️ В Своде нет дат - жалобы не подсчитаны")
+        return 0
+
+    reasons = load_reasons(reasons_db, date_from=dates.min().date(), date_to=dates.max().date())
+    by_mass, by_region = aggregate_complaints(reasons)
+    logger.info(f"📊 Обращений: {len(reasons)}, массовых с жалобами: {len(by_mass)}, "
+                f"регионов: {by_region['Регион'].nunique()}")
+
+    if "Регион" not in svod.columns:
+        logger.warning("⚠️ В Своде нет колонки 'Регион' - жалобы по регионам не записываются")
+        by_region = None
+    return save_results_batch_to_original_file(complaints_rows(svod, by_mass, by_region), svod_path)
@@ -8,10 +8,26 @@ import pandas as pd
 import numpy as np
 from loguru import logger
 
-def calc_metrics(path: Path) -> Tuple[int, float]:
+from .date_time_utils import parse_datetime_series
+from .metrics_engine import lost_per_row
+
+
+# === Колонки Свода ===
+REQUIRED_COLUMNS = ["Номер массовой", "Регион", "Старт", "Окончание"]
+# Остальные колонки, которые используются после чтения (дата строки и уже посчитанные результаты)
+OPTIONAL_COLUMNS = ["ДатаБезВремени", "Потерянные", "Превышение"]
+
+def calc_metrics_detailed(path: Path) -> Tuple[int, float, pd.DataFrame]:
     """
-    Читает 2-й лист отчёта и возвращает (lost, excess),
+    Читает 2-й лист отчёта и возвращает (lost, excess, intervals),
     исключая строки 'Итого:' и любые строки, где в 'Период' не время.
+
+    Args:
+        path: Путь к скачанному отчету
+
+    Returns:
+        Tuple[int, float, pd.DataFrame]: lost, excess и детализация по интервалам
+        (колонки: period, calc, fcst, answ, lost)
     """
     df = pd.read_excel(path, sheet_name=1, header=4)  # заголовки на 5-й строке
     df.columns = [c.strip() for c in df.columns]
@@ -30,20 +46,34 @@ def calc_metrics(path: Path) -> Tuple[int, float]:
     fcst = df["Спрогнозированные звонки"].to_numpy()
     answ = df["Отвеченные звонки"].to_numpy()
 
-    # 3) РЕАЛИЗАЦИЯ ТОЧНО КАК В ТВОЕЙ ФОРМУЛЕ ПО СТРОКЕ
-    lost_per_row = np.where(
-        (calc - fcst) > 0,
-        np.where((answ - fcst) > 0, calc - answ, (calc - answ) - (fcst - answ)),
-        0
-    )
-    # при желании можно подстраховаться от отрицательных: lost_per_row = np.maximum(lost_per_row, 0)
+    # 3) РЕАЛИЗАЦИЯ ТОЧНО КАК В ТВОЕЙ ФОРМУЛЕ ПО СТРОКЕ (общая с metrics_engine)
+    row_lost = lost_per_row(calc, fcst, answ)
+    # при желании можно подстраховаться от отрицательных: row_lost = np.maximum(row_lost, 0)
 
-    lost = int(lost_per_row.sum())
+    lost = int(row_lost.sum())
 
     # 4) excess как раньше: суммарный (calc - fcst) / суммарный fcst
     fcst_sum = fcst.sum()
     excess = round(float(((calc - fcst).sum()) / fcst_sum), 4) if fcst_sum else 0.0
 
+    periods = df["Период"].astype(str).to_numpy() if "Период" in df.columns else np.arange(len(df)).astype(str)
+    intervals = pd.DataFrame({
+        "period": periods,
+        "calc": calc,
+        "fcst": fcst,
+        "answ": answ,
+        "lost": row_lost,
+    })
+
+    return lost, excess, intervals
+
+
+def calc_metrics(path: Path) -> Tuple[int, float]:
+    """
+    Читает 2-й лист отчёта и возвращает (lost, excess),
+    исключая строки 'Итого:' и любые строки, где в 'Период' не время.
+    """
+    lost, excess, _ = calc_metrics_detailed(path)
     return lost, excess
 
 def prepare_excel_data(input_xlsx_path: Path) -> pd.DataFrame:
@@ -56,16 +86,16 @@ def prepare_excel_data(input_xlsx_path: Path) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Подготовленные данные
     """
-    # Читаем данные с листа "отчет"
+    # Читаем данные с листа "отчет" - только нужные колонки
+    wanted = set(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
     try:
-        df = pd.read_excel(input_xlsx_path, sheet_name="Отчет")
+        df = pd.read_excel(input_xlsx_path, sheet_name="Отчет", usecols=lambda c: c in wanted)
     except ValueError as e:
         logger.error(f"Не найден лист 'отчет' в файле {input_xlsx_path}. Ошибка: {e}")
         raise
 
     # Проверяем наличие обязательных колонок
-    required_columns = ["Номер массовой", "Регион", "Старт", "Окончание"]
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_columns:
         logger.error(f"Отсутствуют обязательные колонки: {missing_columns}")
         logger.error(f"Доступные колонки: {list(df.columns)}")
@@ -76,7 +106,8 @@ def prepare_excel_data(input_xlsx_path: Path) -> pd.DataFrame:
 
 def parse_datetime_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Парсит колонки с датами и временем.
+    Парсит колонки с датами и временем ("Старт", "Окончание", "ДатаБезВремени")
+    в типизированные колонки datetime64 и приводит "Регион" к категориальному типу.
 
     Args:
         df: DataFrame с данными
@@ -84,14 +115,14 @@ def parse_datetime_columns(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame с корректно распарсенными датами
     """
-    # Убеждаемся что колонки дат парсятся правильно
-    try:
-        df["Старт"] = pd.to_datetime(df["Старт"], format="%d.%m.%Y %H:%M", errors='coerce')
-        df["Окончание"] = pd.to_datetime(df["Окончание"], format="%d.%m.%Y %H:%M", errors='coerce')
-    except Exception as e:
-        logger.warning(f"Проблема с парсингом дат, пробуем автоматический парсинг: {e}")
-        df["Старт"] = pd.to_datetime(df["Старт"], errors='coerce')
-        df["Окончание"] = pd.to_datetime(df["Окончание"], errors='coerce')
+    # Один векторный проход на колонку: формат Power Query, остальное - автоматически
+    df["Старт"] = parse_datetime_series(df["Старт"], "%d.%m.%Y %H:%M")
+    df["Окончание"] = parse_datetime_series(df["Окончание"], "%d.%m.%Y %H:%M")
+    if "ДатаБезВремени" in df.columns:
+        df["ДатаБезВремени"] = parse_datetime_series(df["ДатаБезВремени"], "%d.%m.%Y").dt.normalize()
+
+    # Регионов немного, строк много - категориальный тип экономит память и ускоряет сравнения
+    df["Регион"] = df["Регион"].astype("category")
 
     # Проверяем на наличие некорректных дат
     # ВАЖНО: допускаем пустое "Окончание" (незакрытые проблемы). Отбрасываем только без "Старт".
@@ -5,6 +5,7 @@
 import pytz
 from datetime import datetime, time as dtime, timedelta
 from typing import List, Tuple
+import numpy as np
 import pandas as pd
 from loguru import logger
 
@@ -37,6 +38,28 @@ def round_to_15_minutes_up(dt: datetime) -> datetime:
     return dt.replace(minute=rounded_minutes, second=0, microsecond=0)
 
 
+def parse_datetime_series(series: pd.Series, fmt: str) -> pd.Series:
+    """
+    Векторно парсит колонку дат: сначала по формату, нераспознанные значения - автоматически.
+
+    Args:
+        series: Колонка со строками и/или datetime
+        fmt: Основной формат (например, "%d.%m.%Y %H:%M")
+
+    Returns:
+        pd.Series: Колонка datetime64 (NaT для нераспознанных значений)
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    parsed = pd.to_datetime(series, format=fmt, errors="coerce")
+    # Excel может отдать часть значений другим форматом или объектами datetime
+    leftover = parsed.isna() & series.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(series[leftover], errors="coerce", dayfirst=True)
+    return parsed
+
+
 def windows_for_row(row) -> List[Tuple[datetime, datetime]]:
     """Разбиваем период массового инцидента на дневные окна с учетом точного времени."""
     result = []
@@ -83,6 +106,67 @@ def windows_for_row(row) -> List[Tuple[datetime, datetime]]:
     return result
 
 
+def expand_daily_windows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Векторный аналог windows_for_row: разбивает все строки Свода на дневные окна за один проход.
+
+    Args:
+        df: DataFrame с колонками "Старт" и "Окончание" (datetime64)
+
+    Returns:
+        pd.DataFrame: Колонки row_index, win_start, win_end (по строке на окно)
+    """
+    start = df["Старт"]
+    valid = start.notna()
+    if not valid.all():
+        logger.warning(f"⚠️ Найдено {int((~valid).sum())} строк с пустым значением 'Старт' - пропускаем")
+    start = start[valid]
+    end = df.loc[valid, "Окончание"]
+
+    # Время уже в МСК как в Excel файле - только убираем часовой пояс, если он есть
+    if start.dt.tz is not None:
+        start = start.dt.tz_localize(None)
+    if end.dt.tz is not None:
+        end = end.dt.tz_localize(None)
+
+    day_start = start.dt.normalize()
+    day_end_offset = pd.Timedelta(hours=23, minutes=59, seconds=59)
+    # Незакрытый инцидент: обрабатываем только день начала
+    end = end.fillna(day_start + day_end_offset)
+
+    n_days = ((end.dt.normalize() - day_start).dt.days + 1).clip(lower=0).to_numpy()
+    positions = np.repeat(np.arange(len(start)), n_days)
+    # Номер дня внутри инцидента: 0, 1, 2, ... для каждой строки
+    offsets = np.arange(len(positions)) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+
+    days = day_start.to_numpy()[positions] + pd.to_timedelta(offsets, unit="D").to_numpy()
+    win_start = np.maximum(days, start.to_numpy()[positions])
+    win_end = np.minimum(days + day_end_offset.to_timedelta64(), end.to_numpy()[positions])
+
+    return pd.DataFrame({
+        "row_index": start.index.to_numpy()[positions],
+        "win_start": win_start,
+        "win_end": win_end,
+    })
+
+
+def interval_columns(win_start: pd.Series, win_end: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Векторный аналог format_time_intervals: начало округляется вниз, конец вверх до 15 минут.
+
+    Args:
+        win_start: Начала окон (datetime64)
+        win_end: Концы окон (datetime64)
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: (interval_from, interval_to) в формате HH:MM
+    """
+    interval_from = win_start.dt.floor("15min").dt.strftime("%H:%M")
+    # Как в round_to_15_minutes_up: секунды отбрасываются, ровные четверти часа не сдвигаются
+    interval_to = win_end.dt.floor("min").dt.ceil("15min").dt.strftime("%H:%M")
+    return interval_from, interval_to
+
+
 def prepare_datetime_for_report(dt: datetime) -> datetime:
     """
     Подготавливает datetime для отправки в отчет.
@@ -0,0 +1,160 @@
+"""
+Модуль для прямого скачивания файлов по URL с cookies сессии браузера.
+
+Экспорт ReportViewer (Reserved.ReportViewerWebControl.axd...Format=EXCELOPENXML)
+скачивается HTTP-запросом, минуя менеджер загрузок Chrome: cookies драйвера
+копируются в пул соединений requests, ответ пишется на диск потоком с прогрессом
+и контрольной суммой. Несколько экспортов можно скачивать параллельно.
+"""
+
+import hashlib
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+from loguru import logger
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# === Константы ===
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_TIMEOUT = 300
+DEFAULT_POOL_SIZE = 8
+PROGRESS_EVERY_BYTES = 5 * 1024 * 1024
+
+
+class DirectDownloader:
+    """Класс для скачивания файлов с cookies браузера через пул HTTP-соединений"""
+
+    def __init__(self, driver, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Инициализация (cookies и User-Agent берутся из текущего контекста драйвера).
+
+        Args:
+            driver: WebDriver instance
+            pool_size: Размер пула соединений (= число параллельных скачиваний)
+        """
+        self.driver = driver
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+        self.sync_cookies()
+
+    def sync_cookies(self) -> int:
+        """
+        Копирует cookies драйвера (текущего документа/фрейма) в HTTP-сессию.
+
+        Returns:
+            int: Количество скопированных cookies
+        """
+        cookies = self.driver.get_cookies()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain"), path=cookie.get("path", "/")
+            )
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent;")
+            if user_agent:
+                self.session.headers["User-Agent"] = user_agent
+        except Exception:
+            pass
+        logger.info(f"🍪 Скопировано cookies из браузера: {len(cookies)}")
+        return len(cookies)
+
+    @staticmethod
+    def _filename_from_response(response: requests.Response) -> Optional[str]:
+        """Имя файла из Content-Disposition (filename* или filename)."""
+        disposition = response.headers.get("Content-Disposition", "")
+        match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition, re.I)
+        if not match:
+            match = re.search(r'filename="?([^";]+)"?', disposition, re.I)
+        return unquote(match.group(1).strip()) if match else None
+
+    def download(self, url: str, target_dir: Path, filename: str = None,
+                 timeout: float = DEFAULT_TIMEOUT) -> Tuple[Path, str]:
+        """
+        Скачивает файл потоком во временный .part и переименовывает после завершения.
+
+        Args:
+            url: URL файла
+            target_dir: Папка для сохранения
+            filename: Имя файла (по умолчанию - из Content-Disposition)
+            timeout: Таймаут соединения/чтения в секундах
+
+        Returns:
+            Tuple[Path, str]: (путь к файлу, sha256)
+        """
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        started = time.time()
+
+        with self.session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if "text/html" in content_type:
+                # Вместо файла пришла страница (чаще всего - сессия не авторизована cookies)
+                raise RuntimeError(f"Вместо файла получена HTML страница (HTTP {response.status_code})")
+
+            name = filename or self._filename_from_response(response) or f"export_{int(started)}.xlsx"
+            # Имя из заголовка сервера не должно выводить файл за пределы target_dir
+            target = target_dir / (Path(name.replace("\\", "/")).name or f"export_{int(started)}.xlsx")
+            part = target.with_name(target.name + ".part")
+            total = int(response.headers.get("Content-Length") or 0)
+
+            digest = hashlib.sha256()
+            received = next_report = 0
+            with open(part, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                    if received >= next_report:
+                        progress = f"{received / total:.0%}" if total else f"{received // 1024} КБ"
+                        logger.info(f"📥 {name}: {progress}")
+                        next_report = received + PROGRESS_EVERY_BYTES
+
+        if total and received != total:
+            part.unlink(missing_ok=True)
+            raise RuntimeError(f"Файл скачан не полностью: {received} из {total} байт")
+
+        part.replace(target)
+        checksum = digest.hexdigest()
+        logger.success(f"✅ Скачан {target.name}: {received} байт за {time.time() - started:.1f}с, sha256={checksum[:16]}…")
+        return target, checksum
+
+    def download_many(self, jobs: List[Dict], target_dir: Path,
+                      timeout: float = DEFAULT_TIMEOUT) -> List[Dict]:
+        """
+        Скачивает несколько файлов параллельно (до pool_size одновременно).
+
+        Args:
+            jobs: Список {"url", "filename"}
+            target_dir: Папка для сохранения
+            timeout: Таймаут одного скачивания
+
+        Returns:
+            List[Dict]: {"url", "path", "sha256", "error"} в порядке jobs
+        """
+        def fetch(job):
+            try:
+                path, checksum = self.download(job["url"], target_dir, job.get("filename"), timeout)
+                return {"url": job["url"], "path": path, "sha256": checksum, "error": None}
+            except Exception as exc:
+                logger.error(f"❌ Ошибка скачивания {job['url'][:80]}: {exc}")
+                return {"url": job["url"], "path": None, "sha256": None, "error": str(exc)}
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            return list(pool.map(fetch, jobs))
+
+    def close(self) -> None:
+        """Закрывает пул соединений."""
+        self.session.close()
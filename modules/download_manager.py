@@ -5,7 +5,7 @@
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -19,10 +19,13 @@ from .selenium_helpers import (
     apply_cdp_download_settings,
     prepare_download_js,
     REPORT_URL,
+    DOWNLOAD_DIR,
     switch_to_report_frame,
 )
 from .date_time_utils import format_time_intervals, get_time_format_variations
 from .regions import setup_regions
+from .network_idle import get_network_tracker, wait_for_network_idle
+from .report_archive import get_report_archive, report_params, report_key
 
 
 def setup_date_range(driver, start_dt: datetime, end_dt: datetime):
@@ -47,7 +50,7 @@ def setup_date_range(driver, start_dt: datetime, end_dt: datetime):
     date_from.send_keys(start_dt.strftime(date_fmt))
     time.sleep(2)  # Увеличили паузу
     date_from.send_keys(Keys.TAB)  # подтвердить дату
-    time.sleep(3)  # Увеличили паузу для применения изменений
+    wait_for_network_idle(driver, timeout=10, fallback_sleep=3)  # postback после смены даты
     logger.info(f"✅ Дата от установлена: {start_dt.strftime(date_fmt)}")
 
     # Дата до (с увеличенными паузами)
@@ -61,11 +64,12 @@ def setup_date_range(driver, start_dt: datetime, end_dt: datetime):
     date_to.send_keys(end_dt.strftime(date_fmt))
     time.sleep(2)  # Увеличили паузу
     date_to.send_keys(Keys.TAB)  # подтвердить дату
-    time.sleep(3)  # Увеличили паузу для применения изменений
+    wait_for_network_idle(driver, timeout=10, fallback_sleep=3)  # postback после смены даты
     logger.info(f"✅ Дата до установлена: {end_dt.strftime(date_fmt)}")
 
 
-def setup_time_intervals(driver, start_dt: datetime, end_dt: datetime):
+def setup_time_intervals(driver, start_dt: datetime, end_dt: datetime,
+                         intervals: Optional[Tuple[str, str]] = None):
     """
     Настраивает временные интервалы в форме отчета.
 
@@ -73,10 +77,14 @@ def setup_time_intervals(driver, start_dt: datetime, end_dt: datetime):
         driver: WebDriver instance
         start_dt: Время начала
         end_dt: Время окончания
+        intervals: Готовые (от, до) в формате HH:MM из таблицы задач (None - посчитать здесь)
     """
     try:
         # Получаем отформатированные временные интервалы
-        start_time_str, end_time_str = format_time_intervals(start_dt, end_dt)
+        if intervals is not None:
+            start_time_str, end_time_str = intervals
+        else:
+            start_time_str, end_time_str = format_time_intervals(start_dt, end_dt)
 
         logger.info(f"🕒 Исходное время: {start_dt.strftime('%H:%M')} - {end_dt.strftime('%H:%M')}")
         logger.info(f"⏰ Округленное время (15-мин интервалы): {start_time_str} - {end_time_str}")
@@ -229,19 +237,34 @@ def download_report(
     region_ids: List[str],
     start_dt: datetime,
     end_dt: datetime,
+    intervals: Optional[Tuple[str, str]] = None,
 ) -> Path:
     """
     Открывает форму, выставляет фильтры, скачивает отчёт.
 
+    Отчет за прошедшие дни сначала ищется в архиве (report_archive) по параметрам
+    запроса - при попадании браузер не используется, скачанный отчет попадает в архив.
+
     Args:
         driver: WebDriver instance
         region_ids: Список ID регионов
         start_dt: Дата и время начала
         end_dt: Дата и время окончания
+        intervals: Готовые ("Интервал от", "Интервал до") в формате HH:MM (необязательно)
 
     Returns:
         Path: Путь к скачанному файлу
     """
+    archive = get_report_archive()
+    if archive is not None and archive.is_cacheable(end_dt):
+        params = report_params(region_ids, start_dt, end_dt, intervals or format_time_intervals(start_dt, end_dt))
+        key = report_key(params)
+        cached = archive.get(key, DOWNLOAD_DIR)
+        if cached is not None:
+            return cached
+    else:
+        archive = None
+
     logger.info(f"🌐 Переходим на страницу отчета: {REPORT_URL}")
     driver.get(REPORT_URL)
 
@@ -252,13 +275,15 @@ def download_report(
     logger.info("⏳ Ждем загрузки страницы отчета (до 30с)...")
     switch_to_report_frame(driver, timeout=30)
 
-    time.sleep(1)  # Небольшая пауза для стабильности
+    # Старые сетевые события (прошлые задачи) не должны влиять на ожидания этой формы
+    get_network_tracker(driver).reset()
+    wait_for_network_idle(driver, timeout=10, fallback_sleep=1)
 
     # --- 1) даты / время -------------------------------------------------------
     setup_date_range(driver, start_dt, end_dt)
 
     # --- 2) Интервалы часов -------------------------------------------------
-    setup_time_intervals(driver, start_dt, end_dt)
+    setup_time_intervals(driver, start_dt, end_dt, intervals=intervals)
 
     # --- 3) Рабочая нагрузка (регионы) -------------------------------------------------
     logger.info("🔧 Настраиваем рабочую нагрузку...")
@@ -266,7 +291,7 @@ def download_report(
         raise Exception("Не удалось настроить регионы")
 
     logger.info("✅ Рабочая нагрузка настроена успешно")
-    time.sleep(1)  # Пауза перед генерацией отчета
+    wait_for_network_idle(driver, timeout=10, fallback_sleep=1)  # перед генерацией отчета
 
     # --- 4) Excel --------------------------------------------------------------
     logger.info("📊 Все параметры настроены, генерируем отчет...")
@@ -274,4 +299,11 @@ def download_report(
 
     # Простое ожидание скачивания файла (без агрессивных попыток)
     logger.info("⏳ Ожидаем скачивание файла...")
-    return wait_download(ts, driver=driver, timeout=60)  # Нормальный таймаут
\ No newline at end of file
+    xlsx_path = wait_download(ts, driver=driver, timeout=60)  # Нормальный таймаут
+
+    if archive is not None:
+        try:
+            archive.put(key, xlsx_path, params)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить отчет в архив: {e}")
+    return xlsx_path
\ No newline at end of file
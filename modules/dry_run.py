@@ -0,0 +1,139 @@
+"""
+Модуль для плана запуска без браузера (main.py --plan).
+
+Для каждой задачи показывает, откуда будет взят результат, и оценивает длительность
+запуска по средним фазам прошлых запусков (runs/*/profile.json):
+- "кэш окна" - то же окно уже есть среди задач запуска (выгружается один раз);
+- "интервалы" - окно покрыто сохраненной детализацией дня региона (metrics_engine);
+- "архив" - отчет с теми же параметрами есть в архиве отчетов;
+- "выгрузка" - нужен браузер.
+
+Модуль не импортирует Selenium и openpyxl.
+"""
+
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from .date_time_utils import format_time_intervals
+from .metrics_engine import MetricsEngine
+from .report_archive import report_key, report_params
+from .task_planner import task_cache_key
+
+
+# === Константы ===
+SOURCE_WINDOW_CACHE = "кэш окна"
+SOURCE_INTERVALS = "интервалы"
+SOURCE_ARCHIVE = "архив"
+SOURCE_DOWNLOAD = "выгрузка"
+SOURCES = (SOURCE_WINDOW_CACHE, SOURCE_INTERVALS, SOURCE_ARCHIVE, SOURCE_DOWNLOAD)
+
+
+def classify_tasks(tasks: List[Dict[str, Any]], store=None, archive=None) -> List[str]:
+    """
+    Определяет источник результата каждой задачи так же, как task_executor.run_tasks.
+
+    Args:
+        tasks: Задачи из task_planner
+        store: ResultsStore с детализацией по интервалам (необязательно)
+        archive: ReportArchive (необязательно)
+
+    Returns:
+        List[str]: Источник (SOURCES) по задачам
+    """
+    sources: List[Optional[str]] = [None] * len(tasks)
+    first: Dict[tuple, int] = {}
+    for number, task in enumerate(tasks):
+        key = task_cache_key(task)
+        if key in first:
+            sources[number] = SOURCE_WINDOW_CACHE
+        else:
+            first[key] = number
+    unique = list(first.values())
+
+    if store is not None and unique:
+        engine = MetricsEngine.from_store(store, sorted({tasks[n]["win_start"].date() for n in unique}))
+        for number, answer in zip(unique, engine.evaluate_tasks([tasks[n] for n in unique])):
+            if answer is not None:
+                sources[number] = SOURCE_INTERVALS
+
+    for number in unique:
+        if sources[number] is not None:
+            continue
+        task = tasks[number]
+        sources[number] = SOURCE_DOWNLOAD
+        if archive is not None and archive.is_cacheable(task["win_end"]):
+            intervals = ((task["interval_from"], task["interval_to"]) if "interval_from" in task
+                         else format_time_intervals(task["win_start"], task["win_end"]))
+            params = report_params(task["workload_params"], task["win_start"], task["win_end"], intervals)
+            if archive.contains(report_key(params)):
+                sources[number] = SOURCE_ARCHIVE
+    return sources
+
+
+def estimate_duration(counts: Dict[str, int], history: Dict[str, float],
+                      tabs: int = 1, parsers: int = 0) -> Optional[float]:
+    """
+    Оценивает длительность выполнения задач по средним фазам прошлых запусков.
+
+    Args:
+        counts: Количество задач по источникам
+        history: Средние длительности фаз (run_profile.load_phase_history)
+        tabs: Количество вкладок
+        parsers: Размер пула разбора (0 - разбор в потоке браузера)
+
+    Returns:
+        Optional[float]: Секунды или None, если истории выгрузок нет
+    """
+    download_s = history.get("download_report")
+    if download_s is None:
+        return None
+    parse_s = history.get("calc_metrics", history.get("parse_report", 0.0))
+
+    browser = counts[SOURCE_DOWNLOAD] * download_s / max(tabs, 1)
+    # Отчеты из архива не требуют браузера, но разбираются так же
+    parse = (counts[SOURCE_DOWNLOAD] + counts[SOURCE_ARCHIVE]) * parse_s
+    if tabs > 1 or parsers > 0:
+        # Разбор идет параллельно с выгрузкой - длительность задает более медленная стадия
+        return max(browser, parse / max(parsers, tabs))
+    return browser + parse
+
+
+def print_plan(tasks: List[Dict[str, Any]], sources: List[str], history: Dict[str, float],
+               tabs: int = 1, parsers: int = 0) -> Dict[str, int]:
+    """
+    Печатает список задач, ожидаемые попадания в кэш и оценку длительности.
+
+    Args:
+        tasks: Задачи из task_planner
+        sources: Источники из classify_tasks
+        history: Средние длительности фаз прошлых запусков
+        tabs: Количество вкладок
+        parsers: Размер пула разбора
+
+    Returns:
+        Dict[str, int]: Количество задач по источникам
+    """
+    print(f"{'#':>5}  {'Номер массовой':<20} {'Регион':<24} {'Окно':<24} Источник")
+    for number, (task, source) in enumerate(zip(tasks, sources), start=1):
+        window = f"{task['win_start']:%d.%m.%Y %H:%M}-{task['win_end']:%H:%M}"
+        print(f"{number:>5}  {str(task['mass_number']):<20} {str(task['region'])[:24]:<24} {window:<24} {source}")
+
+    counts = Counter({source: 0 for source in SOURCES})
+    counts.update(sources)
+    hits = len(tasks) - counts[SOURCE_DOWNLOAD]
+    print()
+    print(f"Задач: {len(tasks)}, уникальных окон: {len(tasks) - counts[SOURCE_WINDOW_CACHE]}")
+    print("Источники: " + ", ".join(f"{source} - {counts[source]}" for source in SOURCES))
+    if tasks:
+        print(f"Ожидаемые попадания в кэш: {hits} ({hits / len(tasks):.0%}), выгрузок браузером: {counts[SOURCE_DOWNLOAD]}")
+
+    estimate = estimate_duration(counts, history, tabs=tabs, parsers=parsers)
+    if estimate is None:
+        print("Оценка длительности недоступна: нет профилей прошлых запусков (runs/*/profile.json)")
+    else:
+        parse_s = history.get("calc_metrics", history.get("parse_report", 0.0))
+        print(f"Оценка длительности: ~{timedelta(seconds=round(estimate))} "
+              f"(выгрузка {history['download_report']:.1f}с, разбор {parse_s:.2f}с в среднем; "
+              f"вкладок {tabs}, процессов разбора {parsers})")
+    return dict(counts)
@@ -11,6 +11,8 @@ from loguru import logger
 import time
 import os
 
+from .network_idle import get_network_tracker
+
 
 class ExcelExporter:
     """Класс для экспорта отчета в Excel"""
@@ -116,6 +118,10 @@ class ExcelExporter:
             except:
                 self.logger.warning("⚠️ Страница не загрузилась полностью, продолжаем...")
 
+            # Затем ждем окончания запросов отчета: обычно кнопка экспорта находится с первой проверки
+            if get_network_tracker(self.driver).wait_for_idle(idle_ms=1000, timeout=timeout):
+                self.logger.info("✅ Сетевые запросы отчета завершены")
+
             # Проверяем каждые 5 секунд в течение timeout
             check_interval = 5
             max_checks = timeout // check_interval
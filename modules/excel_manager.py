@@ -7,8 +7,14 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime, date
 from loguru import logger
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+from .date_time_utils import parse_datetime_series
+
+
+def _load_workbook(path: Path):
+    """Открывает книгу openpyxl (стек записи Excel загружается только при записи)."""
+    from openpyxl import load_workbook
+    return load_workbook(path)
 
 
 def get_date_from_first_row(df: pd.DataFrame) -> date:
@@ -25,22 +31,9 @@ def get_date_from_first_row(df: pd.DataFrame) -> date:
         logger.error("❌ Колонка 'ДатаБезВремени' не найдена в данных")
         raise ValueError("Колонка 'ДатаБезВремени' обязательна для автоматического определения даты")
 
-    # Получаем первую непустую дату
-    first_date = None
-    for idx, row in df.iterrows():
-        date_value = row['ДатаБезВремени']
-        if pd.notna(date_value) and str(date_value).strip() != '':
-            try:
-                if isinstance(date_value, str):
-                    first_date = datetime.strptime(date_value, "%d.%m.%Y").date()
-                elif isinstance(date_value, datetime):
-                    first_date = date_value.date()
-                else:
-                    first_date = pd.to_datetime(date_value).date()
-                break
-            except Exception as e:
-                logger.warning(f"⚠️ Не удалось распарсить дату '{date_value}' в строке {idx}: {e}")
-                continue
+    # Первая распознанная дата - одним векторным проходом вместо перебора строк
+    valid_dates = normalize_date_column(df['ДатаБезВремени']).dropna()
+    first_date = valid_dates.iloc[0] if not valid_dates.empty else None
 
     if first_date is None:
         logger.error("❌ Не найдена валидная дата в колонке 'ДатаБезВремени'")
@@ -63,44 +56,11 @@ def filter_problems_by_date(df: pd.DataFrame, target_date: date) -> pd.DataFrame
     """
     logger.info(f"🔍 Фильтруем проблемы для даты {target_date.strftime('%d.%m.%Y')}")
 
-    # Преобразуем target_date в строку для сравнения
-    target_date_str = target_date.strftime('%d.%m.%Y')
-
-    # ОТЛАДКА: Показываем первые несколько значений дат
-    logger.info(f"🔍 Ищем дату: '{target_date_str}'")
-    logger.info(f"🔍 Первые 5 значений в колонке 'ДатаБезВремени':")
-    for idx, date_val in df['ДатаБезВремени'].head(5).items():
-        logger.info(f"   Строка {idx}: '{date_val}' (тип: {type(date_val)})")
-
-    # Улучшенная фильтрация по дате с учетом разных форматов
-    def normalize_date(date_val):
-        """Нормализует дату к строковому формату DD.MM.YYYY"""
-        if pd.isna(date_val):
-            return None
-
-        try:
-            if isinstance(date_val, str):
-                # Если это строка, пробуем распарсить
-                return datetime.strptime(date_val, "%d.%m.%Y").strftime("%d.%m.%Y")
-            elif isinstance(date_val, datetime):
-                # Если это datetime объект
-                return date_val.strftime("%d.%m.%Y")
-            elif isinstance(date_val, date):
-                # Если это date объект
-                return date_val.strftime("%d.%m.%Y")
-            else:
-                # Пробуем pandas to_datetime
-                parsed_date = pd.to_datetime(date_val)
-                return parsed_date.strftime("%d.%m.%Y")
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось нормализовать дату '{date_val}': {e}")
-            return str(date_val)
-
-    # Нормализуем даты в DataFrame
-    normalized_dates = df['ДатаБезВремени'].apply(normalize_date)
-
-        # Создаем фильтр по дате
-    date_filter = normalized_dates == target_date_str
+    # Колонка уже распарсена в parse_datetime_columns (datetime64) - сравниваем маской
+    dates = df['ДатаБезВремени']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = parse_datetime_series(dates, "%d.%m.%Y")
+    date_filter = dates.dt.normalize() == pd.Timestamp(target_date)
 
     # Применяем фильтр по дате
     filtered_df = df[date_filter].copy()
@@ -112,12 +72,11 @@ def filter_problems_by_date(df: pd.DataFrame, target_date: date) -> pd.DataFrame
         logger.info(f"🔍 Все уникальные даты в файле:")
         unique_dates = df['ДатаБезВремени'].dropna().unique()
         for date_val in unique_dates[:10]:  # Показываем первые 10
-            logger.info(f"   '{date_val}' (тип: {type(date_val)})")
+            logger.info(f"   '{date_val}'")
     else:
         logger.info(f"✅ Проблемы для обработки:")
-        for idx, row in filtered_df.iterrows():
-            date_str = row['ДатаБезВремени'] if pd.notna(row['ДатаБезВремени']) else 'N/A'
-            logger.info(f"   📋 {row['Номер массовой']} - {row['Регион']} (дата: {date_str})")
+        for mass_number, region in zip(filtered_df['Номер массовой'], filtered_df['Регион']):
+            logger.info(f"   📋 {mass_number} - {region} (дата: {target_date.strftime('%d.%m.%Y')})")
 
     return filtered_df
 
@@ -183,7 +142,7 @@ def save_results_to_excel(
 
     try:
         # Загружаем рабочую книгу
-        workbook = load_workbook(original_file_path)
+        workbook = _load_workbook(original_file_path)
 
         # Создаем или получаем лист для результатов
         sheet_name = f"Результаты_{target_date.strftime('%d_%m_%Y')}"
@@ -322,7 +281,7 @@ def save_single_result_to_original_file(
 
     try:
         # Загружаем рабочую книгу
-        workbook = load_workbook(original_file_path)
+        workbook = _load_workbook(original_file_path)
         report_sheet = workbook["Отчет"]
 
         # Проверяем есть ли колонки "Потерянные" и "Превышение"
@@ -396,4 +355,171 @@ def save_single_result_to_original_file(
 
     except Exception as e:
         logger.error(f"❌ Ошибка при сохранении результата для {mass_number}: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def normalize_date_column(series: pd.Series) -> pd.Series:
+    """
+    Приводит колонку дат ("ДатаБезВремени") к объектам date.
+
+    Args:
+        series: Колонка со строками DD.MM.YYYY и/или datetime
+
+    Returns:
+        pd.Series: Колонка date (NaT для нераспознанных значений)
+    """
+    parsed = parse_datetime_series(series, "%d.%m.%Y")
+    return parsed.dt.date
+
+
+def get_pending_dates(df: pd.DataFrame) -> List[date]:
+    """
+    Возвращает даты, для которых в Своде есть строки без результатов.
+
+    Args:
+        df: DataFrame с данными Свода
+
+    Returns:
+        List[date]: Отсортированный список дат
+    """
+    if "ДатаБезВремени" not in df.columns:
+        raise ValueError("Колонка 'ДатаБезВремени' обязательна для поиска незаполненных дат")
+
+    empty = pd.Series(True, index=df.index)
+    for column in ("Потерянные", "Превышение"):
+        if column in df.columns:
+            empty &= df[column].isna()
+    # Строка без результатов - если пусты обе колонки (или их еще нет)
+    dates = normalize_date_column(df.loc[empty, "ДатаБезВремени"]).dropna()
+    pending = sorted(set(dates))
+
+    logger.info(f"📅 Даты с незаполненными результатами: {[d.strftime('%d.%m.%Y') for d in pending]}")
+    return pending
+
+
+def _cell_date(value) -> Optional[date]:
+    """Дата из ячейки "ДатаБезВремени" (datetime, date или строка DD.MM.YYYY)."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None:
+        return None
+    text = str(value).strip()
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _find_result_columns(sheet) -> Dict[str, Optional[int]]:
+    """Находит колонки "Номер массовой", "ДатаБезВремени", "Потерянные", "Превышение", "Всего жалоб" и "Жалоб по региону"."""
+    columns = {"mass_number": None, "date": None, "lost": None, "excess": None, "complaints": None,
+               "region_complaints": None}
+    for col in range(1, sheet.max_column + 1):
+        header = sheet.cell(row=1, column=col).value
+        if not header:
+            continue
+        header_str = str(header).strip().lower()
+        if "потерянн" in header_str:
+            columns["lost"] = col
+        elif "превышен" in header_str:
+            columns["excess"] = col
+        elif "жалоб" in header_str and "регион" in header_str:
+            columns["region_complaints"] = col
+        elif "жалоб" in header_str:
+            columns["complaints"] = col
+        elif "номер" in header_str and "массовой" in header_str:
+            columns["mass_number"] = col
+        elif header_str == "датабезвремени":
+            columns["date"] = col
+    return columns
+
+
+def save_results_batch_to_original_file(results: List[Dict[str, Any]], original_file_path: Path) -> int:
+    """
+    Сохраняет пачку результатов в исходный Excel файл за одно открытие/сохранение книги.
+
+    Строка листа определяется по индексу строки DataFrame (row_index + 2: заголовок
+    и нумерация с 1) с проверкой номера массовой и даты ("date", если передана);
+    если строка не совпала, она ищется по (номер массовой, ДатаБезВремени). Одна
+    массовая бывает в строках нескольких дат - неоднозначная строка пропускается
+    с ошибкой, а не пишется наугад. Записываются только переданные значения: "lost",
+    "excess", "complaints" (колонка "Всего жалоб") и/или "region_complaints"
+    (колонка "Жалоб по региону").
+
+    Args:
+        results: Список словарей {"row_index", "mass_number", "date", "lost", "excess", "complaints",
+            "region_complaints"}
+        original_file_path: Путь к исходному Excel файлу
+
+    Returns:
+        int: Количество записанных строк
+    """
+    if not results:
+        return 0
+
+    logger.info(f"💾 Сохраняем пачку из {len(results)} результатов в {original_file_path}")
+
+    workbook = _load_workbook(original_file_path)
+    report_sheet = workbook["Отчет"]
+    columns = _find_result_columns(report_sheet)
+
+    if columns["mass_number"] is None:
+        logger.error("❌ Не найдена колонка с номером массовой")
+        return 0
+
+    headers = {"lost": "Потерянные", "excess": "Превышение", "complaints": "Всего жалоб",
+               "region_complaints": "Жалоб по региону"}
+    fields = [field for field in headers if any(field in result for result in results)]
+    for field in fields:
+        if columns[field] is None:
+            columns[field] = report_sheet.max_column + 1
+            report_sheet.cell(row=1, column=columns[field], value=headers[field])
+            logger.info(f"➕ Добавлена колонка '{headers[field]}' в позицию {columns[field]}")
+
+    def row_key(row: int, with_date: bool):
+        mass_number = str(report_sheet.cell(row=row, column=columns["mass_number"]).value)
+        if not with_date:
+            return mass_number
+        return mass_number, _cell_date(report_sheet.cell(row=row, column=columns["date"]).value)
+
+    rows_by_key = None
+    written = 0
+    for result in results:
+        mass_number = str(result["mass_number"])
+        result_date = _cell_date(result.get("date"))
+        with_date = result_date is not None and columns["date"] is not None
+        key = (mass_number, result_date) if with_date else mass_number
+        target_row = int(result["row_index"]) + 2
+
+        if row_key(target_row, with_date) != key:
+            # Книга изменилась с момента чтения - ищем по номеру массовой и дате
+            if rows_by_key is None:
+                rows_by_key = {}
+                for row in range(2, report_sheet.max_row + 1):
+                    rows_by_key.setdefault(row_key(row, False), []).append(row)
+                    if columns["date"] is not None:
+                        rows_by_key.setdefault(row_key(row, True), []).append(row)
+            candidates = rows_by_key.get(key, [])
+            if len(candidates) != 1:
+                reason = "не найдена" if not candidates else f"неоднозначна ({len(candidates)} строк)"
+                logger.error(f"❌ Строка массовой {mass_number}"
+                             f"{f' за {result_date:%d.%m.%Y}' if result_date else ''} {reason} - пропускаем")
+                continue
+            target_row = candidates[0]
+
+        for field in fields:
+            if field in result:
+                report_sheet.cell(row=target_row, column=columns[field], value=result[field])
+        written += 1
+
+    try:
+        workbook.save(original_file_path)
+    except PermissionError:
+        logger.error(f"❌ ОШИБКА ДОСТУПА: Файл {original_file_path} заблокирован (открыт в Excel?)")
+        raise
+
+    logger.info(f"✅ Пачка результатов сохранена: {written}/{len(results)} строк")
+    return written
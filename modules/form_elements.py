@@ -1,8 +1,27 @@
 """
 Модуль для определения элементов формы отчета
 Использует data-parametername атрибуты для точного поиска полей
+
+Id элементов ReportViewer (ReportViewerControl_ctl04_ctlNN) меняются при правке отчета,
+поэтому селекторы по умолчанию перекрываются картой формы (form_map.json), которую
+строит PageAnalyzer.build_form_map.
 """
 
+import json
+from pathlib import Path
+
+
+# === Константы ===
+BASE_DIR = Path(__file__).resolve().parent.parent
+FORM_MAP_PATH = BASE_DIR / "form_map.json"
+FORM_MAP_VERSION = 1
+
+
+def _normalize_label(text):
+    """Подпись параметра без неразрывных и повторных пробелов"""
+    return " ".join((text or "").replace("\u00a0", " ").split())
+
+
 class FormElements:
     """Класс для определения элементов формы по ID (на основе диагностики)"""
 
@@ -22,6 +41,14 @@ class FormElements:
         'reason_checkbox': '#ReportViewerControl_ctl04_ctl23_divDropDown_ctl372',       # Чекбокс "Низкая скорость в 3G/4G"
     }
 
+    # Подписи параметров в форме (ключи карты формы)
+    PARAMETER_LABELS = {
+        'period_dropdown': 'Период отчета',
+        'start_date_field': 'Дата начала',
+        'end_date_field': 'Дата окончания',
+        'reason_field': 'Причина обращения',
+    }
+
     # Значения для периода отчета
     PERIOD_VALUES = {
         'произвольный': '900'
@@ -35,6 +62,81 @@ class FormElements:
 
     # Значение для причины обращения
     REASON_VALUE = 'Низкая скорость в 3G/4G'
+    # Полный текст label'а причины в выпадающем списке (выбор идет по тексту, не по id ctlNNN)
+    REASON_LABEL = 'Интернет >> Низкая скорость в 3G/4G'
+
+    def __init__(self):
+        # Копии селекторов: карта формы перекрывает их у экземпляра, не у класса
+        self.ELEMENT_SELECTORS = dict(self.ELEMENT_SELECTORS)
+        self.DROPDOWN_SELECTORS = dict(self.DROPDOWN_SELECTORS)
+        self.form_map = None
+
+    def load_form_map(self, path=FORM_MAP_PATH):
+        """
+        Загрузить сохраненную карту формы и применить ее селекторы.
+
+        Returns:
+            bool: True - карта загружена и содержит все параметры (файла нет или версия другая - False)
+        """
+        path = Path(path)
+        if not path.exists():
+            return False
+        form_map = json.loads(path.read_text(encoding='utf-8'))
+        if form_map.get('version') != FORM_MAP_VERSION:
+            return False
+        return self.apply_form_map(form_map)
+
+    def find_parameter(self, label, form_map=None):
+        """Найти параметр карты по подписи: точное совпадение, иначе единственное вхождение"""
+        parameters = (form_map or self.form_map or {}).get('parameters', {})
+        label = _normalize_label(label)
+        by_label = {_normalize_label(text): info for text, info in parameters.items()}
+        if label in by_label:
+            return by_label[label]
+        candidates = [info for text, info in by_label.items() if label in text]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def apply_form_map(self, form_map):
+        """
+        Применить карту формы: селекторы полей, dropdown и кнопки отправки.
+
+        Args:
+            form_map: Карта из PageAnalyzer.build_form_map
+
+        Returns:
+            bool: True - в карте найдены все параметры формы
+        """
+        complete = True
+        for element_name, label in self.PARAMETER_LABELS.items():
+            info = self.find_parameter(label, form_map)
+            if not info or not info.get('id'):
+                complete = False
+                continue
+            if info.get('tag') == 'select':
+                self.ELEMENT_SELECTORS[element_name] = f"#{info['id']}"
+            else:
+                self.ELEMENT_SELECTORS[element_name] = f'input[name="{info["name"] or info["id"]}"]'
+
+        reason = self.find_parameter(self.PARAMETER_LABELS['reason_field'], form_map)
+        if reason and reason.get('dropdown_toggle'):
+            self.DROPDOWN_SELECTORS['reason_dropdown_toggle'] = f"#{reason['dropdown_toggle']}"
+            if reason.get('checkboxes'):
+                self.DROPDOWN_SELECTORS['reason_select_all'] = f"#{reason['checkboxes'][0]['id']}"
+        else:
+            complete = False
+
+        if form_map.get('submit_button'):
+            self.ELEMENT_SELECTORS['submit_button'] = f"#{form_map['submit_button']}"
+        else:
+            complete = False
+
+        self.form_map = form_map
+        return complete
+
+    def reason_checkboxes(self):
+        """Чекбоксы списка причин из карты формы: [{id, text}] (пусто - карты нет)"""
+        reason = self.find_parameter(self.PARAMETER_LABELS['reason_field'])
+        return reason.get('checkboxes', []) if reason else []
 
     def get_element_selector(self, element_name):
         """Получить селектор элемента по имени"""
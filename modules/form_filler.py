@@ -4,12 +4,14 @@
 
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from loguru import logger
 import time
 
+from .form_elements import FORM_MAP_PATH
+from .page_analyzer import PageAnalyzer
+
 
 class FormFiller:
     """Класс для заполнения формы отчета"""
@@ -29,11 +31,97 @@ class FormFiller:
         "]"
     )
 
+    # Индекс чекбоксов списка причин: id, текст label'а, состояние
+    INDEX_REASONS_JS = """
+        const root = arguments[0];
+        const norm = (t) => (t || '').replace(/\\u00a0/g, ' ').replace(/\\s+/g, ' ').trim();
+        return Array.from(root.querySelectorAll("input[type='checkbox']")).map(cb => {
+            let label = cb.id ? root.querySelector("label[for='" + cb.id + "']") : null;
+            if (!label && cb.parentElement) label = cb.parentElement.querySelector('label');
+            return {id: cb.id, text: norm(label ? label.textContent : ''), checked: cb.checked};
+        });
+    """
+
+    # Выбор причин по тексту: нужные отмечаются, остальные снимаются ("Выделить все" не трогаем)
+    SELECT_REASONS_JS = """
+        const root = arguments[0];
+        const wanted = new Set(arguments[1]);
+        const norm = (t) => (t || '').replace(/\\u00a0/g, ' ').replace(/\\s+/g, ' ').trim();
+        const found = new Set();
+        let toggled = 0;
+        for (const cb of root.querySelectorAll("input[type='checkbox']")) {
+            let label = cb.id ? root.querySelector("label[for='" + cb.id + "']") : null;
+            if (!label && cb.parentElement) label = cb.parentElement.querySelector('label');
+            const text = norm(label ? label.textContent : '');
+            if (!text || text.includes('Выделить все') || text.includes('Select All')) continue;
+            const want = wanted.has(text);
+            if (want) found.add(text);
+            if (cb.checked !== want) { cb.click(); toggled++; }
+        }
+        return {
+            selected: Array.from(found),
+            missing: Array.from(wanted).filter(t => !found.has(t)),
+            toggled: toggled
+        };
+    """
+
     def __init__(self, driver, logger, iframe_handler, form_elements):
         self.driver = driver
         self.logger = logger
         self.iframe_handler = iframe_handler
         self.form_elements = form_elements
+        self._reason_index = None
+        self.load_form_map()
+
+    def load_form_map(self, path=FORM_MAP_PATH):
+        """Загрузить карту формы при старте (если ее нет - селекторы по умолчанию до первого промаха)"""
+        try:
+            if self.form_elements.load_form_map(path):
+                self.logger.info(f"🗺️ Карта формы загружена: {path}")
+                return True
+        except Exception as e:
+            self.logger.warning(f"⚠️ Не удалось прочитать карту формы {path}: {e}")
+        return False
+
+    def refresh_form_map(self, path=FORM_MAP_PATH):
+        """
+        Перестроить карту формы по текущей странице (контекст - iframe формы).
+
+        Returns:
+            bool: True - карта перестроена и применена
+        """
+        self.logger.info("🗺️ Селектор не сработал - перестраиваем карту формы...")
+        form_map = PageAnalyzer(self.driver, self.logger).generate_form_map(path)
+        if not form_map:
+            return False
+        self.form_elements.apply_form_map(form_map)
+        # Список причин мог измениться вместе с формой
+        self._reason_index = None
+        return True
+
+    def _find_form_element(self, element_name, finder=None, dropdown=False):
+        """
+        Найти элемент формы по селектору из карты; при промахе - перестроить карту и повторить.
+
+        Args:
+            element_name: Ключ ELEMENT_SELECTORS (или DROPDOWN_SELECTORS при dropdown=True)
+            finder: Функция поиска по селектору (по умолчанию find_element_in_iframe)
+            dropdown: Искать селектор среди селекторов выпадающих списков
+
+        Returns:
+            WebElement или None
+        """
+        finder = finder or self.iframe_handler.find_element_in_iframe
+        get_selector = (self.form_elements.get_dropdown_selector if dropdown
+                        else self.form_elements.get_element_selector)
+
+        selector = get_selector(element_name)
+        element = finder(selector) if selector else None
+        if element is None and self.refresh_form_map():
+            new_selector = get_selector(element_name)
+            if new_selector and new_selector != selector:
+                element = finder(new_selector)
+        return element
 
     def set_report_period(self, period_name='произвольный'):
         """Установить период отчета"""
@@ -46,8 +134,9 @@ class FormFiller:
 
             try:
                 # Ищем поле периода отчета с диагностикой
-                period_selector = self.form_elements.get_element_selector('period_dropdown')
-                period_field = self.iframe_handler.find_element_with_diagnostics(period_selector)
+                period_field = self._find_form_element(
+                    'period_dropdown', finder=self.iframe_handler.find_element_with_diagnostics
+                )
 
                 if not period_field:
                     self.logger.error("❌ Поле периода отчета не найдено")
@@ -80,8 +169,7 @@ class FormFiller:
                 self.logger.info("🔍 Проверяем готовность элементов после postback...")
 
                 # Проверяем, что поля дат стали доступными
-                start_date_selector = self.form_elements.get_element_selector('start_date_field')
-                start_date_field = self.iframe_handler.find_element_in_iframe(start_date_selector)
+                start_date_field = self._find_form_element('start_date_field')
 
                 if start_date_field and not start_date_field.get_attribute('disabled') and 'aspNetDisabled' not in start_date_field.get_attribute('class'):
                     self.logger.info("✅ Поля дат разблокированы после выбора периода")
@@ -104,8 +192,8 @@ class FormFiller:
                 pass
             return False
 
-    def set_start_date(self):
-        """Установить дату начала"""
+    def set_start_date(self, start_date=None):
+        """Установить дату начала (ДД.ММ.ГГГГ; по умолчанию - тестовая дата)"""
         try:
             self.logger.info("📅 Устанавливаем дату начала")
 
@@ -115,15 +203,15 @@ class FormFiller:
 
             try:
                 # Ищем поле даты начала
-                start_date_selector = self.form_elements.get_element_selector('start_date_field')
-                start_date_field = self.iframe_handler.find_element_in_iframe(start_date_selector)
+                start_date_field = self._find_form_element('start_date_field')
 
                 if not start_date_field:
                     self.logger.error("❌ Поле даты начала не найдено")
                     return False
 
-                # Получаем тестовую дату
-                start_date = self.form_elements.get_test_date('start_date')
+                # Дата задания или тестовая дата
+                if not start_date:
+                    start_date = self.form_elements.get_test_date('start_date')
 
                 # Используем JavaScript для установки значения (поле имеет кастомные обработчики)
                 self.logger.info(f"📝 Устанавливаем дату через JavaScript: {start_date}")
@@ -139,7 +227,9 @@ class FormFiller:
 
                 # После postback ищем элемент заново (избегаем stale element reference)
                 self.logger.info("🔍 Ищем элемент даты начала заново после postback...")
-                start_date_field = self.iframe_handler.find_element_in_iframe(start_date_selector)
+                start_date_field = self.iframe_handler.find_element_in_iframe(
+                    self.form_elements.get_element_selector('start_date_field')
+                )
                 if not start_date_field:
                     self.logger.error("❌ Элемент даты начала не найден после postback")
                     return False
@@ -166,8 +256,8 @@ class FormFiller:
                 pass
             return False
 
-    def set_end_date(self):
-        """Установить дату окончания"""
+    def set_end_date(self, end_date=None):
+        """Установить дату окончания (ДД.ММ.ГГГГ; по умолчанию - тестовая дата)"""
         try:
             self.logger.info("📅 Устанавливаем дату окончания")
 
@@ -177,15 +267,15 @@ class FormFiller:
 
             try:
                 # Ищем поле даты окончания
-                end_date_selector = self.form_elements.get_element_selector('end_date_field')
-                end_date_field = self.iframe_handler.find_element_in_iframe(end_date_selector)
+                end_date_field = self._find_form_element('end_date_field')
 
                 if not end_date_field:
                     self.logger.error("❌ Поле даты окончания не найдено")
                     return False
 
-                # Получаем тестовую дату
-                end_date = self.form_elements.get_test_date('end_date')
+                # Дата задания или тестовая дата
+                if not end_date:
+                    end_date = self.form_elements.get_test_date('end_date')
 
                 # Используем JavaScript для установки значения (поле имеет кастомные обработчики)
                 self.logger.info(f"📝 Устанавливаем дату через JavaScript: {end_date}")
@@ -217,8 +307,17 @@ class FormFiller:
                 pass
             return False
 
-    def set_reason(self):
-        """Установить причину обращения через выпадающий список с чекбоксами"""
+    def set_reason(self, reasons=None):
+        """
+        Установить причины обращения через выпадающий список с чекбоксами.
+
+        reasons - тексты label'ов (например, 'Интернет >> Низкая скорость в 3G/4G');
+        по умолчанию - одна причина "Низкая скорость в 3G/4G". Список индексируется
+        одним скриптом за сессию, выбор причин - еще одним скриптом.
+        """
+        if not reasons:
+            reasons = [self.form_elements.REASON_LABEL]
+
         try:
             self.logger.info("🔍 Устанавливаем причину обращения")
 
@@ -227,13 +326,8 @@ class FormFiller:
                 return False
 
             try:
-                # 1. Сначала нажимаем на кнопку выпадающего списка
-                dropdown_toggle_selector = self.form_elements.get_dropdown_selector('reason_dropdown_toggle')
-                if not dropdown_toggle_selector:
-                    self.logger.error("❌ Селектор кнопки выпадающего списка не найден")
-                    return False
-
-                dropdown_toggle = self.iframe_handler.find_element_in_iframe(dropdown_toggle_selector)
+                # 1. Открываем выпадающий список
+                dropdown_toggle = self._find_form_element('reason_dropdown_toggle', dropdown=True)
                 if not dropdown_toggle:
                     self.logger.error("❌ Кнопка выпадающего списка не найдена")
                     return False
@@ -241,95 +335,47 @@ class FormFiller:
                 self.logger.info("📋 Открываем выпадающий список причины обращения...")
                 dropdown_toggle.click()
 
-                # Ждем появления выпадающего списка
-                time.sleep(2)
-
-                # 2. Теперь нажимаем "Выделить все" чтобы снять все галочки
-                select_all_selector = self.form_elements.get_dropdown_selector('reason_select_all')
-                if not select_all_selector:
-                    self.logger.error("❌ Селектор 'Выделить все' не найден")
-                    return False
-
-                # Пробуем найти чекбокс "Выделить все"
-                select_all_checkbox = self.iframe_handler.find_element_in_iframe(select_all_selector)
-                if not select_all_checkbox:
-                    self.logger.warning("⚠️ Чекбокс 'Выделить все' не найден по селектору, пробуем найти по тексту...")
-
-                    # Fallback: ищем по тексту "Выделить все"
-                    try:
-                        select_all_checkbox = self.iframe_handler.find_element_in_iframe(
-                            ("xpath", "//input[@type='checkbox' and following-sibling::label[contains(text(), 'Выделить все')]]")
-                        )
-                        if select_all_checkbox:
-                            self.logger.info("✅ Чекбокс 'Выделить все' найден по тексту")
-                        else:
-                            self.logger.warning("⚠️ Чекбокс 'Выделить все' не найден даже по тексту, продолжаем...")
-                            # Продолжаем без снятия галочек
-                    except:
-                        self.logger.warning("⚠️ Не удалось найти 'Выделить все', продолжаем...")
-                        # Продолжаем без снятия галочек
-                else:
-                    self.logger.info("🗑️ Снимаем все галочки через 'Выделить все'...")
-                    select_all_checkbox.click()
-
-                                # Ждем применения изменений и исчезновения модального окна
-                self.logger.info("⏳ Ждем применения изменений и исчезновения модального окна...")
-
-                # Ждем исчезновения модального окна ожидания
-                wait_time = 10
-                start_time = time.time()
-                while time.time() - start_time < wait_time:
-                    try:
-                        # Ищем модальное окно ожидания
-                        modal = self.driver.find_element("xpath",
-                            "//div[contains(@class, 'wait-indicator-dialog') and contains(@class, 'in')]")
-                        if modal.is_displayed():
-                            self.logger.info("⏳ Модальное окно ожидания активно, ждем...")
-                            time.sleep(0.5)
-                            continue
-                        else:
-                            self.logger.info("✅ Модальное окно ожидания исчезло")
-                            break
-                    except:
-                        # Модальное окно не найдено - значит исчезло
-                        self.logger.info("✅ Модальное окно ожидания не найдено")
-                        break
-
-                                # Дополнительная задержка для стабилизации
-                time.sleep(2)
-                self.logger.info("✅ Готовы к выбору чекбокса")
+                # Ждем появления выпадающего списка (вместо фиксированной паузы)
+                try:
+                    WebDriverWait(self.driver, 5).until(lambda d: any(
+                        e.is_displayed() for e in d.find_elements(By.XPATH, self.DROPDOWN_XPATH)
+                    ))
+                except TimeoutException:
+                    pass
 
-                                                                                # 3. 🔍 Ищем label в dropdown (в нужном контексте)
-                self.logger.info("🔍 Ищем label в dropdown (в нужном контексте)...")
-                
                 # ВАЖНО: НЕ выходим в default_content тут — функция сама проверит оба контекста
-                root, ctx = self.get_dropdown_root(dropdown_toggle_selector)
+                root, ctx = self.get_dropdown_root(
+                    self.form_elements.get_dropdown_selector('reason_dropdown_toggle')
+                )
                 self.logger.info(f"📦 Dropdown найден в контексте: {ctx}")
-                
-                # Диагностика первых label'ов
-                try:
-                    labels = root.find_elements(By.TAG_NAME, "label")
-                    texts = [self.driver.execute_script("return arguments[0].textContent;", l).replace("\u00a0"," ").strip()
-                             for l in labels[:30]]
-                    self.logger.info(f"📋 Первые label'ы: {texts}")
-                except Exception as e:
-                    self.logger.warning(f"Диагностика label'ов не удалась: {e}")
-                
-                label = self.find_label_under_root(root)
-                if not label:
-                    self.logger.error("❌ Label 'Интернет >> Низкая скорость в 3G/4G' не найден под dropdown root")
+
+                # 2. Индекс причин: из карты формы, иначе один скрипт за сессию
+                from_map = False
+                if self._reason_index is None:
+                    self._reason_index = self.form_elements.reason_checkboxes()
+                    from_map = bool(self._reason_index)
+                    if not from_map:
+                        self._reason_index = self.index_reasons(root)
+
+                labels = self._resolve_reason_labels(reasons)
+
+                # 3. Выбор причин (один скрипт): отмечены ровно нужные, остальные сняты
+                result = self.driver.execute_script(self.SELECT_REASONS_JS, root, labels) if labels else None
+                if from_map and (result is None or result["missing"]):
+                    # Список причин в карте устарел - индексируем живой список и пробуем еще раз
+                    self._reason_index = self.index_reasons(root)
+                    labels = self._resolve_reason_labels(reasons)
+                    result = self.driver.execute_script(self.SELECT_REASONS_JS, root, labels) if labels else None
+                if result is None:
                     return False
-                
-                # кликаем по label
-                try:
-                    wait = WebDriverWait(self.driver, 5)
-                    wait.until(EC.element_to_be_clickable(label)).click()
-                    self.logger.info("✅ Label успешно выбран")
-                except Exception:
-                    self.driver.execute_script("arguments[0].click();", label)
-                    self.logger.info("✅ Label выбран через JavaScript")
-                
-                self.logger.info("✅ Причина обращения установлена: Низкая скорость в 3G/4G")
+                if result["missing"]:
+                    # Список мог измениться - переиндексируем при следующем вызове
+                    self._reason_index = None
+                    self.logger.error(f"❌ Причины не найдены в списке: {result['missing']}")
+                    return False
+
+                self.logger.info(f"✅ Причина обращения установлена: {result['selected']} "
+                                 f"(переключено чекбоксов: {result['toggled']})")
                 return True
 
             finally:
@@ -345,162 +391,29 @@ class FormFiller:
                 pass
             return False
 
-    def _find_label_in_all_iframes(self, label_xpath):
-        """Найти label во всех доступных iframe'ах"""
-        try:
-            self.logger.info("🔍 Поиск label во всех iframe'ах...")
-
-                        # Возвращаемся в основной документ для поиска всех iframe'ов
-            self.iframe_handler.switch_to_main_document()
-
-            # СНАЧАЛА ищем в main document (панель могла уехать наверх)
-            self.logger.info("🔍 Сначала ищем в main document...")
-            try:
-                label = self.driver.find_element("xpath", label_xpath)
-                if label and label.is_displayed():
-                    label_text = label.text.strip()
-                    self.logger.info(f"✅ Label найден в main document: '{label_text}'")
-
-                    # Проверяем что это нужный label
-                    if ("Интернет" in label_text or "Интернет" in label.get_attribute("innerHTML", "")) and \
-                       ("Низкая скорость" in label_text or "Низкая скорость" in label.get_attribute("innerHTML", "")) and \
-                       ("3G/4G" in label_text or "3G/4G" in label.get_attribute("innerHTML", "")):
-                        self.logger.info(f"🎯 Найден правильный label в main document!")
-                        return label
-                    else:
-                        self.logger.info(f"⚠️ Label в main document не подходит: '{label_text}'")
-            except:
-                self.logger.info("🔍 Label не найден в main document")
-
-            # Теперь ищем все iframe'ы на странице
-            iframes = self.driver.find_elements("tag name", "iframe")
-            self.logger.info(f"📋 Найдено {len(iframes)} iframe'ов на странице")
-
-            for i, iframe in enumerate(iframes):
-                try:
-                    self.logger.info(f"🔍 Проверяем iframe {i+1}/{len(iframes)}...")
-
-                    # Переключаемся на iframe
-                    self.driver.switch_to.frame(iframe)
-
-                    # Ищем label в текущем iframe
-                    try:
-                        label = self.driver.find_element("xpath", label_xpath)
-                        if label and label.is_displayed():
-                            label_text = label.text.strip()
-                            self.logger.info(f"✅ Label найден в iframe {i+1}: '{label_text}'")
-
-                            # Проверяем что это нужный label (более гибкая проверка)
-                            if ("Интернет" in label_text or "Интернет" in label.get_attribute("innerHTML", "")) and \
-                               ("Низкая скорость" in label_text or "Низкая скорость" in label.get_attribute("innerHTML", "")) and \
-                               ("3G/4G" in label_text or "3G/4G" in label.get_attribute("innerHTML", "")):
-                                self.logger.info(f"🎯 Найден правильный label в iframe {i+1}!")
-                                return label
-                            else:
-                                self.logger.info(f"⚠️ Label в iframe {i+1} не подходит: '{label_text}'")
-                                # Дополнительная диагностика
-                                try:
-                                    inner_html = label.get_attribute("innerHTML", "")
-                                    self.logger.info(f"🔍 innerHTML: '{inner_html}'")
-                                except:
-                                    pass
-                    except:
-                        # Label не найден в этом iframe
-                        pass
-
-                    # Возвращаемся в основной документ для следующего iframe
-                    self.driver.switch_to.default_content()
-
-                except Exception as e:
-                    self.logger.warning(f"⚠️ Ошибка при проверке iframe {i+1}: {e}")
-                    # Возвращаемся в основной документ
-                    try:
-                        self.driver.switch_to.default_content()
-                    except:
-                        pass
-                    continue
-
-            self.logger.warning("⚠️ Label не найден ни в одном iframe")
-            return None
-
-        except Exception as e:
-            self.logger.error(f"❌ Ошибка при поиске во всех iframe'ах: {e}")
-            # Возвращаемся в основной документ
-            try:
-                self.driver.switch_to.default_content()
-            except:
-                pass
-            return None
-
-    def _find_label_on_page(self, label_xpath):
-        """Найти label на всей странице (не только в iframe'ах)"""
-        try:
-            self.logger.info("🔍 Поиск label на всей странице...")
-
-            # Возвращаемся в основной документ
-            self.iframe_handler.switch_to_main_document()
-
-            # Ищем label на основной странице
-            try:
-                labels = self.driver.find_elements("xpath", label_xpath)
-                self.logger.info(f"📋 Найдено {len(labels)} label'ов на основной странице")
-
-                for i, label in enumerate(labels):
-                    try:
-                        if label.is_displayed():
-                            label_text = label.text.strip()
-                            self.logger.info(f"✅ Label {i+1} на основной странице: '{label_text}'")
-
-                            # Проверяем что это нужный label
-                            if ("Интернет" in label_text or "Интернет" in label.get_attribute("innerHTML", "")) and \
-                               ("Низкая скорость" in label_text or "Низкая скорость" in label.get_attribute("innerHTML", "")) and \
-                               ("3G/4G" in label_text or "3G/4G" in label.get_attribute("innerHTML", "")):
-                                self.logger.info(f"🎯 Найден правильный label на основной странице!")
-                                return label
-                            else:
-                                self.logger.info(f"⚠️ Label {i+1} не подходит: '{label_text}'")
-                                # Дополнительная диагностика
-                                try:
-                                    inner_html = label.get_attribute("innerHTML", "")
-                                    self.logger.info(f"🔍 innerHTML: '{inner_html}'")
-                                except:
-                                    pass
-                    except Exception as e:
-                        self.logger.warning(f"⚠️ Ошибка при проверке label {i+1}: {e}")
-                        continue
-
-            except Exception as e:
-                self.logger.warning(f"⚠️ Ошибка при поиске label'ов на странице: {e}")
-
-            # Если не найден, пробуем искать по более простому селектору
-            self.logger.info("🔍 Пробуем простой поиск по тексту...")
-            try:
-                all_labels = self.driver.find_elements("tag name", "label")
-                self.logger.info(f"📋 Всего label'ов на странице: {len(all_labels)}")
-
-                for i, label in enumerate(all_labels):
-                    try:
-                        if label.is_displayed():
-                            label_text = label.text.strip()
-                            if label_text and len(label_text) > 10:  # Только непустые и длинные
-                                self.logger.info(f"📝 Label {i+1}: '{label_text}'")
-
-                                # Проверяем на нужный текст
-                                if "Интернет" in label_text and "Низкая скорость" in label_text and "3G/4G" in label_text:
-                                    self.logger.info(f"🎯 Найден нужный label по простому поиску!")
-                                    return label
-                    except:
-                        continue
-
-            except Exception as e:
-                self.logger.warning(f"⚠️ Ошибка при простом поиске: {e}")
-
-            self.logger.warning("⚠️ Label не найден ни на основной странице, ни по простому поиску")
-            return None
-
-        except Exception as e:
-            self.logger.error(f"❌ Ошибка при поиске на странице: {e}")
-            return None
+    def index_reasons(self, dropdown_root):
+        """Проиндексировать все чекбоксы списка причин одним скриптом: [{id, text, checked}]"""
+        index = self.driver.execute_script(self.INDEX_REASONS_JS, dropdown_root)
+        self.logger.info(f"📋 Проиндексировано причин: {len(index)}")
+        return index
+
+    def _resolve_reason_labels(self, reasons):
+        """Сопоставить запрошенные причины с текстами label'ов: точное совпадение, иначе единственное вхождение"""
+        texts = [item["text"] for item in self._reason_index]
+        labels = []
+        for reason in reasons:
+            reason = " ".join(reason.replace("\u00a0", " ").split())
+            if reason in texts:
+                labels.append(reason)
+                continue
+            candidates = [text for text in texts if reason in text]
+            if len(candidates) != 1:
+                self.logger.error(f"❌ Причина '{reason}' не найдена однозначно (совпадений: {len(candidates)})")
+                if candidates:
+                    self.logger.info(f"   Варианты: {candidates[:10]}")
+                return None
+            labels.append(candidates[0])
+        return labels
 
     def get_dropdown_root(self, toggle_locator, timeout_open=6, timeout_find=2):
         """
@@ -597,33 +510,26 @@ class FormFiller:
             self.logger.error(f"❌ Ошибка при поиске label в dropdown: {e}")
             return None
 
-    def select_reason_label(self, toggle_in_iframe_locator):
-        """Выбрать label причины обращения"""
+    def find_label_by_text(self, dropdown_root, text):
+        """Найти label причины по точному тексту внутри контейнера dropdown"""
+        xpath = f".//label[normalize-space(translate(., '\u00A0',' '))={self._xpath_literal(text.strip())}]"
         try:
-            # 1) После «выделить все» дождаться тишины (логика invisibility — ок)
-            # 2) Критично: вернуться в корень и убедиться, что dropdown открыт
-            self.driver.switch_to.default_content()
-            self._open_dropdown_again_if_closed(toggle_in_iframe_locator)
-
-            # 3) Найти label внутри КОНТЕЙНЕРА dropdown
-            label = self._find_label_in_dropdown()
-            if not label:
-                return False
-
-            # 4) Клик по label (надёжнее, чем по input)
-            try:
-                wait = WebDriverWait(self.driver, 5)
-                wait.until(EC.element_to_be_clickable(label)).click()
-                self.logger.info("✅ Label успешно выбран")
-            except:
-                self.driver.execute_script("arguments[0].click();", label)
-                self.logger.info("✅ Label выбран через JavaScript")
-
-            return True
+            label = dropdown_root.find_element(By.XPATH, xpath)
+            self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", label)
+            return label
+        except Exception:
+            self.logger.error(f"❌ Label '{text}' не найден под dropdown root")
+            return None
 
-        except Exception as e:
-            self.logger.error(f"❌ Ошибка при выборе label: {e}")
-            return False
+    @staticmethod
+    def _xpath_literal(text):
+        """Строковый литерал XPath (текст может содержать кавычки)"""
+        if "'" not in text:
+            return f"'{text}'"
+        if '"' not in text:
+            return f'"{text}"'
+        parts = text.split("'")
+        return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
 
     def submit_report(self):
         """Отправить отчет"""
@@ -636,8 +542,9 @@ class FormFiller:
 
             try:
                 # Ищем кнопку отправки
-                submit_selector = self.form_elements.get_element_selector('submit_button')
-                submit_button = self.iframe_handler.wait_for_element_clickable(submit_selector)
+                submit_button = self._find_form_element(
+                    'submit_button', finder=self.iframe_handler.wait_for_element_clickable
+                )
 
                 if not submit_button:
                     self.logger.error("❌ Кнопка отправки не найдена или не кликабельна")
@@ -0,0 +1,141 @@
+"""
+Модуль для чтения справочника массовых проблем (замена запроса Power Query "Массовые проблемы").
+
+Повторяет шаги запроса из mass_problem.txt:
+1. Чтение листа "Массовые проблемы" (потоково, без загрузки всей книги в память)
+2. Фильтр Причина = "Блокировка по запросу регулятора"
+3. Выбор колонок Номер, Название, Заметки, Регион, Города, Статус, Причина
+4. CleanTitle - название без префикса в кавычках и без хвоста "(Смотри ..."
+5. CleanRegion - первый непустой регион из списка без суффиксов (" CDMA", " NEW", ...)
+
+Результат - таблица в именах колонок Свода ("Номер массовой", "Название", "Регион"),
+которую svod_builder присоединяет к заметкам.
+"""
+
+from pathlib import Path
+from typing import List, Optional
+import pandas as pd
+from loguru import logger
+from openpyxl import load_workbook
+
+
+# === Константы ===
+MASS_PROBLEMS_SHEET = "Массовые проблемы"
+BLOCKING_REASON = "Блокировка по запросу регулятора"
+SELECTED_COLUMNS = ["Номер", "Название", "Заметки", "Регион", "Города", "Статус", "Причина"]
+# Порядок важен: замены применяются последовательно, как List.Accumulate в CleanRegion
+REGION_SUFFIXES = [" CDMA", " NEW", " MVNO TTK", " MVNO", " LTE450", "MVNO Тест "]
+
+
+def read_mass_problems_sheet(source_path: Path, sheet_name: str = MASS_PROBLEMS_SHEET,
+                             reason: Optional[str] = BLOCKING_REASON) -> pd.DataFrame:
+    """
+    Потоково читает лист массовых проблем, оставляя только нужные колонки и строки.
+
+    Args:
+        source_path: Путь к выгрузке (xlsx)
+        sheet_name: Имя листа
+        reason: Значение "Причина" для фильтра (None - без фильтра)
+
+    Returns:
+        pd.DataFrame: Сырые строки (все значения - текст, как в запросе)
+    """
+    logger.info(f"📖 Читаем лист '{sheet_name}' из {source_path}")
+    workbook = load_workbook(source_path, read_only=True, data_only=True)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Лист '{sheet_name}' не найден в {source_path}")
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"Лист '{sheet_name}' пуст")
+        header = [str(value).strip() if value is not None else "" for value in header]
+
+        missing = [column for column in SELECTED_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"Отсутствуют колонки: {missing}")
+        positions = [header.index(column) for column in SELECTED_COLUMNS]
+        reason_pos = header.index("Причина")
+
+        # Строки не того типа отбрасываются сразу при чтении, в память попадает только нужное
+        data: List[tuple] = []
+        total = 0
+        for row in rows:
+            total += 1
+            if reason is not None and (row[reason_pos] is None or str(row[reason_pos]) != reason):
+                continue
+            data.append(tuple(row[pos] for pos in positions))
+    finally:
+        workbook.close()
+
+    logger.info(f"📊 Прочитано строк: {total}, после фильтра по причине: {len(data)}")
+    df = pd.DataFrame(data, columns=SELECTED_COLUMNS)
+    # Первая строка как текст → все колонки текстовые, пустые ячейки - NA
+    return df.astype("string")
+
+
+def clean_title(series: pd.Series) -> pd.Series:
+    """
+    Векторная версия CleanTitle.
+
+    Args:
+        series: Колонка "Название"
+
+    Returns:
+        pd.Series: Очищенные названия
+    """
+    text = series.astype("string").str.strip()
+
+    # "Префикс" Название → текст после второй кавычки; «Префикс» Название → после »
+    quoted = text.str.startswith('"', na=False)
+    text = text.mask(quoted, text.str.split('"', n=2).str[2].fillna("").str.strip())
+    guillemet = text.str.startswith("«", na=False)
+    text = text.mask(guillemet, text.str.split("»", n=1).str[1].fillna("").str.strip())
+
+    # Хвост "(Смотри ..." отрезается
+    see_also = text.str.contains("(Смотри", regex=False, na=False)
+    return text.mask(see_also, text.str.split("(Смотри", n=1, regex=False).str[0].str.strip())
+
+
+def clean_region(series: pd.Series) -> pd.Series:
+    """
+    Векторная версия CleanRegion: первый непустой регион из списка через запятую, без суффиксов.
+
+    Args:
+        series: Колонка "Регион"
+
+    Returns:
+        pd.Series: Очищенные регионы (NA, если ничего не осталось)
+    """
+    parts = series.astype("string").str.split(",").explode().str.strip()
+    for suffix in REGION_SUFFIXES:
+        parts = parts.str.replace(suffix, "", regex=False)
+    parts = parts.str.strip()
+
+    # explode сохраняет индекс строки - берем первую непустую часть каждой строки
+    first = parts[parts.notna() & (parts != "")].groupby(level=0).first()
+    return first.reindex(series.index).astype("string")
+
+
+def load_mass_problems(source_path: Path, sheet_name: str = MASS_PROBLEMS_SHEET) -> pd.DataFrame:
+    """
+    Строит таблицу массовых проблем в формате Свода (замена запроса "Массовые проблемы").
+
+    Args:
+        source_path: Путь к выгрузке (xlsx)
+        sheet_name: Имя листа
+
+    Returns:
+        pd.DataFrame: Колонки "Номер массовой", "Название", "Заметки", "Регион", "Города", "Статус", "Причина"
+    """
+    df = read_mass_problems_sheet(source_path, sheet_name)
+
+    df["Номер"] = pd.to_numeric(df["Номер"], errors="coerce").astype("Int64")
+    df["Заметки"] = pd.to_numeric(df["Заметки"], errors="coerce").astype("Int64")
+    df["Название"] = clean_title(df["Название"])
+    df["Регион"] = clean_region(df["Регион"]).astype("category")
+
+    df = df.rename(columns={"Номер": "Номер массовой"})
+    logger.info(f"✅ Массовые проблемы подготовлены: {len(df)} строк, регионов: {df['Регион'].nunique()}")
+    return df
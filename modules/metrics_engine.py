@@ -0,0 +1,282 @@
+"""
+Модуль для расчета метрик окон по 15-минутным интервалам без повторной выгрузки.
+
+Отчет по региону за день - это 96 строк (calc, fcst, answ) по четвертям часа, а
+lost/excess окна инцидента - свертка по непрерывному отрезку этих строк. День региона
+хранится массивами NumPy с префиксными суммами: потерянные по строке (формула
+calc_metrics) считаются один раз, а любое окно - разность двух префиксов, O(1).
+Все окна дня считаются одним векторным вызовом.
+
+Окно [Интервал от, Интервал до) - четверти от "Интервал от" включительно до
+"Интервал до" исключительно ("Интервал до" округляется вверх и является концом окна).
+Окно считается только если все его четверти есть в данных дня; иначе отчет выгружается.
+Используются только завершившиеся дни (как в архиве отчетов): детализация текущего дня,
+сохраненная раньше, неполна и устарела.
+"""
+
+import re
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+# === Константы ===
+QUARTERS_PER_DAY = 96
+PERIOD_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def lost_per_row(calc: np.ndarray, fcst: np.ndarray, answ: np.ndarray) -> np.ndarray:
+    """
+    Потерянные звонки по строкам отчета (формула calc_metrics).
+
+    Args:
+        calc: Расчетные звонки
+        fcst: Спрогнозированные звонки
+        answ: Отвеченные звонки
+
+    Returns:
+        np.ndarray: Потерянные по каждой строке
+    """
+    return np.where(
+        (calc - fcst) > 0,
+        np.where((answ - fcst) > 0, calc - answ, (calc - answ) - (fcst - answ)),
+        0
+    )
+
+
+def quarter_of(value: str) -> int:
+    """
+    Номер четверти часа (0..95) по тексту "ЧЧ:ММ" (в том числе "ЧЧ:ММ:СС" и "ЧЧ:ММ - ЧЧ:ММ").
+
+    Args:
+        value: Период строки отчета или граница интервала
+
+    Returns:
+        int: Номер четверти или -1, если время не распознано
+    """
+    match = PERIOD_RE.search(str(value))
+    if not match:
+        return -1
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        return -1
+    return hours * 4 + minutes // 15
+
+
+def window_quarters(interval_from: str, interval_to: str) -> Tuple[int, int]:
+    """
+    Переводит интервалы формы ("Интервал от", "Интервал до") в отрезок четвертей [start, end).
+
+    Args:
+        interval_from: Начало в формате HH:MM
+        interval_to: Конец в формате HH:MM ("00:00" - конец дня)
+
+    Returns:
+        Tuple[int, int]: (первая четверть, четверть после последней)
+    """
+    start = quarter_of(interval_from)
+    end = quarter_of(interval_to)
+    if end == 0:
+        end = QUARTERS_PER_DAY
+    return start, end
+
+
+class DayMetrics:
+    """Класс дня региона: массивы по 96 четвертям и их префиксные суммы"""
+
+    def __init__(self, calc: np.ndarray, fcst: np.ndarray, answ: np.ndarray, present: np.ndarray):
+        """
+        Инициализация (массивы длины QUARTERS_PER_DAY).
+
+        Args:
+            calc: Расчетные звонки по четвертям
+            fcst: Спрогнозированные звонки по четвертям
+            answ: Отвеченные звонки по четвертям
+            present: True для четвертей, которые есть в данных
+        """
+        self.calc = np.asarray(calc, dtype=float)
+        self.fcst = np.asarray(fcst, dtype=float)
+        self.answ = np.asarray(answ, dtype=float)
+        self.present = np.asarray(present, dtype=bool)
+        self.lost = lost_per_row(self.calc, self.fcst, self.answ)
+
+        # Строки префиксов: lost, calc - fcst, fcst, число имеющихся четвертей; столбец 0 - пустой префикс
+        columns = np.vstack([self.lost, self.calc - self.fcst, self.fcst, self.present.astype(float)])
+        self._prefix = np.zeros((4, QUARTERS_PER_DAY + 1))
+        np.cumsum(columns, axis=1, out=self._prefix[:, 1:])
+
+    @classmethod
+    def from_intervals(cls, intervals: pd.DataFrame) -> "DayMetrics":
+        """
+        Строит день из строк детализации (period, calc, fcst, answ) - calc_metrics_detailed
+        или таблицы intervals хранилища; повторяющиеся периоды берутся один раз.
+
+        Args:
+            intervals: Строки детализации
+
+        Returns:
+            DayMetrics: День региона
+        """
+        quarters = np.fromiter((quarter_of(p) for p in intervals["period"]), dtype=int, count=len(intervals))
+        valid = quarters >= 0
+        calc, fcst, answ = (np.zeros(QUARTERS_PER_DAY) for _ in range(3))
+        present = np.zeros(QUARTERS_PER_DAY, dtype=bool)
+
+        # Присваивание по индексу: при повторе периода остается последняя строка
+        calc[quarters[valid]] = intervals["calc"].to_numpy(dtype=float)[valid]
+        fcst[quarters[valid]] = intervals["fcst"].to_numpy(dtype=float)[valid]
+        answ[quarters[valid]] = intervals["answ"].to_numpy(dtype=float)[valid]
+        present[quarters[valid]] = True
+        return cls(calc, fcst, answ, present)
+
+    def windows(self, starts, ends) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Считает lost/excess для многих окон одним векторным вызовом.
+
+        Args:
+            starts: Первые четверти окон
+            ends: Четверти после последних (исключительно)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (lost, excess, covered) по окнам;
+                covered - все четверти окна есть в данных
+        """
+        starts = np.asarray(starts, dtype=int)
+        ends = np.asarray(ends, dtype=int)
+        sums = self._prefix[:, ends] - self._prefix[:, starts]
+        lost_sum, diff_sum, fcst_sum, present_count = sums
+
+        # Разность префиксов может отличаться от прямой суммы в последних знаках - до отсечения
+        # дробной части (int() в calc_metrics) убираем этот шум
+        lost = np.trunc(np.round(lost_sum, 6)).astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(fcst_sum != 0, diff_sum / fcst_sum, 0.0)
+        # Округление как в calc_metrics (round для float, а не np.round)
+        excess = np.array([round(float(value), 4) for value in ratio])
+        covered = (ends > starts) & (present_count == (ends - starts))
+        return lost, excess, covered
+
+    def window(self, start: int, end: int) -> Tuple[int, float]:
+        """
+        Считает lost/excess одного окна.
+
+        Args:
+            start: Первая четверть
+            end: Четверть после последней
+
+        Returns:
+            Tuple[int, float]: (lost, excess)
+        """
+        lost, excess, _ = self.windows([start], [end])
+        return int(lost[0]), float(excess[0])
+
+    def interval_rows(self, start: int, end: int) -> pd.DataFrame:
+        """
+        Детализация окна в формате calc_metrics_detailed (для сохранения в хранилище).
+
+        Args:
+            start: Первая четверть
+            end: Четверть после последней
+
+        Returns:
+            pd.DataFrame: Колонки period, calc, fcst, answ, lost
+        """
+        quarters = np.arange(start, end)
+        return pd.DataFrame({
+            "period": [f"{q // 4:02d}:{q % 4 * 15:02d}" for q in quarters],
+            "calc": self.calc[start:end],
+            "fcst": self.fcst[start:end],
+            "answ": self.answ[start:end],
+            "lost": self.lost[start:end],
+        })
+
+
+class MetricsEngine:
+    """Класс для ответа на окна задач по сохраненным дням регионов"""
+
+    def __init__(self):
+        self.days: Dict[Tuple[str, date], DayMetrics] = {}
+
+    def add_day(self, region: str, day: date, intervals: pd.DataFrame) -> DayMetrics:
+        """
+        Добавляет день региона из строк детализации.
+
+        Args:
+            region: Регион
+            day: Дата
+            intervals: Строки детализации (period, calc, fcst, answ)
+
+        Returns:
+            DayMetrics: Добавленный день
+        """
+        metrics = DayMetrics.from_intervals(intervals)
+        self.days[(str(region), day)] = metrics
+        return metrics
+
+    @classmethod
+    def from_store(cls, store, days: List[date]) -> "MetricsEngine":
+        """
+        Загружает завершившиеся дни регионов из хранилища результатов (таблица intervals).
+
+        Args:
+            store: ResultsStore
+            days: Даты, по которым нужны данные (сегодняшние и будущие пропускаются)
+
+        Returns:
+            MetricsEngine: Движок с загруженными днями
+        """
+        engine = cls()
+        days = [day for day in days if day < date.today()]
+        if not days:
+            return engine
+        rows = store.region_intervals(min(days), max(days))
+        for (region, day), group in rows.groupby(["region", "date"], sort=False):
+            engine.add_day(region, date.fromisoformat(day), group)
+        logger.info(f"🧮 Дней регионов с детализацией по интервалам: {len(engine.days)}")
+        return engine
+
+    def evaluate_tasks(self, tasks: List[Dict[str, Any]]) -> List[Optional[Tuple[int, float]]]:
+        """
+        Считает окна задач, полностью покрытые сохраненными данными (один вызов на день региона).
+
+        Args:
+            tasks: Задачи из task_planner (region, win_start, interval_from, interval_to)
+
+        Returns:
+            List[Optional[Tuple[int, float]]]: (lost, excess) или None (окно не покрыто) по задачам
+        """
+        results: List[Optional[Tuple[int, float]]] = [None] * len(tasks)
+        by_day: Dict[Tuple[str, date], List[int]] = defaultdict(list)
+        for number, task in enumerate(tasks):
+            key = (str(task["region"]), task["win_start"].date())
+            if key in self.days and task.get("interval_from") and task.get("interval_to"):
+                by_day[key].append(number)
+
+        for key, numbers in by_day.items():
+            bounds = np.array([
+                window_quarters(tasks[n]["interval_from"], tasks[n]["interval_to"]) for n in numbers
+            ]).reshape(-1, 2)
+            valid = bounds[:, 0] >= 0
+            starts = np.where(valid, bounds[:, 0], 0)
+            ends = np.where(valid, bounds[:, 1], 0)
+            lost, excess, covered = self.days[key].windows(starts, ends)
+            for n, l, e, ok in zip(numbers, lost, excess, covered & valid):
+                if ok:
+                    results[n] = (int(l), float(e))
+        return results
+
+    def interval_rows(self, task: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Детализация окна задачи из данных дня региона (для сохранения в хранилище).
+
+        Args:
+            task: Задача, для которой evaluate_tasks вернул результат
+
+        Returns:
+            pd.DataFrame: Колонки period, calc, fcst, answ, lost
+        """
+        start, end = window_quarters(task["interval_from"], task["interval_to"])
+        return self.days[(str(task["region"]), task["win_start"].date())].interval_rows(start, end)
@@ -0,0 +1,467 @@
+"""
+Модуль для параллельной выгрузки отчетов в нескольких вкладках одного браузера.
+
+Вместо отдельного Chrome на каждого воркера (300–500 МБ каждый) один браузер
+открывает K вкладок, и asyncio цикл заполняет формы отчета во всех вкладках
+одновременно через Chrome DevTools Protocol.
+
+Вкладки открываются в контексте браузера по умолчанию: они разделяют cookies
+и настройки сессии Teleopti (в том числе навыки, добавленные при запуске).
+Папка загрузок в Chromium одна на контекст браузера, поэтому скачивания не
+различаются по папкам: Browser.setDownloadBehavior (allowAndName) сохраняет каждый
+файл под его guid, событие Browser.downloadWillBegin по frameId относит guid к
+вкладке, нажавшей кнопку, а Browser.downloadProgress (completed) завершает ожидание
+этой вкладки. Готовый файл переносится в папку вкладки downloads/tab_<N>.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from .cdp_client import CdpClient, get_browser_ws_url
+from .browser_session import process_tree_rss_mb
+from .data_processing import calc_metrics_detailed
+from .date_time_utils import format_time_intervals, get_time_format_variations
+from .selenium_helpers import DOWNLOAD_DIR, REPORT_URL
+from .report_archive import get_report_archive, report_params, report_key
+from .run_profile import task_label
+
+
+# === Константы ===
+DEFAULT_TABS = 3
+FORM_READY_TIMEOUT = 30
+DOWNLOAD_TIMEOUT = 60
+INCOMING_DIR_NAME = "tabs_incoming"
+
+# JavaScript для работы с формой отчета. Форма может находиться во фрейме,
+# поэтому поиск идет по всем документам того же origin (как switch_to_report_frame).
+# XPath совпадают с используемыми в download_manager и regions.
+FORM_SCRIPT = r"""
+(function(action, arg) {
+    function collectDocs(win, docs) {
+        try {
+            docs.push(win.document);
+            for (var i = 0; i < win.frames.length; i++) {
+                collectDocs(win.frames[i], docs);
+            }
+        } catch (e) { /* фрейм другого origin */ }
+        return docs;
+    }
+    function x(doc, xpath) {
+        return doc.evaluate(xpath, doc, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    function xAll(doc, xpath) {
+        var res = doc.evaluate(xpath, doc, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var out = [];
+        for (var i = 0; i < res.snapshotLength; i++) out.push(res.snapshotItem(i));
+        return out;
+    }
+    function formDoc() {
+        var docs = collectDocs(window, []);
+        for (var i = 0; i < docs.length; i++) {
+            if (docs[i].getElementById('buttonShowExcel')) return docs[i];
+        }
+        return null;
+    }
+    function fire(el, type) {
+        var ev = (type === 'dblclick' || type === 'click')
+            ? new MouseEvent(type, {bubbles: true, cancelable: true})
+            : new Event(type, {bubbles: true});
+        el.dispatchEvent(ev);
+    }
+
+    var doc = formDoc();
+    if (action === 'ready') {
+        if (!doc || doc.readyState !== 'complete') return false;
+        var left = x(doc, "//td[contains(normalize-space(.),'Рабочая нагрузка')]/following-sibling::td//select[@multiple][1]");
+        return !!left && left.options.length > 1;
+    }
+    if (!doc) throw new Error('Форма отчета не найдена');
+
+    if (action === 'set_date') {
+        var input = x(doc, "//td[contains(normalize-space(.), '" + arg.label + "')]/following-sibling::td//input[@type='text']");
+        if (!input) throw new Error("Поле '" + arg.label + "' не найдено");
+        input.focus();
+        input.value = arg.value;
+        fire(input, 'input');
+        fire(input, 'change');
+        fire(input, 'blur');
+        return input.value;
+    }
+    if (action === 'select_interval') {
+        var sel = x(doc, "//td[contains(normalize-space(.),'" + arg.label + "')]/following-sibling::td//select");
+        if (!sel) throw new Error("Список '" + arg.label + "' не найден");
+        var index = -1;
+        for (var v = 0; v < arg.variants.length && index < 0; v++) {
+            for (var o = 0; o < sel.options.length; o++) {
+                if (sel.options[o].text.trim() === arg.variants[v]) { index = o; break; }
+            }
+        }
+        if (index < 0) index = arg.fallback_last ? sel.options.length - 1 : 0;
+        sel.selectedIndex = index;
+        fire(sel, 'change');
+        return sel.options[index] ? sel.options[index].text.trim() : null;
+    }
+    if (action === 'clear_workload') {
+        // Первая кнопка относится к навыкам - ее пропускаем
+        var buttons = xAll(doc, "//img[contains(@src, 'images/left_all_light.gif')]");
+        var button = buttons.length >= 2 ? buttons[1] : buttons[0];
+        if (!button) return false;
+        fire(button, 'click');
+        return true;
+    }
+    if (action === 'add_workload') {
+        var leftSel = x(doc, "//td[contains(normalize-space(.),'Рабочая нагрузка')]/following-sibling::td//select[@multiple][1]");
+        if (!leftSel) throw new Error("Поле 'Рабочая нагрузка' не найдено");
+        var added = [];
+        for (var r = 0; r < arg.ids.length; r++) {
+            var opt = null;
+            for (var k = 0; k < leftSel.options.length; k++) {
+                if (leftSel.options[k].value === arg.ids[r]) { opt = leftSel.options[k]; break; }
+            }
+            if (!opt) continue;
+            opt.selected = true;
+            fire(opt, 'dblclick');
+            added.push(arg.ids[r]);
+        }
+        return added;
+    }
+    if (action === 'click_excel') {
+        window.alert = function() { return true; };
+        window.confirm = function() { return true; };
+        doc.getElementById('buttonShowExcel').click();
+        return true;
+    }
+    throw new Error('Неизвестное действие: ' + action);
+})
+"""
+
+
+class MultiTabExecutor:
+    """Класс для выполнения задач выгрузки в K вкладках одного браузера"""
+
+    def __init__(self, driver, tabs: int = DEFAULT_TABS, profile=None, store=None,
+                 download_root: Path = DOWNLOAD_DIR, download_timeout: int = DOWNLOAD_TIMEOUT):
+        """
+        Инициализация исполнителя.
+
+        Args:
+            driver: WebDriver, уже подготовленный BrowserSession (CDP настройки, навыки)
+            tabs: Количество одновременно работающих вкладок
+            profile: RunProfile для записи фаз и кривой памяти
+            store: ResultsStore для сохранения результатов с детализацией
+            download_root: Папка, внутри которой создаются папки вкладок
+            download_timeout: Таймаут ожидания скачивания в секундах
+        """
+        self.driver = driver
+        self.tabs = max(1, int(tabs))
+        self.profile = profile
+        self.store = store
+        self.download_root = Path(download_root)
+        self.download_timeout = download_timeout
+
+        self.client: Optional[CdpClient] = None
+        self.tasks_done = 0
+        self.incoming_dir = self.download_root / INCOMING_DIR_NAME
+        self._tabs: List[Dict[str, Any]] = []
+        # guid скачивания -> (вкладка, предложенное имя файла)
+        self._downloads: Dict[str, Tuple[Dict[str, Any], Optional[str]]] = {}
+
+    async def _call(self, session_id: str, action: str, arg: Any = None, timeout: float = 60) -> Any:
+        """Вызывает действие FORM_SCRIPT во вкладке."""
+        expression = f"{FORM_SCRIPT}({json.dumps(action)}, {json.dumps(arg, ensure_ascii=False)})"
+        return await self.client.evaluate(expression, session_id, timeout=timeout)
+
+    async def _wait_form_ready(self, session_id: str, timeout: float = FORM_READY_TIMEOUT) -> None:
+        """Ждет, пока форма отчета загрузится (в том числе после postback)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if await self._call(session_id, "ready", timeout=10):
+                    return
+            except Exception:
+                pass  # страница перезагружается - контекст выполнения пересоздается
+            await asyncio.sleep(0.5)
+        raise TimeoutError("Форма отчета не загрузилась")
+
+    def _tab_for_frame(self, frame_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Вкладка, которой принадлежит фрейм (форма отчета может быть во фрейме)."""
+        for tab in self._tabs:
+            if frame_id in tab["frames"]:
+                return tab
+        # Фрейм не отслежен - однозначно только если скачивания ждет одна вкладка
+        waiting = [tab for tab in self._tabs if tab["download"] is not None]
+        return waiting[0] if len(waiting) == 1 else None
+
+    def _on_download_begin(self, params: Dict[str, Any]) -> None:
+        """Browser.downloadWillBegin: относит guid скачивания к вкладке."""
+        tab = self._tab_for_frame(params.get("frameId"))
+        if tab is None:
+            logger.warning(f"⚠️ Скачивание {params.get('suggestedFilename')} не относится ни к одной вкладке")
+            return
+        self._downloads[params["guid"]] = (tab, params.get("suggestedFilename"))
+
+    def _on_download_progress(self, params: Dict[str, Any]) -> None:
+        """Browser.downloadProgress: завершает ожидание вкладки по guid."""
+        state = params.get("state")
+        if state not in ("completed", "canceled") or params.get("guid") not in self._downloads:
+            return
+        tab, filename = self._downloads.pop(params["guid"])
+        future = tab["download"]
+        if future is None or future.done():
+            return
+        if state == "completed":
+            future.set_result((params["guid"], filename))
+        else:
+            future.set_exception(RuntimeError(f"Скачивание отменено браузером ({tab['name']})"))
+
+    async def _wait_tab_download(self, tab: Dict[str, Any]) -> Path:
+        """Ждет скачивание, начатое вкладкой, и переносит файл в папку вкладки."""
+        try:
+            guid, filename = await asyncio.wait_for(asyncio.shield(tab["download"]), self.download_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Download timeout ({tab['name']})")
+        finally:
+            tab["download"] = None
+
+        target = tab["download_dir"] / (Path(filename).name if filename else f"{guid}.xlsx")
+        await asyncio.to_thread((self.incoming_dir / guid).replace, target)
+        logger.info(f"✅ [{tab['name']}] EXCEL файл скачан: {target.name} (размер: {target.stat().st_size} байт)")
+        return target
+
+    async def _fill_and_download(self, tab: Dict[str, Any], task: Dict[str, Any]) -> Path:
+        """Заполняет форму отчета во вкладке и скачивает Excel (отчет за прошедший день - сначала из архива)."""
+        session_id = tab["session_id"]
+        win_start = task["win_start"]
+        win_end = task["win_end"]
+
+        if task.get("interval_from") and task.get("interval_to"):
+            start_time_str, end_time_str = task["interval_from"], task["interval_to"]
+        else:
+            start_time_str, end_time_str = format_time_intervals(win_start, win_end)
+
+        archive = get_report_archive()
+        if archive is not None and archive.is_cacheable(win_end):
+            params = report_params(task["workload_params"], win_start, win_end, (start_time_str, end_time_str))
+            key = report_key(params)
+            cached = await asyncio.to_thread(archive.get, key, tab["download_dir"])
+            if cached is not None:
+                return cached
+        else:
+            archive = None
+
+        await self.client.send("Page.navigate", {"url": REPORT_URL}, session_id=session_id)
+        await self._wait_form_ready(session_id)
+
+        # --- 1) даты ---
+        date_fmt = "%d.%m.%Y"
+        for label, value in (("Дата от", win_start.strftime(date_fmt)), ("Дата до", win_end.strftime(date_fmt))):
+            await self._call(session_id, "set_date", {"label": label, "value": value})
+            await asyncio.sleep(1)
+            await self._wait_form_ready(session_id)
+
+        # --- 2) интервалы ---
+        selected_from = await self._call(session_id, "select_interval", {
+            "label": "Интервал от",
+            "variants": get_time_format_variations(start_time_str),
+            "fallback_last": False,
+        })
+        selected_to = await self._call(session_id, "select_interval", {
+            "label": "Интервал до",
+            "variants": get_time_format_variations(end_time_str),
+            "fallback_last": True,
+        })
+        logger.info(f"⏰ [{tab['name']}] Интервалы: {selected_from} - {selected_to}")
+
+        # --- 3) рабочая нагрузка ---
+        if await self._call(session_id, "clear_workload"):
+            await asyncio.sleep(1)
+            await self._wait_form_ready(session_id)
+        added = await self._call(session_id, "add_workload", {"ids": [str(i) for i in task["workload_params"]]})
+        if not added:
+            raise Exception("Не удалось настроить регионы")
+        await asyncio.sleep(1)
+
+        # --- 4) Excel ---
+        tab["download"] = asyncio.get_running_loop().create_future()
+        await self._call(session_id, "click_excel")
+        xlsx_path = await self._wait_tab_download(tab)
+
+        if archive is not None:
+            try:
+                await asyncio.to_thread(archive.put, key, xlsx_path, params)
+            except Exception as e:
+                logger.warning(f"⚠️ [{tab['name']}] Не удалось сохранить отчет в архив: {e}")
+        return xlsx_path
+
+    async def _open_tab(self, number: int) -> Dict[str, Any]:
+        """Открывает вкладку и начинает отслеживать ее фреймы (для привязки скачиваний)."""
+        tab = await self.client.create_tab(isolated_context=False)
+        tab["name"] = f"tab_{number}"
+        tab["download_dir"] = self.download_root / tab["name"]
+        tab["download_dir"].mkdir(parents=True, exist_ok=True)
+        # id главного фрейма вкладки совпадает с targetId
+        tab["frames"] = {tab["target_id"]}
+        tab["download"] = None
+
+        tab["listeners"] = [
+            self.client.add_listener("Page.frameAttached", lambda p: tab["frames"].add(p["frameId"]),
+                                     session_id=tab["session_id"]),
+            self.client.add_listener("Page.frameNavigated", lambda p: tab["frames"].add(p["frame"]["id"]),
+                                     session_id=tab["session_id"]),
+        ]
+        self._tabs.append(tab)
+        await self.client.send("Page.enable", session_id=tab["session_id"])
+        logger.info(f"🗂️ Открыта вкладка {tab['name']} (загрузки: {tab['download_dir']})")
+        return tab
+
+    async def _close_tab(self, tab: Dict[str, Any]) -> None:
+        """Закрывает вкладку и снимает ее подписки."""
+        for listener in tab["listeners"]:
+            self.client.remove_listener(listener)
+        self._tabs.remove(tab)
+        await self.client.close_tab(tab)
+
+    async def _enable_download_events(self) -> None:
+        """Включает события скачиваний уровня браузера (файлы именуются guid)."""
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        self.client.add_listener("Browser.downloadWillBegin", self._on_download_begin)
+        self.client.add_listener("Browser.downloadProgress", self._on_download_progress)
+        await self.client.send("Browser.setDownloadBehavior", {
+            "behavior": "allowAndName",
+            "downloadPath": str(self.incoming_dir.absolute()),
+            "eventsEnabled": True,
+        })
+
+    async def _restore_download_behavior(self) -> None:
+        """Возвращает загрузки основной вкладки в DOWNLOAD_DIR (как apply_cdp_download_settings)."""
+        try:
+            await self.client.send("Browser.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": str(DOWNLOAD_DIR.absolute()),
+                "eventsEnabled": False,
+            }, timeout=10)
+        except Exception as e:
+            logger.debug(f"Не удалось восстановить настройки скачивания: {e}")
+
+    def _record_memory(self) -> None:
+        """Записывает память браузера в профиль (без пересоздания - вкладки работают параллельно)."""
+        if self.profile is None:
+            return
+        try:
+            rss_mb = process_tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            rss_mb = None
+        if rss_mb is not None:
+            self.profile.record_memory(rss_mb, self.tasks_done)
+
+    async def _worker(self, number: int, queue: asyncio.Queue, results: List[Dict[str, Any]],
+                      on_result: Optional[Callable], lock: asyncio.Lock) -> None:
+        """Обрабатывает задачи из очереди в одной вкладке."""
+        tab = await self._open_tab(number)
+        try:
+            while True:
+                try:
+                    task = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                record = {"task": task, "lost": None, "excess": None, "error": None}
+                logger.info(f"🚀 [{tab['name']}] {task['mass_number']} {task['win_start'].date()}")
+                if self.profile is not None:
+                    self.profile.start_task(task_label(task["mass_number"], task["win_start"], task["win_end"]))
+                started = time.perf_counter()
+                try:
+                    xlsx_path = await self._fill_and_download(tab, task)
+                    if self.profile is not None:
+                        self.profile.record_duration("download_report", time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    record["lost"], record["excess"], intervals = await asyncio.to_thread(calc_metrics_detailed, xlsx_path)
+                    if self.profile is not None:
+                        self.profile.record_duration("calc_metrics", time.perf_counter() - started)
+
+                    if self.store is not None:
+                        await asyncio.to_thread(
+                            self.store.upsert, task["mass_number"], task["win_start"], task["win_end"],
+                            record["lost"], record["excess"], task["region"], intervals,
+                            self.profile.run_id if self.profile is not None else None,
+                        )
+                except Exception as e:
+                    record["error"] = str(e)
+                    logger.error(f"❌ [{tab['name']}] ОШИБКА для {task['mass_number']} {task['region']}: {e}")
+
+                self.tasks_done += 1
+                if self.profile is not None:
+                    self.profile.record_task(record["error"] is None)
+                self._record_memory()
+                results.append(record)
+
+                if on_result is not None:
+                    # Сохранение результатов выполняется строго по одному
+                    async with lock:
+                        try:
+                            await asyncio.to_thread(on_result, record)
+                        except Exception as e:
+                            logger.error(f"❌ Ошибка обработки результата {task['mass_number']}: {e}")
+        finally:
+            await self._close_tab(tab)
+
+    async def run(self, tasks: List[Dict[str, Any]], on_result: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+        """
+        Выполняет задачи в K вкладках.
+
+        Args:
+            tasks: Задачи из task_planner
+            on_result: Функция, вызываемая для каждого результата
+                       ({"task", "lost", "excess", "error"}), вызовы не пересекаются
+
+        Returns:
+            List[Dict[str, Any]]: Результаты в порядке завершения
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for task in tasks:
+            queue.put_nowait(task)
+
+        tabs = min(self.tabs, len(tasks)) or 1
+        logger.info(f"🗂️ Запускаем {len(tasks)} задач в {tabs} вкладках одного браузера")
+
+        self.client = await CdpClient(get_browser_ws_url(self.driver)).connect()
+        results: List[Dict[str, Any]] = []
+        lock = asyncio.Lock()
+        try:
+            await self._enable_download_events()
+            await asyncio.gather(*[
+                self._worker(number, queue, results, on_result, lock)
+                for number in range(1, tabs + 1)
+            ])
+        finally:
+            await self._restore_download_behavior()
+            await self.client.close()
+
+        ok = sum(1 for r in results if r["error"] is None)
+        logger.info(f"🎉 Многовкладочная обработка завершена: {ok}/{len(results)} успешно")
+        return results
+
+
+def run_tasks_in_tabs(driver, tasks: List[Dict[str, Any]], tabs: int, profile=None, store=None,
+                      on_result: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+    """
+    Синхронная обертка над MultiTabExecutor.run для вызова из main.py.
+
+    Args:
+        driver: Подготовленный WebDriver
+        tasks: Задачи из task_planner
+        tabs: Количество вкладок
+        profile: RunProfile
+        store: ResultsStore (необязательно)
+        on_result: Функция для обработки каждого результата
+
+    Returns:
+        List[Dict[str, Any]]: Результаты задач
+    """
+    executor = MultiTabExecutor(driver, tabs=tabs, profile=profile, store=store)
+    return asyncio.run(executor.run(tasks, on_result=on_result))
@@ -0,0 +1,182 @@
+"""
+Модуль для отслеживания сетевой активности страницы по событиям CDP Network.
+
+События читаются инкрементально из performance лога ChromeDriver (каждый get_log
+отдает только новые записи). Трекер хранит запросы "в полете" по requestId:
+requestWillBeSent добавляет запрос, loadingFinished/loadingFailed убирают его.
+Страница считается затихшей, когда запросов в полете нет дольше idle_ms.
+
+Performance лог вычитывается при чтении, поэтому на драйвер заводится один общий
+трекер (get_network_tracker) - его используют и форма Teleopti, и экспорт отчетов.
+"""
+
+import json
+import re
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from loguru import logger
+
+
+# === Константы ===
+DEFAULT_IDLE_MS = 500
+DEFAULT_POLL_INTERVAL = 0.1
+SEEN_URLS_LIMIT = 1000
+
+
+class NetworkIdleTracker:
+    """Класс для отслеживания запросов в полете по событиям Network.*"""
+
+    def __init__(self, driver, url_filter: Optional[Callable[[str], bool]] = None):
+        """
+        Инициализация трекера.
+
+        Args:
+            driver: WebDriver с включенным performance логом (goog:loggingPrefs)
+            url_filter: Учитывать только запросы, для URL которых функция вернула True
+        """
+        self.driver = driver
+        self.url_filter = url_filter
+        self.in_flight: Dict[str, str] = {}
+        self.seen_urls = deque(maxlen=SEEN_URLS_LIMIT)
+        self.last_activity = time.monotonic()
+        self.available = True
+
+    def poll(self) -> int:
+        """
+        Вычитывает новые записи performance лога и обновляет запросы в полете.
+
+        Returns:
+            int: Количество обработанных сетевых событий
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            if self.available:
+                logger.info("ℹ️ Performance логи недоступны - сетевой трекер отключен")
+            self.available = False
+            return 0
+
+        events = 0
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method", "")
+            if not method.startswith("Network."):
+                continue
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                url = params.get("request", {}).get("url", "")
+                self.seen_urls.append(url)
+                if self.url_filter is None or self.url_filter(url):
+                    self.in_flight[request_id] = url
+                    self.last_activity = time.monotonic()
+                    events += 1
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                if self.in_flight.pop(request_id, None) is not None:
+                    self.last_activity = time.monotonic()
+                    events += 1
+        return events
+
+    def reset(self) -> None:
+        """Отбрасывает накопленные события и URL (например, перед новым действием на странице)."""
+        self.poll()
+        self.in_flight.clear()
+        self.seen_urls.clear()
+        self.last_activity = time.monotonic()
+
+    def wait_for_idle(self, idle_ms: int = DEFAULT_IDLE_MS, timeout: float = 60,
+                      poll_interval: float = DEFAULT_POLL_INTERVAL) -> bool:
+        """
+        Ждет, пока запросов в полете нет дольше idle_ms (отсчет не раньше момента вызова:
+        запрос, вызванный только что сделанным действием, успевает начаться).
+
+        Args:
+            idle_ms: Сколько миллисекунд сеть должна молчать
+            timeout: Максимальное ожидание в секундах
+            poll_interval: Пауза между чтениями лога
+
+        Returns:
+            bool: True - сеть затихла, False - таймаут или трекер недоступен
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        idle_seconds = idle_ms / 1000
+        while time.monotonic() < deadline:
+            self.poll()
+            if not self.available:
+                return False
+            quiet_since = max(self.last_activity, started)
+            if not self.in_flight and time.monotonic() - quiet_since >= idle_seconds:
+                return True
+            time.sleep(poll_interval)
+
+        logger.warning(f"⚠️ Сеть не затихла за {timeout}с, запросов в полете: {len(self.in_flight)}")
+        for url in list(self.in_flight.values())[:2]:
+            logger.info(f"   • {url[:80]}...")
+        return False
+
+    def find_url(self, pattern: str, timeout: float = 5) -> Optional[str]:
+        """
+        Ищет URL запроса по регулярному выражению среди увиденных и новых запросов.
+
+        Args:
+            pattern: Регулярное выражение
+            timeout: Максимальное ожидание в секундах
+
+        Returns:
+            Optional[str]: Последний подходящий URL или None
+        """
+        regex = re.compile(pattern, re.I)
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll()
+            for url in reversed(self.seen_urls):
+                if regex.search(url):
+                    return url
+            if not self.available or time.monotonic() >= deadline:
+                return None
+            time.sleep(DEFAULT_POLL_INTERVAL)
+
+
+def get_network_tracker(driver) -> NetworkIdleTracker:
+    """
+    Возвращает общий трекер драйвера (создается при первом обращении).
+
+    Args:
+        driver: WebDriver instance
+
+    Returns:
+        NetworkIdleTracker: Трекер этого драйвера
+    """
+    tracker = getattr(driver, "_network_idle_tracker", None)
+    if tracker is None:
+        tracker = NetworkIdleTracker(driver)
+        driver._network_idle_tracker = tracker
+    return tracker
+
+
+def wait_for_network_idle(driver, idle_ms: int = DEFAULT_IDLE_MS, timeout: float = 10,
+                          fallback_sleep: float = 0) -> bool:
+    """
+    Ждет затихания сети; если performance лог недоступен - фиксированная пауза.
+
+    Args:
+        driver: WebDriver instance
+        idle_ms: Сколько миллисекунд сеть должна молчать
+        timeout: Максимальное ожидание в секундах
+        fallback_sleep: Пауза, если трекер недоступен
+
+    Returns:
+        bool: True - сеть затихла
+    """
+    tracker = get_network_tracker(driver)
+    if tracker.wait_for_idle(idle_ms=idle_ms, timeout=timeout):
+        return True
+    if not tracker.available and fallback_sleep:
+        time.sleep(fallback_sleep)
+    return False
@@ -3,7 +3,6 @@
 Использует модульную архитектуру для лучшей организации кода
 """
 
-import time
 from pathlib import Path
 from loguru import logger
 from selenium.webdriver.common.by import By
@@ -15,14 +14,17 @@ from .iframe_handler import IframeHandler
 from .form_filler import FormFiller
 from .excel_exporter import ExcelExporter
 from .selenium_export_handler import SeleniumExportHandler
+from .network_idle import get_network_tracker
 
 
 class NewSiteHandler:
     """Основной класс для работы с новым сайтом отчетов"""
 
-    def __init__(self, driver, logger, download_dir=None):
+    def __init__(self, driver, logger, download_dir=None, direct_download=True):
         self.driver = driver
         self.logger = logger
+        # Прямое скачивание экспорта с cookies браузера (клики по меню - запасной вариант)
+        self.direct_download = direct_download
 
         # Инициализируем модули
         self.form_elements = FormElements()
@@ -33,36 +35,60 @@ class NewSiteHandler:
                 # Новый модуль для "боевого" сценария экспорта
         self.selenium_exporter = SeleniumExportHandler(driver, logger, download_dir)
 
-    def process_report(self, wait_time=60):
-        """Основной метод для обработки отчета"""
+        # Путь к последнему скачанному отчету (для разбора после process_report)
+        self.last_export_path = None
+
+    def wait_for_form(self, timeout=30):
+        """Дождаться появления формы отчета (iframe) вместо фиксированной паузы"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located((By.TAG_NAME, "iframe"))
+            )
+            self.logger.info("✅ Форма отчета загружена")
+            return True
+        except Exception:
+            self.logger.warning(f"⚠️ Форма отчета не появилась за {timeout}с, продолжаем...")
+            return False
+
+    def process_report(self, wait_time=60, start_date=None, end_date=None, reasons=None, set_period=True):
+        """
+        Основной метод для обработки отчета.
+
+        start_date/end_date - ДД.ММ.ГГГГ (по умолчанию тестовые даты), reasons - тексты
+        причин (по умолчанию "Низкая скорость в 3G/4G"). set_period=False - период
+        "произвольный" уже выбран (следующее задание пакета на той же странице).
+        """
         try:
             self.logger.info("🚀 Начинаем обработку отчета на новом сайте...")
+            self.last_export_path = None
 
             # Ждем загрузки страницы
             self.logger.info("⏳ Ждем загрузки страницы...")
-            time.sleep(10)
+            self.wait_for_form()
 
             # 1. Устанавливаем период отчета
-            if not self.form_filler.set_report_period('произвольный'):
+            if set_period and not self.form_filler.set_report_period('произвольный'):
                 self.logger.error("❌ Не удалось установить период отчета")
                 return False
 
             # 2. Устанавливаем дату начала
-            if not self.form_filler.set_start_date():
+            if not self.form_filler.set_start_date(start_date):
                 self.logger.error("❌ Не удалось установить дату начала")
                 return False
 
             # 3. Устанавливаем дату окончания
-            if not self.form_filler.set_end_date():
+            if not self.form_filler.set_end_date(end_date):
                 self.logger.error("❌ Не удалось установить дату окончания")
                 return False
 
             # 4. Устанавливаем причину обращения
-            if not self.form_filler.set_reason():
+            if not self.form_filler.set_reason(reasons):
                 self.logger.error("❌ Не удалось установить причину обращения")
                 return False
 
-            # 5. Отправляем отчет
+            # 5. Отправляем отчет. URL экспорта прошлого задания пакета не должен
+            # найтись в сетевом логе вместо URL этого отчета
+            get_network_tracker(self.driver).reset()
             if not self.form_filler.submit_report():
                 self.logger.error("❌ Не удалось отправить отчет")
                 return False
@@ -72,11 +98,12 @@ class NewSiteHandler:
             excel_result = self.export_excel_by_click(wait_time=wait_time)
 
             # Проверяем результат экспорта
-            if excel_result and isinstance(excel_result, str):
+            if excel_result and isinstance(excel_result, (str, Path)):
                 # Нормализуем путь для проверки расширения
                 file_path = Path(excel_result)
                 if file_path.suffix.lower() == '.xlsx':
                     self.logger.info(f"✅ Экспорт через 'боевой' сценарий успешен: {excel_result}")
+                    self.last_export_path = file_path
                     # Файл скачался, останавливаемся здесь
                     return True
                 else:
@@ -98,6 +125,76 @@ class NewSiteHandler:
             self.logger.error(f"❌ Критическая ошибка при обработке отчета: {e}")
             return False
 
+    def job_output_dir(self, output_dir=None):
+        """Папка для файлов заданий (экспорт чистит *.xlsx в папке загрузок - храним в подпапке)"""
+        output_dir = Path(output_dir) if output_dir else self.selenium_exporter.download_dir / "reports"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir
+
+    @staticmethod
+    def job_name(job):
+        """Имя задания (имя файла выгрузки)"""
+        return job.get("name") or f"reasons_{job['start_date']}_{job['end_date']}"
+
+    def run_job(self, job, output_dir, wait_time=60, set_period=True):
+        """
+        Выполнить одно задание пакета и сохранить файл под именем задания.
+
+        Args:
+            job: Словарь {"start_date", "end_date", "reasons", "name"}
+            output_dir: Папка для файла задания
+            wait_time: Время ожидания экспорта
+            set_period: Выбрать период "произвольный" (первое задание на странице)
+
+        Returns:
+            dict: Результат {"job", "path", "success"}
+        """
+        name = self.job_name(job)
+
+        success = self.process_report(
+            wait_time=wait_time,
+            start_date=job["start_date"],
+            end_date=job["end_date"],
+            reasons=job.get("reasons"),
+            set_period=set_period
+        )
+
+        path = None
+        if success and self.last_export_path:
+            path = Path(output_dir) / f"{name}.xlsx"
+            if path.exists():
+                path.unlink()
+            self.last_export_path.replace(path)
+            self.last_export_path = path
+            self.logger.info(f"💾 Файл задания: {path}")
+        else:
+            self.logger.error(f"❌ Задание {name} не выполнено")
+
+        return {"job": job, "path": path, "success": bool(path)}
+
+    def run_jobs(self, jobs, output_dir=None, wait_time=60):
+        """
+        Выполнить пакет заданий в одной сессии браузера без перезагрузки страницы.
+
+        Args:
+            jobs: Список словарей {"start_date", "end_date", "reasons", "name"}
+            output_dir: Папка для файлов заданий (по умолчанию downloads/reports)
+            wait_time: Время ожидания экспорта одного задания
+
+        Returns:
+            list: Результаты {"job", "path", "success"} по заданиям
+        """
+        output_dir = self.job_output_dir(output_dir)
+
+        results = []
+        for number, job in enumerate(jobs, start=1):
+            self.logger.info(f"📦 Задание {number}/{len(jobs)}: {self.job_name(job)}")
+            results.append(self.run_job(job, output_dir, wait_time=wait_time, set_period=(number == 1)))
+
+        done = sum(1 for result in results if result["success"])
+        self.logger.info(f"🏁 Пакет завершен: {done}/{len(jobs)} заданий")
+        return results
+
     def fill_report_parameters(self):
         """Заполнить параметры отчета (устаревший метод, оставлен для совместимости)"""
         self.logger.warning("⚠️ Метод fill_report_parameters устарел, используйте process_report")
@@ -123,6 +220,16 @@ class NewSiteHandler:
                 report_url = self.driver.current_url
                 self.logger.info(f"📄 Используем текущий URL: {report_url}")
 
+            if self.direct_download:
+                result = self.selenium_exporter.export_excel_direct(
+                    download_dir=self.selenium_exporter.download_dir,
+                    overall_timeout=max(wait_time, 300)
+                )
+                if result:
+                    self.logger.info(f"🎉 Экспорт Excel скачан напрямую: {result}")
+                    return str(result)
+                self.logger.info("🔄 Переходим к экспорту через клики по меню...")
+
             # Запускаем экспорт через клики
             result = self.selenium_exporter.export_excel_by_click(
                 report_url=report_url,
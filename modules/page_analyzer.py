@@ -5,16 +5,54 @@ page_analyzer.py — Модуль для анализа структуры ст
 """
 
 import os
-from loguru import logger
+import json
+from pathlib import Path
+from loguru import logger as default_logger
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from .form_elements import FORM_MAP_PATH, FORM_MAP_VERSION
+
 
 class PageAnalyzer:
     """Класс для анализа структуры страницы."""
 
+    # Карта формы ReportViewer за один проход по DOM: параметр → поле, dropdown, чекбоксы
+    FORM_MAP_JS = """
+        const norm = (t) => (t || '').replace(/\\u00a0/g, ' ').replace(/\\s+/g, ' ').trim();
+        const parameters = {};
+        let prefix = null;
+        for (const container of document.querySelectorAll('[data-parametername]')) {
+            if (!container.id) continue;
+            const label = document.querySelector("label[for^='" + container.id + "_']");
+            const text = norm(label ? label.textContent : '') || container.getAttribute('data-parametername');
+            const field = container.querySelector("select, input[id$='_txtValue'], input[type='text']");
+            const toggle = container.querySelector("[id$='_ddDropDownButton']");
+            const root = document.getElementById(container.id + '_divDropDown');
+            const checkboxes = root ? Array.from(root.querySelectorAll("input[type='checkbox']")).map(cb => {
+                let cbLabel = cb.id ? root.querySelector("label[for='" + cb.id + "']") : null;
+                if (!cbLabel && cb.parentElement) cbLabel = cb.parentElement.querySelector('label');
+                return {id: cb.id, text: norm(cbLabel ? cbLabel.textContent : '')};
+            }) : [];
+            parameters[text] = {
+                parameter: container.getAttribute('data-parametername'),
+                container_id: container.id,
+                tag: field ? field.tagName.toLowerCase() : null,
+                id: field ? field.id : null,
+                name: field ? field.getAttribute('name') : null,
+                dropdown_toggle: toggle ? toggle.id : null,
+                dropdown_root: root ? root.id : null,
+                checkboxes: checkboxes
+            };
+            if (!prefix) prefix = container.id.replace(/_[^_]+$/, '');
+        }
+        let submit = prefix ? document.getElementById(prefix + '_ctl00') : null;
+        if (!submit) submit = document.querySelector("input[type='submit'][id^='ReportViewerControl']");
+        return {parameters: parameters, submit_button: submit ? submit.id : null};
+    """
+
     def __init__(self, driver, logger=None):
         """
         Инициализация анализатора.
@@ -24,7 +62,7 @@ class PageAnalyzer:
             logger: Логгер (если не указан, создается новый)
         """
         self.driver = driver
-        self.logger = logger or logging.getLogger(__name__)
+        self.logger = logger or default_logger
 
         # Директория для сохранения файлов анализа
         self.analysis_dir = "analysis"
@@ -549,3 +587,64 @@ class PageAnalyzer:
         except Exception as e:
             self.logger.error(f"❌ Элемент не найден: {by} = {value}, ошибка: {e}")
             return None
+
+    def build_form_map(self):
+        """
+        Строит карту формы отчета за один проход по DOM.
+
+        Вызывается в контексте документа с ReportViewer (iframe формы).
+
+        Returns:
+            dict: Карта {"version", "generated_at", "url", "parameters", "submit_button"};
+                parameters - подпись параметра → id/name поля, dropdown, чекбоксы
+        """
+        form = self.driver.execute_script(self.FORM_MAP_JS)
+        form_map = {
+            'version': FORM_MAP_VERSION,
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'url': self.driver.current_url,
+            'parameters': form['parameters'],
+            'submit_button': form['submit_button'],
+        }
+        self.logger.info(f"🗺️ Карта формы: параметров {len(form_map['parameters'])}, "
+                         f"кнопка отправки: {form_map['submit_button']}")
+        return form_map
+
+    def save_form_map(self, form_map, path=FORM_MAP_PATH):
+        """
+        Сохраняет карту формы в JSON.
+
+        Args:
+            form_map: Карта из build_form_map
+            path: Путь к файлу карты
+
+        Returns:
+            Path: Путь к сохраненному файлу
+        """
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(form_map, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp.replace(path)
+        self.logger.info(f"💾 Карта формы сохранена: {path}")
+        return path
+
+    def generate_form_map(self, path=FORM_MAP_PATH):
+        """
+        Строит и сохраняет карту формы.
+
+        Args:
+            path: Путь к файлу карты
+
+        Returns:
+            dict: Карта формы или None, если параметры формы не найдены
+        """
+        try:
+            form_map = self.build_form_map()
+            if not form_map['parameters']:
+                self.logger.warning("⚠️ Параметры ReportViewer не найдены - карта формы не сохранена")
+                return None
+            self.save_form_map(form_map, path)
+            return form_map
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при построении карты формы: {e}")
+            return None
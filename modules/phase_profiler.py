@@ -0,0 +1,167 @@
+"""
+Модуль для профилирования Python-фаз запуска (--profile).
+
+Фазы RunProfile.phase, выбранные для профилирования, выполняются под cProfile
+(точные времена функций, pstats) и под сэмплирующим профайлером (стеки потока
+фазы каждые sample_interval секунд, collapsed stacks для flamegraph.pl/speedscope).
+Повторные вызовы фазы накапливаются в одном профиле. Результат сохраняется в
+runs/<run_id>/profiles/<фаза>.pstats и <фаза>.collapsed.
+
+Профилируется поток, вызвавший фазу: разбор отчетов в процессах конвейера
+(pipeline_executor) и в потоках вкладок сюда не попадает. Поэтому main.py при
+профилировании calc_metrics разбирает отчеты в основном процессе (--parsers 0).
+"""
+
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from loguru import logger
+
+
+# === Константы ===
+PROFILE_PHASES = (
+    "process_excel_data",
+    "task_planner",
+    "calc_metrics",
+    "save_results",
+    "post_process_excel_file",
+)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def parse_profile_phases(value: str) -> Optional[frozenset]:
+    """
+    Разбирает значение --profile.
+
+    Args:
+        value: "all" или имена фаз через запятую
+
+    Returns:
+        Optional[frozenset]: Фазы для профилирования (None - все фазы)
+    """
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if not names or "all" in names:
+        return None
+    unknown = names - set(PROFILE_PHASES)
+    if unknown:
+        logger.warning(f"⚠️ Фазы {', '.join(sorted(unknown))} не из списка по умолчанию - "
+                       f"будут профилироваться, если такие фазы есть")
+    return frozenset(names)
+
+
+def _frame_name(frame) -> str:
+    """Имя кадра для collapsed stacks: функция (файл:строка начала)."""
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class PhaseProfiler:
+    """Класс для профилирования выбранных фаз cProfile и сэмплированием стеков"""
+
+    def __init__(self, output_dir: Path, phases: Optional[Iterable[str]] = None,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Инициализация профайлера.
+
+        Args:
+            output_dir: Папка для pstats и collapsed stacks
+            phases: Фазы для профилирования (None - PROFILE_PHASES)
+            sample_interval: Период сэмплирования стеков в секундах
+        """
+        self.output_dir = Path(output_dir)
+        self.phases = frozenset(phases) if phases is not None else frozenset(PROFILE_PHASES)
+        self.sample_interval = sample_interval
+
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._stacks: Dict[str, Counter] = {}
+        self._targets: Dict[int, str] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def profile(self, name: str):
+        """
+        Профилирует фазу, если она выбрана (вложенные фазы учитываются во внешней).
+
+        Args:
+            name: Название фазы
+        """
+        if name not in self.phases or getattr(self._local, "active", None):
+            yield
+            return
+
+        with self._lock:
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+            self._stacks.setdefault(name, Counter())
+        try:
+            profiler.enable()
+        except ValueError:
+            # Профайлер уже включен другим инструментом - остаются только сэмплы
+            profiler = None
+
+        thread_id = threading.get_ident()
+        self._local.active = name
+        self._targets[thread_id] = name
+        self._ensure_sampler()
+        try:
+            yield
+        finally:
+            self._targets.pop(thread_id, None)
+            self._local.active = None
+            if profiler is not None:
+                profiler.disable()
+
+    def _ensure_sampler(self) -> None:
+        """Запускает поток сэмплирования при первом профилировании."""
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name="phase-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        """Снимает стеки потоков, выполняющих профилируемые фазы."""
+        while True:
+            time.sleep(self.sample_interval)
+            targets = dict(self._targets)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            for thread_id, name in targets.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[name][";".join(reversed(stack))] += 1
+
+    def save(self) -> Optional[Path]:
+        """
+        Сохраняет <фаза>.pstats и <фаза>.collapsed для профилированных фаз.
+
+        Returns:
+            Optional[Path]: Папка с профилями или None, если ни одна фаза не выполнялась
+        """
+        # Сохранение повторяется (режим службы сохраняет профиль после каждого Свода) -
+        # поток сэмплирования продолжает работать
+        if not self._profiles:
+            return None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for name, profiler in self._profiles.items():
+            profiler.dump_stats(str(self.output_dir / f"{name}.pstats"))
+            with self._lock:
+                stacks = Counter(self._stacks.get(name, {}))
+            (self.output_dir / f"{name}.collapsed").write_text(
+                "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+                encoding="utf-8"
+            )
+        logger.info(f"🔬 Профили фаз ({', '.join(sorted(self._profiles))}) сохранены: {self.output_dir}")
+        return self.output_dir
@@ -0,0 +1,151 @@
+"""
+Модуль для конвейерного выполнения задач: браузер, разбор отчетов и запись идут параллельно.
+
+Раньше между двумя выгрузками браузер простаивал, пока pandas читал xlsx и
+сохранялись результаты. Теперь три стадии соединены очередями:
+
+- браузер (основной поток, Selenium однопоточный) скачивает отчет и сразу берет
+  следующую задачу;
+- пул разбора (процессы - openpyxl упирается в GIL) считает calc_metrics_detailed;
+- один писатель сохраняет результаты (хранилище, книга) строго по одному.
+
+Число отчетов "после браузера" (в разборе и в очереди записи) ограничено: если
+разбор или запись не успевают, браузер ждет. Глубины очередей стадий пишутся в
+профиль запуска - по ним видно узкое место.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+from loguru import logger
+from tqdm import tqdm
+
+from .data_processing import calc_metrics_detailed
+from .run_profile import task_label
+
+
+# === Константы ===
+DEFAULT_PARSERS = 2
+DEFAULT_MAX_IN_FLIGHT = 4
+DEPTH_LOG_EVERY = 10
+
+
+def _make_parser_pool(parsers: int):
+    """Пул разбора: процессы, а если их не создать (ограниченная среда) - потоки."""
+    try:
+        return ProcessPoolExecutor(max_workers=parsers)
+    except (OSError, NotImplementedError) as e:
+        logger.warning(f"⚠️ Пул процессов недоступен ({e}) - разбор в потоках")
+        return ThreadPoolExecutor(max_workers=parsers)
+
+
+def run_pipeline(session, profile, tasks: List[Dict[str, Any]],
+                 write: Callable[[Dict[str, Any]], None],
+                 parsers: int = DEFAULT_PARSERS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+    """
+    Выполняет задачи конвейером: выгрузка → разбор → запись.
+
+    Args:
+        session: Запущенная BrowserSession
+        profile: RunProfile (фазы и глубины очередей)
+        tasks: Задачи из task_planner
+        write: Стадия записи, вызывается в одном потоке для каждого результата
+            {"task", "lost", "excess", "intervals", "error"}
+        parsers: Размер пула разбора
+        max_in_flight: Сколько скачанных отчетов может ждать разбора и записи
+    """
+    from .download_manager import download_report
+
+    slots = threading.BoundedSemaphore(max_in_flight)
+    write_queue: "queue.Queue" = queue.Queue()
+    parsing = {"count": 0}
+    parsing_lock = threading.Lock()
+
+    def record_depths(task_number: int) -> None:
+        depths = {"parse": parsing["count"], "write": write_queue.qsize()}
+        for stage, depth in depths.items():
+            profile.record_queue_depth(stage, depth)
+        if task_number % DEPTH_LOG_EVERY == 0:
+            logger.info(f"📥 Очереди: разбор={depths['parse']}, запись={depths['write']}")
+
+    def writer() -> None:
+        while True:
+            record = write_queue.get()
+            if record is None:
+                return
+            try:
+                with profile.phase("store_result"):
+                    write(record)
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи результата {record['task']['mass_number']}: {e}")
+            finally:
+                slots.release()
+
+    def parsed(task: Dict[str, Any], started: float, future) -> None:
+        # От отправки в пул до готовности: ожидание свободного процесса + разбор
+        profile.record_duration("parse_report", time.perf_counter() - started)
+        with parsing_lock:
+            parsing["count"] -= 1
+        record = {"task": task, "lost": None, "excess": None, "intervals": None, "error": None}
+        try:
+            record["lost"], record["excess"], record["intervals"] = future.result()
+        except Exception as e:
+            logger.error(f"❌ Ошибка разбора отчета для {task['mass_number']} {task['region']}: {e}")
+            record["error"] = str(e)
+        write_queue.put(record)
+
+    writer_thread = threading.Thread(target=writer, name="pipeline-writer", daemon=True)
+    writer_thread.start()
+    pool = _make_parser_pool(parsers)
+    logger.info(f"🏭 Конвейер: задач {len(tasks)}, разбор в {parsers} процессах, "
+                f"до {max_in_flight} отчетов после браузера")
+
+    progress_bar = tqdm(
+        tasks,
+        desc="Обработка задач",
+        unit="окно",
+        colour="green",
+        bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]"
+    )
+    try:
+        for number, task in enumerate(progress_bar, start=1):
+            progress_bar.set_description(f"Обработка: {task['mass_number']} ({task['win_start'].date()})")
+
+            # Браузер ждет, только если разбор и запись отстали на max_in_flight отчетов
+            with profile.phase("browser_blocked"):
+                slots.acquire()
+            record_depths(number)
+            profile.start_task(task_label(task["mass_number"], task["win_start"], task["win_end"]))
+
+            try:
+                logger.info(f"🚀 Запускаем download_report для {task['mass_number']} {task['win_start'].date()}")
+                with profile.phase("download_report"):
+                    xlsx_path = download_report(
+                        session.driver, task["workload_params"], task["win_start"], task["win_end"],
+                        intervals=(task["interval_from"], task["interval_to"]) if "interval_from" in task else None
+                    )
+            except Exception as exc:
+                logger.error(f"❌ ОШИБКА для строки #{task['row_index']} MassID {task['mass_number']} {task['region']}: {exc}")
+                write_queue.put({"task": task, "lost": None, "excess": None, "intervals": None, "error": str(exc)})
+                session.after_task(success=False)
+                continue
+
+            with parsing_lock:
+                parsing["count"] += 1
+            future = pool.submit(calc_metrics_detailed, xlsx_path)
+            future.add_done_callback(
+                lambda f, task=task, started=time.perf_counter(): parsed(task, started, f)
+            )
+            # Пересоздание браузера (BrowserRecycleError) прерывает цикл; уже скачанные отчеты дописываются
+            session.after_task(success=True)
+    finally:
+        progress_bar.close()
+        pool.shutdown(wait=True)
+        write_queue.put(None)
+        writer_thread.join()
+
+    for stage, depths in profile.queues.items():
+        if depths:
+            logger.info(f"📊 Очередь {stage}: максимум {max(depths)}, в среднем {sum(depths) / len(depths):.1f}")
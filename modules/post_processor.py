@@ -12,7 +12,6 @@
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 import pandas as pd
-from openpyxl import load_workbook
 from loguru import logger
 
 
@@ -27,6 +26,7 @@ def post_process_excel_file(file_path: Path) -> None:
 
     try:
         # Загружаем рабочую книгу
+        from openpyxl import load_workbook
         workbook = load_workbook(file_path)
         report_sheet = workbook["Отчет"]
 
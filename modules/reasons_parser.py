@@ -0,0 +1,203 @@
+"""
+Модуль для разбора выгрузки "Отчет по причинам обращений" (замена запроса Power Query).
+
+Повторяет шаги запроса из normalization.txt: пропуск 20 служебных строк, заголовки,
+колонки Дата/Макрорегион/Регион/Комментарий и номер массовой из текста
+"Заметка зарегистрирована из технической проблемы <номер>/..., ...".
+
+Книга читается потоково (openpyxl read_only) строка за строкой, номер извлекается одним
+скомпилированным регулярным выражением, строки пачками пишутся в SQLite - весь лист
+в памяти не держится.
+"""
+
+import re
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+from loguru import logger
+from openpyxl import load_workbook
+
+
+# === Константы ===
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_REASONS_DB = BASE_DIR / "reasons.sqlite"
+REASONS_SHEET = "Отчет по причинам обращений (со"
+SKIP_ROWS = 20
+REASON_COLUMNS = ["Дата", "Макрорегион", "Регион", "Комментарий"]
+BATCH_SIZE = 5000
+
+# Номер - текст после фразы до первой "," или "/" (как два SplitColumn в запросе)
+MASS_NUMBER_RE = re.compile(r"Заметка зарегистрирована из технической проблемы ([^,/]*)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reasons (
+    registered_at TEXT,
+    date TEXT,
+    macroregion TEXT,
+    region TEXT,
+    mass_number INTEGER NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reasons_mass_date ON reasons(mass_number, date);
+CREATE INDEX IF NOT EXISTS idx_reasons_source ON reasons(source);
+"""
+
+
+def extract_mass_number(comment) -> Optional[int]:
+    """
+    Извлекает номер массовой из комментария.
+
+    Args:
+        comment: Значение колонки "Комментарий"
+
+    Returns:
+        Optional[int]: Номер массовой или None
+    """
+    if comment is None:
+        return None
+    match = MASS_NUMBER_RE.search(str(comment))
+    if not match:
+        return None
+    # Text.Trim + Text.Clean: пробелы и управляющие символы
+    number = "".join(ch for ch in match.group(1) if ch.isprintable()).strip()
+    return int(number) if number.isdigit() else None
+
+
+def _parse_report_datetime(value) -> Optional[datetime]:
+    """Приводит значение колонки "Дата" к datetime (ячейка даты или текст ДД.ММ.ГГГГ[ ЧЧ:ММ[:СС]])."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    text = str(value).strip()
+    for fmt in ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_reasons_report(report_path: Path, db_path: Path = DEFAULT_REASONS_DB,
+                         sheet_name: str = REASONS_SHEET, date_from: date = None,
+                         date_to: date = None) -> int:
+    """
+    Потоково разбирает выгрузку отчета по причинам обращений в таблицу reasons.
+
+    Повторный разбор того же файла заменяет его строки (ключ - имя файла). Если задан
+    период выгрузки (шард), файл владеет этими днями: строки вне периода отбрасываются,
+    а ранее загруженные строки за эти дни заменяются - соседние и повторные шарды
+    сливаются без дублей на границах.
+
+    Args:
+        report_path: Путь к скачанному xlsx
+        db_path: Путь к базе SQLite
+        sheet_name: Имя листа (если нет - первый лист)
+        date_from: Первый день периода выгрузки (включительно)
+        date_to: Последний день периода выгрузки (включительно)
+
+    Returns:
+        int: Количество записанных строк с номером массовой
+    """
+    report_path = Path(report_path)
+    logger.info(f"📖 Разбираем отчет по причинам обращений: {report_path}")
+
+    workbook = load_workbook(report_path, read_only=True, data_only=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    total = written = 0
+    try:
+        conn.executescript(SCHEMA)
+        sheet = workbook[sheet_name] if sheet_name in workbook.sheetnames else workbook.worksheets[0]
+        rows = sheet.iter_rows(min_row=SKIP_ROWS + 1, values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"В листе '{sheet.title}' нет строки заголовков после {SKIP_ROWS} строк")
+        header = [str(value).strip() if value is not None else "" for value in header]
+        missing = [column for column in REASON_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"Отсутствуют колонки: {missing}")
+        date_pos, macro_pos, region_pos, comment_pos = (header.index(column) for column in REASON_COLUMNS)
+
+        with conn:
+            conn.execute("DELETE FROM reasons WHERE source = ?", (report_path.name,))
+            if date_from and date_to:
+                conn.execute("DELETE FROM reasons WHERE date BETWEEN ? AND ?",
+                             (date_from.isoformat(), date_to.isoformat()))
+            batch = []
+            for row in rows:
+                total += 1
+                if len(row) < len(header):
+                    # read_only может отдать укороченную строку без пустых ячеек в конце
+                    row = tuple(row) + (None,) * (len(header) - len(row))
+                mass_number = extract_mass_number(row[comment_pos])
+                if mass_number is None:
+                    continue
+                registered_at = _parse_report_datetime(row[date_pos])
+                if (date_from or date_to) and registered_at is not None:
+                    day = registered_at.date()
+                    if (date_from and day < date_from) or (date_to and day > date_to):
+                        continue
+                batch.append((
+                    registered_at.isoformat(sep=" ") if registered_at else None,
+                    registered_at.date().isoformat() if registered_at else None,
+                    row[macro_pos],
+                    row[region_pos],
+                    mass_number,
+                    report_path.name,
+                ))
+                if len(batch) >= BATCH_SIZE:
+                    conn.executemany("INSERT INTO reasons VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    written += len(batch)
+                    batch.clear()
+            if batch:
+                conn.executemany("INSERT INTO reasons VALUES (?, ?, ?, ?, ?, ?)", batch)
+                written += len(batch)
+    finally:
+        conn.close()
+        workbook.close()
+
+    logger.success(f"✅ Разобрано строк: {total}, с номером массовой: {written} → {db_path}")
+    return written
+
+
+def load_reasons(db_path: Path = DEFAULT_REASONS_DB, date_from: date = None, date_to: date = None) -> pd.DataFrame:
+    """
+    Читает разобранные обращения (колонки как в запросе Power Query).
+
+    Args:
+        db_path: Путь к базе SQLite
+        date_from: Первая дата (включительно)
+        date_to: Последняя дата (включительно)
+
+    Returns:
+        pd.DataFrame: Колонки Дата, ДатаБезВремени, Макрорегион, Регион, Номер массовой
+    """
+    sql = "SELECT registered_at, date, macroregion, region, mass_number FROM reasons"
+    conditions, params = [], []
+    if date_from:
+        conditions.append("date >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        conditions.append("date <= ?")
+        params.append(date_to.isoformat())
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        df = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+    return pd.DataFrame({
+        "Дата": pd.to_datetime(df["registered_at"]),
+        "ДатаБезВремени": pd.to_datetime(df["date"]),
+        "Макрорегион": df["macroregion"].astype("category"),
+        "Регион": df["region"].astype("category"),
+        "Номер массовой": df["mass_number"].astype("Int64"),
+    })
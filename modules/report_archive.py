@@ -0,0 +1,278 @@
+"""
+Модуль для архива скачанных отчетов с адресацией по параметрам запроса.
+
+Ключ отчета - sha256 от параметров формы (ID рабочей нагрузки, даты, интервалы),
+поэтому повторный запуск за прошедшие даты берет отчет из архива, не открывая
+браузер. Файлы хранятся сжатыми (gzip) в archive/<ключ[:2]>/<ключ>.xlsx.gz, метаданные
+(параметры, размер, sha256 файла, время последнего обращения) - в index.sqlite.
+Размер архива ограничен: при превышении удаляются давно не использованные отчеты (LRU).
+
+Отчеты за текущий день не архивируются - данные за него еще меняются.
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+# === Константы ===
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_ARCHIVE_DIR = BASE_DIR / "archive"
+DEFAULT_MAX_MB = 2048
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    key TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_access ON reports(last_access);
+"""
+
+
+def report_params(workload_ids: List[str], start_dt: datetime, end_dt: datetime,
+                  intervals: Tuple[str, str]) -> Dict[str, Any]:
+    """
+    Приводит параметры формы отчета к каноническому виду (ключ не зависит от порядка ID).
+
+    Args:
+        workload_ids: ID регионов рабочей нагрузки
+        start_dt: Начало окна
+        end_dt: Конец окна
+        intervals: ("Интервал от", "Интервал до") в формате HH:MM
+
+    Returns:
+        Dict[str, Any]: Параметры для ключа и метаданных
+    """
+    return {
+        "workload_ids": sorted(str(i) for i in workload_ids),
+        "date_from": start_dt.strftime("%d.%m.%Y"),
+        "date_to": end_dt.strftime("%d.%m.%Y"),
+        "interval_from": intervals[0],
+        "interval_to": intervals[1],
+    }
+
+
+def report_key(params: Dict[str, Any]) -> str:
+    """
+    Возвращает ключ отчета: sha256 канонического JSON параметров.
+
+    Args:
+        params: Параметры из report_params
+
+    Returns:
+        str: Шестнадцатеричный ключ
+    """
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportArchive:
+    """Класс архива отчетов с LRU вытеснением по суммарному размеру"""
+
+    def __init__(self, root: Path = DEFAULT_ARCHIVE_DIR, max_mb: float = DEFAULT_MAX_MB):
+        """
+        Инициализация архива (папка и индекс создаются при необходимости).
+
+        Args:
+            root: Папка архива
+            max_mb: Предельный размер сжатых файлов в мегабайтах
+        """
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Открывает соединение с индексом; транзакция фиксируется при успешном выходе."""
+        conn = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def is_cacheable(end_dt: datetime) -> bool:
+        """Архивируются только отчеты за завершившиеся дни."""
+        return end_dt.date() < date.today()
+
+    def get(self, key: str, target_dir: Path) -> Optional[Path]:
+        """
+        Распаковывает отчет из архива в target_dir.
+
+        Args:
+            key: Ключ отчета
+            target_dir: Папка для распакованного файла
+
+        Returns:
+            Optional[Path]: Путь к xlsx или None, если отчета нет в архиве
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT path, sha256 FROM reports WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        stored = self.root / row[0]
+        if not stored.exists():
+            # Файл удален вручную - запись в индексе больше не действительна
+            self._forget(key)
+            return None
+
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / f"archive_{key[:16]}.xlsx"
+        digest = hashlib.sha256()
+        with gzip.open(stored, "rb") as src, open(target, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        if digest.hexdigest() != row[1]:
+            logger.warning(f"⚠️ Отчет {key[:16]} в архиве поврежден - будет скачан заново")
+            target.unlink(missing_ok=True)
+            self._forget(key)
+            return None
+
+        with self._connect() as conn:
+            conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (time.time(), key))
+        logger.info(f"📦 Отчет взят из архива: {key[:16]}")
+        return target
+
+    def contains(self, key: str) -> bool:
+        """Есть ли отчет в архиве (без распаковки и обновления времени обращения)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM reports WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.root / row[0]).exists()
+
+    def put(self, key: str, source: Path, params: Dict[str, Any]) -> Path:
+        """
+        Сжимает отчет в архив и вытесняет старые отчеты при превышении размера.
+
+        Args:
+            key: Ключ отчета
+            source: Скачанный xlsx
+            params: Параметры запроса (сохраняются в метаданных)
+
+        Returns:
+            Path: Путь к сжатому файлу в архиве
+        """
+        relative = Path(key[:2]) / f"{key}.xlsx.gz"
+        stored = self.root / relative
+        stored.parent.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        part = stored.with_name(stored.name + ".part")
+        with open(source, "rb") as src, gzip.open(part, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        part.replace(stored)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(params, ensure_ascii=False), relative.as_posix(), stored.stat().st_size,
+                 digest.hexdigest(), datetime.now().isoformat(timespec="seconds"), time.time()),
+            )
+        logger.info(f"🗄️ Отчет сохранен в архив: {key[:16]} ({stored.stat().st_size // 1024} КБ)")
+        self.evict()
+        return stored
+
+    def _forget(self, key: str) -> None:
+        """Удаляет запись из индекса."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+
+    def total_bytes(self) -> int:
+        """Суммарный размер сжатых файлов архива."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Удаляет давно не использованные отчеты, пока архив больше max_bytes.
+
+        Args:
+            max_bytes: Предельный размер (по умолчанию - из конструктора)
+
+        Returns:
+            int: Количество удаленных отчетов
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        with self._lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            for key, path, size in conn.execute(
+                "SELECT key, path, size FROM reports ORDER BY last_access"
+            ).fetchall():
+                if total <= max_bytes:
+                    break
+                (self.root / path).unlink(missing_ok=True)
+                conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"🧹 Из архива вытеснено отчетов: {removed}, размер: {total / (1024 * 1024):.1f} MB")
+        return removed
+
+    def clear(self) -> None:
+        """Полностью очищает архив."""
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM reports")
+            for entry in self.root.iterdir():
+                if entry.is_dir():
+                    shutil.rmtree(entry)
+
+
+_default_archive: Optional[ReportArchive] = None
+_archive_enabled = True
+_archive_max_mb = DEFAULT_MAX_MB
+
+
+def configure_report_archive(enabled: bool = True, max_mb: float = DEFAULT_MAX_MB) -> None:
+    """
+    Настраивает архив по умолчанию (вызывается из main.py до первой задачи).
+
+    Args:
+        enabled: False - отчеты всегда скачиваются заново
+        max_mb: Предельный размер архива в мегабайтах
+    """
+    global _default_archive, _archive_enabled, _archive_max_mb
+    _archive_enabled = enabled
+    _archive_max_mb = max_mb
+    _default_archive = None
+
+
+def get_report_archive() -> Optional[ReportArchive]:
+    """
+    Возвращает архив по умолчанию (создается при первом обращении).
+
+    Returns:
+        Optional[ReportArchive]: Архив или None, если архив выключен
+    """
+    global _default_archive
+    if not _archive_enabled:
+        return None
+    if _default_archive is None:
+        _default_archive = ReportArchive(max_mb=_archive_max_mb)
+    return _default_archive
@@ -0,0 +1,203 @@
+"""
+Модуль для выгрузки большого периода отчета по причинам обращений шардами.
+
+Месяц отчета - один огромный рендер SSRS, который часто не укладывается в таймауты
+ожидания отчета и скачивания. Период режется на шарды по дню или неделе, шарды
+выполняются параллельно в нескольких сессиях браузера (не больше workers), упавший
+шард повторяется отдельно, а не весь период. Каждый скачанный шард сразу разбирается
+потоковым парсером в общую таблицу reasons; шард владеет своими днями, поэтому
+границы соседних и повторных шардов не дают дублей.
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from .new_site_handler import NewSiteHandler
+from .reasons_parser import parse_reasons_report, DEFAULT_REASONS_DB
+
+
+# === Константы ===
+DATE_FORMAT = "%d.%m.%Y"
+SHARD_DAYS = {"day": 1, "week": 7}
+DEFAULT_WORKERS = 2
+DEFAULT_RETRIES = 2
+
+
+def split_period(start: datetime, end: datetime, shard: str = "day") -> List[Tuple[datetime, datetime]]:
+    """
+    Делит период на последовательные непересекающиеся шарды.
+
+    Args:
+        start: Первый день периода
+        end: Последний день периода (включительно)
+        shard: Размер шарда: "day" или "week"
+
+    Returns:
+        List[Tuple[datetime, datetime]]: Пары (первый день, последний день) шардов
+    """
+    if shard not in SHARD_DAYS:
+        raise ValueError(f"Неизвестный размер шарда: {shard} (доступны: {', '.join(SHARD_DAYS)})")
+    if end < start:
+        raise ValueError(f"Дата окончания {end:%d.%m.%Y} раньше даты начала {start:%d.%m.%Y}")
+
+    step = timedelta(days=SHARD_DAYS[shard])
+    periods = []
+    shard_start = start
+    while shard_start <= end:
+        shard_end = min(shard_start + step - timedelta(days=1), end)
+        periods.append((shard_start, shard_end))
+        shard_start = shard_end + timedelta(days=1)
+    return periods
+
+
+def shard_jobs(start: datetime, end: datetime, shard: str = "day",
+               reasons: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Строит задания пакетного режима по шардам периода.
+
+    Args:
+        start: Первый день периода
+        end: Последний день периода (включительно)
+        shard: Размер шарда: "day" или "week"
+        reasons: Тексты причин (None - причина по умолчанию)
+
+    Returns:
+        List[Dict[str, Any]]: Задания {"start_date", "end_date", "reasons"}
+    """
+    return [
+        {
+            "start_date": shard_start.strftime(DATE_FORMAT),
+            "end_date": shard_end.strftime(DATE_FORMAT),
+            "reasons": reasons,
+        }
+        for shard_start, shard_end in split_period(start, end, shard)
+    ]
+
+
+def parse_job_result(result: Dict[str, Any], db_path: Path = DEFAULT_REASONS_DB) -> int:
+    """
+    Разбирает файл выполненного задания, ограничивая строки периодом задания.
+
+    Args:
+        result: Результат NewSiteHandler.run_job
+        db_path: База SQLite для таблицы reasons
+
+    Returns:
+        int: Количество записанных строк
+    """
+    job = result["job"]
+    return parse_reasons_report(
+        result["path"], db_path,
+        date_from=datetime.strptime(job["start_date"], DATE_FORMAT).date(),
+        date_to=datetime.strptime(job["end_date"], DATE_FORMAT).date(),
+    )
+
+
+def run_sharded_jobs(jobs: List[Dict[str, Any]], open_session: Callable[[int], Tuple[Any, Path]],
+                     workers: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES,
+                     output_dir: Path = None, wait_time: int = 60,
+                     db_path: Optional[Path] = DEFAULT_REASONS_DB) -> List[Dict[str, Any]]:
+    """
+    Выполняет задания в нескольких сессиях браузера с ограниченным параллелизмом.
+
+    Каждая сессия берет задания из общей очереди; неудачное задание возвращается в
+    очередь (до retries повторов), а страница сессии открывается заново. Файлы
+    разбираются в базу по мере скачивания (по одному - SQLite пишет один поток).
+
+    Args:
+        jobs: Задания {"start_date", "end_date", "reasons", "name"}
+        open_session: Функция (номер сессии) → (WebDriver с открытой формой отчета,
+            папка загрузок этой сессии); после ошибки страница сбрасывается driver.refresh()
+        workers: Сколько сессий работает одновременно
+        retries: Сколько раз повторять упавшее задание
+        output_dir: Папка для файлов заданий (по умолчанию downloads/reports)
+        wait_time: Время ожидания экспорта одного задания
+        db_path: База SQLite для разбора (None - не разбирать)
+
+    Returns:
+        List[Dict[str, Any]]: Результаты {"job", "path", "success", "attempts"} в порядке jobs
+    """
+    pending = queue.Queue()
+    for number, job in enumerate(jobs):
+        pending.put((number, job, 1))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    parse_lock = threading.Lock()
+    workers = max(1, min(workers, len(jobs)))
+    logger.info(f"🧩 Шардов: {len(jobs)}, параллельных сессий: {workers}, повторов: {retries}")
+
+    def worker(session_number: int):
+        try:
+            driver, download_dir = open_session(session_number)
+        except Exception as e:
+            logger.error(f"❌ Сессия {session_number}: не удалось открыть браузер: {e}")
+            return
+
+        try:
+            handler = NewSiteHandler(driver, logger, download_dir=download_dir)
+            target_dir = handler.job_output_dir(output_dir)
+            set_period = True
+            while True:
+                try:
+                    number, job, attempt = pending.get_nowait()
+                except queue.Empty:
+                    break
+
+                name = handler.job_name(job)
+                logger.info(f"📦 Сессия {session_number}: шард {name} (попытка {attempt})")
+                try:
+                    result = handler.run_job(job, target_dir, wait_time=wait_time, set_period=set_period)
+                except Exception as e:
+                    logger.error(f"❌ Сессия {session_number}: ошибка шарда {name}: {e}")
+                    result = {"job": job, "path": None, "success": False}
+                result["attempts"] = attempt
+
+                if result["success"]:
+                    # Следующее задание на той же странице - период уже "произвольный"
+                    set_period = False
+                    if db_path is not None:
+                        with parse_lock:
+                            try:
+                                parse_job_result(result, db_path)
+                            except Exception as e:
+                                logger.error(f"❌ Ошибка разбора {result['path']}: {e}")
+                    results[number] = result
+                    continue
+
+                results[number] = result
+                if attempt <= retries:
+                    logger.warning(f"🔄 Шард {name} вернется в очередь (попытка {attempt + 1})")
+                    pending.put((number, job, attempt + 1))
+                # Состояние формы после ошибки неизвестно - открываем страницу заново
+                set_period = True
+                try:
+                    driver.refresh()
+                except Exception as e:
+                    logger.warning(f"⚠️ Сессия {session_number}: не удалось обновить страницу: {e}")
+        finally:
+            try:
+                driver.quit()
+                logger.info(f"🔒 Сессия {session_number}: браузер закрыт")
+            except Exception:
+                pass
+
+    threads = [
+        threading.Thread(target=worker, args=(session_number,), name=f"shard-session-{session_number}")
+        for session_number in range(1, workers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = [
+        result or {"job": job, "path": None, "success": False, "attempts": 0}
+        for job, result in zip(jobs, results)
+    ]
+    done = sum(1 for result in results if result["success"])
+    logger.info(f"🏁 Шарды завершены: {done}/{len(jobs)}")
+    return results
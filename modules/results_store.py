@@ -0,0 +1,282 @@
+"""
+Модуль для хранилища результатов выгрузки (SQLite).
+
+Результат окна хранится по ключу (Номер массовой, Дата, начало окна, конец окна):
+повторный запуск перезаписывает строку (upsert), а не дублирует ее. На одну
+массовую за день хранится одно окно: если при повторе окно изменилось (например,
+исправлено "Окончание"), старое окно удаляется вместе с детализацией. Рядом с
+итогами lost/excess хранится детализация по 15-минутным интервалам отчета.
+CSV и запись в исходную книгу строятся из хранилища пачкой (проекции), историю
+за месяцы можно смотреть запросами без открытия xlsx.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from loguru import logger
+
+
+# === Константы ===
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RESULTS_DB = BASE_DIR / "results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    mass_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    win_start TEXT NOT NULL,
+    win_end TEXT NOT NULL,
+    region TEXT,
+    lost INTEGER NOT NULL,
+    excess REAL NOT NULL,
+    run_id TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (mass_number, date, win_start, win_end)
+);
+CREATE INDEX IF NOT EXISTS idx_results_date ON results(date);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+
+CREATE TABLE IF NOT EXISTS intervals (
+    mass_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    win_start TEXT NOT NULL,
+    win_end TEXT NOT NULL,
+    period TEXT NOT NULL,
+    calc REAL,
+    fcst REAL,
+    answ REAL,
+    lost REAL,
+    PRIMARY KEY (mass_number, date, win_start, win_end, period)
+);
+"""
+
+
+class ResultsStore:
+    """Класс хранилища результатов с семантикой upsert"""
+
+    def __init__(self, db_path: Path = DEFAULT_RESULTS_DB):
+        """
+        Инициализация хранилища (таблицы создаются при необходимости).
+
+        Args:
+            db_path: Путь к файлу SQLite
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Открывает соединение; транзакция фиксируется при успешном выходе."""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(
+        self,
+        mass_number: str,
+        win_start: datetime,
+        win_end: datetime,
+        lost: int,
+        excess: float,
+        region: str = None,
+        intervals: Optional[pd.DataFrame] = None,
+        run_id: str = None,
+    ) -> None:
+        """
+        Сохраняет результат окна, заменяя предыдущий результат массовой за этот день.
+
+        Args:
+            mass_number: Номер массовой
+            win_start: Начало окна
+            win_end: Конец окна
+            lost: Потерянные звонки
+            excess: Превышение
+            region: Регион
+            intervals: Детализация из calc_metrics_detailed (period, calc, fcst, answ, lost)
+            run_id: Идентификатор запуска
+        """
+        key = (str(mass_number), win_start.date().isoformat(), win_start.isoformat(), win_end.isoformat())
+        with self._connect() as conn:
+            # Окно массовой за день могло измениться с прошлого запуска - прежнее окно устарело
+            for table in ("results", "intervals"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE mass_number = ? AND date = ? AND NOT (win_start = ? AND win_end = ?)",
+                    key
+                )
+            conn.execute(
+                """
+                INSERT INTO results (mass_number, date, win_start, win_end, region, lost, excess, run_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (mass_number, date, win_start, win_end) DO UPDATE SET
+                    region = excluded.region,
+                    lost = excluded.lost,
+                    excess = excluded.excess,
+                    run_id = excluded.run_id,
+                    updated_at = excluded.updated_at
+                """,
+                key + (region, int(lost), float(excess), run_id, datetime.now().isoformat(timespec="seconds")),
+            )
+            if intervals is not None:
+                conn.execute(
+                    "DELETE FROM intervals WHERE mass_number = ? AND date = ? AND win_start = ? AND win_end = ?", key
+                )
+                conn.executemany(
+                    "INSERT INTO intervals (mass_number, date, win_start, win_end, period, calc, fcst, answ, lost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        key + (str(r.period), float(r.calc), float(r.fcst), float(r.answ), float(r.lost))
+                        for r in intervals.itertuples(index=False)
+                    ],
+                )
+
+    def query(self, date_from: date = None, date_to: date = None, mass_number: str = None,
+              run_id: str = None) -> pd.DataFrame:
+        """
+        Возвращает результаты с фильтрами по датам, номеру массовой и запуску.
+
+        Args:
+            date_from: Первая дата (включительно)
+            date_to: Последняя дата (включительно)
+            mass_number: Номер массовой
+            run_id: Идентификатор запуска
+
+        Returns:
+            pd.DataFrame: Строки таблицы results
+        """
+        conditions, params = [], []
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to.isoformat())
+        if mass_number:
+            conditions.append("mass_number = ?")
+            params.append(str(mass_number))
+        if run_id:
+            conditions.append("run_id = ?")
+            params.append(run_id)
+
+        sql = "SELECT * FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY date, mass_number, win_start"
+
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def intervals(self, mass_number: str, day: date) -> pd.DataFrame:
+        """
+        Возвращает детализацию по интервалам для номера массовой за день.
+
+        Args:
+            mass_number: Номер массовой
+            day: Дата
+
+        Returns:
+            pd.DataFrame: Строки таблицы intervals
+        """
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT * FROM intervals WHERE mass_number = ? AND date = ? ORDER BY win_start, period",
+                conn, params=[str(mass_number), day.isoformat()],
+            )
+
+    def region_intervals(self, date_from: date, date_to: date) -> pd.DataFrame:
+        """
+        Возвращает детализацию по интервалам всех окон с регионом за период.
+
+        Строки упорядочены по времени сохранения: при повторе периода последней
+        идет самая свежая выгрузка.
+
+        Args:
+            date_from: Первая дата (включительно)
+            date_to: Последняя дата (включительно)
+
+        Returns:
+            pd.DataFrame: Колонки region, date, period, calc, fcst, answ
+        """
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                """
+                SELECT r.region, i.date, i.period, i.calc, i.fcst, i.answ
+                FROM intervals i
+                JOIN results r USING (mass_number, date, win_start, win_end)
+                WHERE i.date BETWEEN ? AND ? AND r.region IS NOT NULL
+                ORDER BY r.updated_at, i.win_start, i.period
+                """,
+                conn, params=[date_from.isoformat(), date_to.isoformat()],
+            )
+
+    def export_csv(self, out_csv_path: Path, run_id: str = None) -> int:
+        """
+        Строит CSV (формат save_results_to_csv) из хранилища.
+
+        Args:
+            out_csv_path: Путь к CSV
+            run_id: Только результаты этого запуска (None - все)
+
+        Returns:
+            int: Количество строк
+        """
+        df = self.query(run_id=run_id)
+        out = pd.DataFrame({
+            "Номер массовой": df["mass_number"],
+            "Дата": df["date"],
+            "LostCalls": df["lost"],
+            "ExcessTraffic": df["excess"],
+        })
+        out.to_csv(out_csv_path, index=False, encoding="utf-8")
+        logger.success(f"Done → {out_csv_path} ({len(out)} rows)")
+        return len(out)
+
+    def workbook_rows(self, df: pd.DataFrame, row_dates) -> List[Dict[str, Any]]:
+        """
+        Строит пачку для save_results_batch_to_original_file по строкам Свода.
+
+        Args:
+            df: Строки Свода (индекс - индекс строки листа "Отчет")
+            row_dates: Дата каждой строки (Series с тем же индексом) или одна дата для всех строк
+
+        Returns:
+            List[Dict[str, Any]]: {"row_index", "mass_number", "date", "lost", "excess"} для строк с результатами
+        """
+        if not isinstance(row_dates, pd.Series):
+            row_dates = pd.Series([row_dates] * len(df), index=df.index, dtype=object)
+        dates = sorted({d for d in row_dates.dropna()})
+        if not dates:
+            return []
+
+        stored = self.query(date_from=dates[0], date_to=dates[-1])
+        if stored.empty:
+            return []
+        # upsert хранит одно окно на массовую за день; для баз, заполненных до этого, берем самое свежее
+        totals = (stored.sort_values(["updated_at", "win_start"])
+                  .drop_duplicates(["mass_number", "date"], keep="last")
+                  .set_index(["mass_number", "date"]))
+
+        rows = []
+        for idx, mass_number in df["Номер массовой"].items():
+            row_date = row_dates.get(idx)
+            if row_date is None or pd.isna(row_date):
+                continue
+            key = (str(mass_number), row_date.isoformat())
+            if key not in totals.index:
+                continue
+            total = totals.loc[key]
+            rows.append({
+                "row_index": idx,
+                "mass_number": mass_number,
+                "date": row_date,
+                "lost": int(total["lost"]),
+                "excess": float(total["excess"]),
+            })
+        return rows
@@ -0,0 +1,206 @@
+"""
+Модуль для живых метрик долгого запуска в формате Prometheus.
+
+Метрики строятся из RunProfile: задачи (выполнено/ошибки/ожидают), строк в минуту,
+перцентили длительностей фаз, доля результатов из кэша, память браузера и текущая
+задача. Отдаются одним из способов (или обоими):
+
+- HTTP на localhost (GET /metrics) - для Prometheus или браузера;
+- textfile (*.prom), который перезаписывается каждые interval секунд - для
+  textfile collector node_exporter / windows_exporter.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+from loguru import logger
+
+
+# === Константы ===
+DEFAULT_METRICS_INTERVAL = 5.0
+METRICS_HOST = "127.0.0.1"
+PERCENTILES = (0.5, 0.9, 0.99)
+PERCENTILE_WINDOW = 500
+PREFIX = "wfm"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу (values отсортированы)."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки Prometheus."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", " ")
+
+
+def render_metrics(profile) -> str:
+    """
+    Строит текст метрик Prometheus по профилю запуска.
+
+    Args:
+        profile: RunProfile
+
+    Returns:
+        str: Метрики в text exposition format
+    """
+    counts = profile.task_counts()
+    lines = [
+        f"# HELP {PREFIX}_tasks Задачи запуска по состоянию",
+        f"# TYPE {PREFIX}_tasks gauge",
+    ]
+    for state in ("done", "failed", "pending"):
+        lines.append(f"{PREFIX}_tasks{{state=\"{state}\"}} {counts[state]}")
+
+    finished = counts["done"] + counts["failed"]
+    lines += [
+        f"# HELP {PREFIX}_rows_per_minute Завершенных задач в минуту (скользящее окно)",
+        f"# TYPE {PREFIX}_rows_per_minute gauge",
+        f"{PREFIX}_rows_per_minute {counts['rows_per_minute']}",
+        f"# HELP {PREFIX}_cache_hit_ratio Доля результатов без выгрузки (кэш окон, сохраненные интервалы)",
+        f"# TYPE {PREFIX}_cache_hit_ratio gauge",
+        f"{PREFIX}_cache_hit_ratio {round(counts['cached'] / finished, 4) if finished else 0}",
+        f"# HELP {PREFIX}_elapsed_seconds Время с начала запуска",
+        f"# TYPE {PREFIX}_elapsed_seconds gauge",
+        f"{PREFIX}_elapsed_seconds {profile.elapsed()}",
+    ]
+
+    if profile.memory:
+        lines += [
+            f"# HELP {PREFIX}_browser_rss_mb Память дерева процессов браузера",
+            f"# TYPE {PREFIX}_browser_rss_mb gauge",
+            f"{PREFIX}_browser_rss_mb {profile.memory[-1]['rss_mb']}",
+        ]
+
+    lines += [
+        f"# HELP {PREFIX}_phase_seconds Длительность фаз (последние {PERCENTILE_WINDOW} замеров)",
+        f"# TYPE {PREFIX}_phase_seconds summary",
+    ]
+    # Фазы дописываются из потоков конвейера и вкладок - берем копии списков
+    for name, durations in list(profile.phases.items()):
+        durations = list(durations)
+        recent = sorted(durations[-PERCENTILE_WINDOW:])
+        for q in PERCENTILES:
+            lines.append(f"{PREFIX}_phase_seconds{{phase=\"{name}\",quantile=\"{q}\"}} {_percentile(recent, q)}")
+        lines.append(f"{PREFIX}_phase_seconds_sum{{phase=\"{name}\"}} {round(sum(durations), 3)}")
+        lines.append(f"{PREFIX}_phase_seconds_count{{phase=\"{name}\"}} {len(durations)}")
+
+    lines += [
+        f"# HELP {PREFIX}_current_task_info Текущая задача",
+        f"# TYPE {PREFIX}_current_task_info gauge",
+        f"{PREFIX}_current_task_info{{run_id=\"{_escape(profile.run_id)}\",task=\"{_escape(profile.current_task or '')}\"}} 1",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Класс для отдачи живых метрик по HTTP и/или в textfile"""
+
+    def __init__(self, profile, port: int = 0, textfile: Optional[Path] = None,
+                 interval: float = DEFAULT_METRICS_INTERVAL):
+        """
+        Инициализация экспортера.
+
+        Args:
+            profile: RunProfile
+            port: Порт HTTP на localhost (0 - без HTTP)
+            textfile: Файл метрик Prometheus (None - не писать)
+            interval: Период перезаписи textfile в секундах
+        """
+        self.profile = profile
+        self.port = port
+        self.textfile = Path(textfile) if textfile else None
+        self.interval = interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "MetricsExporter":
+        """Запускает HTTP сервер и/или поток записи textfile."""
+        if self.port:
+            profile = self.profile
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = render_metrics(profile).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((METRICS_HOST, self.port), Handler)
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True))
+            logger.info(f"📡 Метрики запуска: http://{METRICS_HOST}:{self.port}/metrics")
+
+        if self.textfile is not None:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+            self._threads.append(threading.Thread(target=self._write_loop, name="metrics-textfile", daemon=True))
+            logger.info(f"📡 Метрики запуска пишутся в {self.textfile} каждые {self.interval:g}с")
+
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def write_textfile(self) -> None:
+        """Атомарно перезаписывает textfile (collector не читает недописанный файл)."""
+        part = self.textfile.with_name(self.textfile.name + ".tmp")
+        part.write_text(render_metrics(self.profile), encoding="utf-8")
+        part.replace(self.textfile)
+
+    def _write_loop(self) -> None:
+        """Перезаписывает textfile, пока экспортер не остановлен."""
+        while not self._stop.is_set():
+            try:
+                self.write_textfile()
+            except Exception as e:
+                logger.debug(f"⚠️ Не удалось записать метрики: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        """Останавливает экспортер; textfile получает итоговые значения."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=self.interval + 1)
+        if self.textfile is not None:
+            try:
+                self.write_textfile()
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось записать итоговые метрики: {e}")
+
+
+def start_metrics_exporter(profile, port: int = 0, textfile: Optional[str] = None,
+                           interval: float = DEFAULT_METRICS_INTERVAL) -> Optional[MetricsExporter]:
+    """
+    Запускает экспортер метрик, если задан порт или файл.
+
+    Args:
+        profile: RunProfile
+        port: Порт HTTP на localhost (0 - выкл.)
+        textfile: Файл метрик Prometheus (None - выкл.)
+        interval: Период перезаписи textfile в секундах
+
+    Returns:
+        Optional[MetricsExporter]: Запущенный экспортер или None
+    """
+    if not port and not textfile:
+        return None
+    try:
+        return MetricsExporter(profile, port=port, textfile=textfile, interval=interval).start()
+    except OSError as e:
+        logger.warning(f"⚠️ Метрики запуска недоступны: {e}")
+        return None
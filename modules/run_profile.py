@@ -0,0 +1,244 @@
+"""
+Модуль для профиля запуска: события, кривая памяти браузера и длительности фаз.
+
+Профиль сохраняется в runs/<run_id>/profile.json в конце работы скрипта.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from .phase_profiler import PhaseProfiler
+
+
+# === Константы ===
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUNS_DIR = BASE_DIR / "runs"
+THROUGHPUT_WINDOW_S = 300
+HISTORY_RUNS = 20
+
+
+def task_label(mass_number, win_start, win_end) -> str:
+    """Короткое описание задачи для живых метрик: номер массовой и окно."""
+    return f"{mass_number or ''} {win_start:%d.%m.%Y %H:%M}-{win_end:%H:%M}".strip()
+
+
+def load_phase_history(runs_dir: Path = RUNS_DIR, limit: int = HISTORY_RUNS) -> Dict[str, float]:
+    """
+    Средние длительности фаз по последним сохраненным профилям (для оценки --plan).
+
+    Args:
+        runs_dir: Папка запусков
+        limit: Сколько последних профилей учитывать
+
+    Returns:
+        Dict[str, float]: Фаза → средняя длительность одного вызова в секундах
+    """
+    totals: Dict[str, List[float]] = {}
+    profiles = sorted(Path(runs_dir).glob("*/profile.json"), key=lambda p: p.stat().st_mtime)[-limit:]
+    for path in profiles:
+        try:
+            phases = json.loads(path.read_text(encoding="utf-8")).get("phases", {})
+        except (OSError, ValueError):
+            continue
+        for name, stats in phases.items():
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += stats.get("total_s", 0.0)
+            entry[1] += stats.get("count", 0)
+    return {name: total / count for name, (total, count) in totals.items() if count}
+
+
+class RunProfile:
+    """Класс для сбора телеметрии одного запуска скрипта"""
+
+    def __init__(self, runs_dir: Path = RUNS_DIR, run_id: str = None):
+        """
+        Инициализация профиля.
+
+        Args:
+            runs_dir: Папка, в которой создается папка запуска
+            run_id: Идентификатор запуска (по умолчанию - текущие дата и время)
+        """
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_dir = Path(runs_dir) / self.run_id
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+
+        self.events: List[Dict[str, Any]] = []
+        self.memory: List[Dict[str, Any]] = []
+        self.phases: Dict[str, List[float]] = {}
+        self.queues: Dict[str, List[int]] = {}
+
+        # Счетчики задач для живых метрик (run_metrics); задачи завершаются и в потоках
+        self.tasks = {"planned": 0, "done": 0, "failed": 0, "cached": 0}
+        self.current_task: Optional[str] = None
+        self._finished = deque()
+        self._tasks_lock = threading.Lock()
+        self.profiler: Optional[PhaseProfiler] = None
+
+    def enable_profiler(self, phases=None) -> PhaseProfiler:
+        """
+        Включает профилирование фаз (--profile): pstats и collapsed stacks в runs/<run_id>/profiles.
+
+        Args:
+            phases: Фазы для профилирования (None - набор по умолчанию)
+
+        Returns:
+            PhaseProfiler: Профайлер запуска
+        """
+        self.profiler = PhaseProfiler(self.run_dir / "profiles", phases)
+        logger.info(f"🔬 Профилирование фаз: {', '.join(sorted(self.profiler.phases))}")
+        return self.profiler
+
+    def elapsed(self) -> float:
+        """Секунды с начала запуска."""
+        return round(time.perf_counter() - self._t0, 3)
+
+    def record_event(self, kind: str, **details) -> None:
+        """
+        Записывает событие запуска (например, пересоздание браузера).
+
+        Args:
+            kind: Тип события
+            **details: Произвольные детали события
+        """
+        event = {"t": self.elapsed(), "kind": kind}
+        event.update(details)
+        self.events.append(event)
+
+    def record_memory(self, rss_mb: float, task_number: int) -> None:
+        """
+        Записывает точку кривой памяти браузера.
+
+        Args:
+            rss_mb: Суммарный RSS дерева процессов браузера (МБ)
+            task_number: Порядковый номер задачи в текущей сессии браузера
+        """
+        self.memory.append({"t": self.elapsed(), "task": task_number, "rss_mb": round(rss_mb, 1)})
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        """Записывает длительность фазы."""
+        self.phases.setdefault(name, []).append(round(seconds, 4))
+
+    def add_planned(self, count: int) -> None:
+        """Добавляет задачи к запланированным (для числа ожидающих задач)."""
+        with self._tasks_lock:
+            self.tasks["planned"] += count
+
+    def start_task(self, label: str) -> None:
+        """Запоминает текущую задачу (номер массовой, дата)."""
+        self.current_task = label
+
+    def record_task(self, success: bool, cached: bool = False) -> None:
+        """
+        Учитывает завершенную задачу.
+
+        Args:
+            success: Задача выполнена без ошибки
+            cached: Результат взят из кэша, а не выгружен
+        """
+        now = time.monotonic()
+        with self._tasks_lock:
+            self.tasks["done" if success else "failed"] += 1
+            if cached:
+                self.tasks["cached"] += 1
+            self._finished.append(now)
+            while self._finished and now - self._finished[0] > THROUGHPUT_WINDOW_S:
+                self._finished.popleft()
+
+    def task_counts(self) -> Dict[str, Any]:
+        """
+        Снимок счетчиков задач.
+
+        Returns:
+            Dict[str, Any]: planned, done, failed, cached, pending и rows_per_minute
+                (за последние THROUGHPUT_WINDOW_S секунд)
+        """
+        now = time.monotonic()
+        with self._tasks_lock:
+            counts = dict(self.tasks)
+            recent = sum(1 for t in self._finished if now - t <= THROUGHPUT_WINDOW_S)
+        counts["pending"] = max(0, counts["planned"] - counts["done"] - counts["failed"])
+        window = min(THROUGHPUT_WINDOW_S, max(self.elapsed(), 1.0))
+        counts["rows_per_minute"] = round(recent * 60 / window, 2)
+        return counts
+
+    def record_queue_depth(self, stage: str, depth: int) -> None:
+        """
+        Записывает глубину очереди стадии конвейера (pipeline_executor).
+
+        Args:
+            stage: Стадия (parse, write)
+            depth: Сколько элементов ждет или обрабатывается стадией
+        """
+        self.queues.setdefault(stage, []).append(int(depth))
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Контекстный менеджер для замера длительности фазы.
+
+        Args:
+            name: Название фазы (download_report, calc_metrics, ...)
+        """
+        hooks = self.profiler.profile(name) if self.profiler is not None else nullcontext()
+        start = time.perf_counter()
+        try:
+            with hooks:
+                yield
+        finally:
+            self.record_duration(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Any]:
+        """Возвращает профиль в виде словаря для сохранения."""
+        phases = {}
+        for name, durations in self.phases.items():
+            phases[name] = {
+                "count": len(durations),
+                "total_s": round(sum(durations), 3),
+                "durations": durations,
+            }
+
+        queues = {}
+        for stage, depths in self.queues.items():
+            queues[stage] = {
+                "samples": len(depths),
+                "max": max(depths),
+                "avg": round(sum(depths) / len(depths), 2),
+            }
+
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "elapsed_s": self.elapsed(),
+            "events": self.events,
+            "memory": self.memory,
+            "phases": phases,
+            "queues": queues,
+            "tasks": self.task_counts(),
+        }
+
+    def save(self) -> Path:
+        """
+        Сохраняет профиль в runs/<run_id>/profile.json.
+
+        Returns:
+            Path: Путь к сохраненному файлу
+        """
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        profile_path = self.run_dir / "profile.json"
+        profile_path.write_text(
+            json.dumps(self.summary(), ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        logger.info(f"📈 Профиль запуска сохранен: {profile_path}")
+        if self.profiler is not None:
+            self.profiler.save()
+        return profile_path
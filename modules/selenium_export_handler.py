@@ -3,9 +3,7 @@
 Использует клики по меню вместо API-вызовов для максимальной надежности
 """
 
-import re
 import time
-import json
 import os
 from pathlib import Path
 from selenium.webdriver.common.by import By
@@ -14,10 +12,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+from .direct_download import DirectDownloader
+from .network_idle import get_network_tracker
+
 
 class SeleniumExportHandler:
     """Класс для надежного экспорта отчетов через Selenium клики"""
 
+    # URL экспорта из клиентского объекта ReportViewer (тот же, что уходит при клике Export → Excel)
+    EXPORT_URL_JS = """
+        try {
+            const rv = window.$find && $find('ReportViewerControl');
+            const viewer = rv && rv._getInternalViewer ? rv._getInternalViewer() : null;
+            if (viewer && viewer.ExportUrlBase) {
+                return new URL(viewer.ExportUrlBase + encodeURIComponent(arguments[0]), document.baseURI).href;
+            }
+        } catch (e) {}
+        return null;
+    """
+
     def __init__(self, driver, logger_instance, download_dir=None):
         self.driver = driver
         self.logger = logger_instance
@@ -34,6 +47,9 @@ class SeleniumExportHandler:
         self.download_dir.mkdir(parents=True, exist_ok=True)
         self.logger.info(f"📁 Директория загрузок: {self.download_dir}")
 
+        # Пул HTTP-соединений для прямого скачивания (создается при первом экспорте)
+        self._downloader = None
+
     def _dispatch_click_js(self, driver, el):
         """Отправить полную последовательность событий клика через JavaScript"""
         driver.execute_script("""
@@ -218,25 +234,15 @@ class SeleniumExportHandler:
             return None
 
     def find_export_url_in_perf_logs(self, driver, timeout=5):
-        """Поиск URL экспорта в performance логах браузера"""
+        """Поиск URL экспорта в performance логах браузера (через общий сетевой трекер)"""
         try:
-            end = time.time() + timeout
-            rx = re.compile(r"Reserved\.ReportViewerWebControl\.axd.*Format=EXCELOPENXML", re.I)
-
             self.logger.info("🔍 Анализируем performance логи браузера...")
-
-            while time.time() < end:
-                for entry in driver.get_log("performance"):
-                    try:
-                        msg = json.loads(entry["message"])["message"]
-                        if msg.get("method") == "Network.requestWillBeSent":
-                            url = msg["params"]["request"]["url"]
-                            if rx.search(url):
-                                self.logger.info(f"✅ Найден URL экспорта в логах: {url}")
-                                return url
-                    except Exception:
-                        continue
-                time.sleep(0.2)
+            url = get_network_tracker(driver).find_url(
+                r"Reserved\.ReportViewerWebControl\.axd.*Format=EXCELOPENXML", timeout=timeout
+            )
+            if url:
+                self.logger.info(f"✅ Найден URL экспорта в логах: {url}")
+                return url
 
             self.logger.warning("⚠️ URL экспорта в performance логах не найден")
             return None
@@ -245,6 +251,46 @@ class SeleniumExportHandler:
             self.logger.error(f"❌ Ошибка при анализе performance логов: {e}")
             return None
 
+    def build_export_url(self, export_format="EXCELOPENXML"):
+        """Построить URL экспорта из ReportViewer (нужен контекст фрейма с ReportViewer)"""
+        try:
+            url = self.driver.execute_script(self.EXPORT_URL_JS, export_format)
+            if url:
+                self.logger.info(f"✅ URL экспорта построен: {url[:120]}")
+            return url
+        except Exception as e:
+            self.logger.warning(f"⚠️ Не удалось построить URL экспорта: {e}")
+            return None
+
+    def export_excel_direct(self, download_dir: Path, filename=None, overall_timeout=300) -> Path | None:
+        """Экспорт без менеджера загрузок Chrome: URL экспорта + HTTP с cookies браузера"""
+        try:
+            self.logger.info("🚀 Пробуем прямое скачивание экспорта Excel...")
+
+            if not self.switch_to_frame_with_reportviewer(timeout=30):
+                raise RuntimeError("ReportViewer frame not found")
+
+            if not self.wait_for_report_loaded_xhr(timeout=60):
+                self.logger.warning("⚠️ Не удалось дождаться загрузки отчета по XHR, продолжаем...")
+
+            url = self.build_export_url() or self.find_export_url_in_perf_logs(self.driver, timeout=1)
+            if not url:
+                self.logger.warning("⚠️ URL экспорта не найден - прямое скачивание невозможно")
+                return None
+
+            # Cookies берутся в контексте фрейма отчета (домен ReportViewer)
+            if self._downloader is None:
+                self._downloader = DirectDownloader(self.driver)
+            else:
+                self._downloader.sync_cookies()
+
+            path, _ = self._downloader.download(url, Path(download_dir), filename, timeout=overall_timeout)
+            return path
+
+        except Exception as e:
+            self.logger.warning(f"⚠️ Прямое скачивание не удалось: {e}")
+            return None
+
     def export_excel_by_click(self, report_url: str, download_dir: Path, overall_timeout=120) -> Path | None:
         """Всё вместе: сценарий экспорта «кликом»"""
         try:
@@ -325,64 +371,19 @@ class SeleniumExportHandler:
             return False
 
     def wait_for_report_loaded_xhr(self, timeout=60):
-        """Ждать загрузки отчета по завершению XHR запросов"""
+        """Ждать загрузки отчета: запросов в полете нет (события Network.* по requestId)"""
         try:
             self.logger.info("🔍 Ждем завершения XHR запросов для загрузки отчета...")
 
-            # Проверяем доступность performance логов
-            try:
-                self.driver.get_log("performance")
-                self.logger.info("✅ Performance логи доступны")
-            except Exception:
+            tracker = get_network_tracker(self.driver)
+            if tracker.wait_for_idle(idle_ms=1000, timeout=timeout):
+                self.logger.info("✅ XHR запросы завершены, отчет загружен")
+                return True
+
+            if not tracker.available:
                 self.logger.info("ℹ️ Performance логи недоступны, используем программные признаки загрузки")
                 return self._wait_for_report_loaded_by_elements(timeout)
 
-            start_time = time.time()
-            last_activity_time = start_time
-
-            while time.time() - start_time < timeout:
-                try:
-                    # Получаем performance логи
-                    logs = self.driver.get_log("performance")
-
-                    # Ищем активные XHR запросы
-                    active_requests = []
-                    for entry in logs:
-                        try:
-                            msg = json.loads(entry["message"])["message"]
-                            if msg.get("method") == "Network.requestWillBeSent":
-                                url = msg["params"]["request"]["url"]
-                                request_id = msg["params"]["requestId"]
-
-                                # Фильтруем только запросы к отчетам
-                                if any(keyword in url.lower() for keyword in ["report", "reportviewer", "axd"]):
-                                    active_requests.append({
-                                        "id": request_id,
-                                        "url": url,
-                                        "time": msg["params"]["timestamp"]
-                                    })
-                                    last_activity_time = time.time()
-
-                        except Exception:
-                            continue
-
-                    # Если нет активных запросов и прошло достаточно времени с последней активности
-                    if not active_requests and (time.time() - last_activity_time) > 3:
-                        self.logger.info("✅ XHR запросы завершены, отчет загружен")
-                        return True
-
-                    # Показываем прогресс
-                    if active_requests:
-                        self.logger.info(f"⏳ Активных XHR запросов: {len(active_requests)}")
-                        for req in active_requests[:2]:  # Показываем первые 2
-                            self.logger.info(f"   • {req['url'][:80]}...")
-
-                    time.sleep(1)
-
-                except Exception as e:
-                    self.logger.warning(f"⚠️ Ошибка при анализе XHR: {e}")
-                    time.sleep(1)
-
             self.logger.warning(f"⚠️ Timeout ожидания XHR ({timeout}с), продолжаем...")
             return False
 
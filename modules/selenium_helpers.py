@@ -5,6 +5,7 @@
 import os
 import time
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
 from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -18,13 +19,34 @@ from selenium.common.exceptions import NoSuchFrameException
 # === Константы ===
 BASE_DIR = Path(__file__).resolve().parent.parent
 DOWNLOAD_DIR = BASE_DIR / "downloads"
-DOWNLOAD_DIR.mkdir(exist_ok=True)
 
-REPORT_URL = (
+DEFAULT_REPORT_URL = (
     "http://t2ru-optiweb-02/TeleoptiWFM/Web/Areas/Reporting/"
     "Index.aspx?ReportID=8d8544e4-6b24-4c1c-8083-cbe7522dd0e0&UseOpenXml=true"
 )
 
+
+def resolve_report_url(override: str = None) -> str:
+    """
+    Адрес формы отчета с учетом WFM_REPORT_URL (запись/воспроизведение сессии, тестовый сервер).
+
+    Args:
+        override: Полный адрес или только scheme://host:port (путь отчета сохраняется)
+
+    Returns:
+        str: Адрес формы отчета
+    """
+    override = override if override is not None else os.environ.get("WFM_REPORT_URL", "")
+    if not override:
+        return DEFAULT_REPORT_URL
+    parts = urlsplit(override)
+    if parts.path in ("", "/"):
+        return urlunsplit(urlsplit(DEFAULT_REPORT_URL)._replace(scheme=parts.scheme, netloc=parts.netloc))
+    return override
+
+
+REPORT_URL = resolve_report_url()
+
 # === Proxy setup ===
 def setup_proxy():
     """Настраивает корпоративный прокси."""
@@ -88,6 +110,9 @@ def get_driver(headless: bool = True) -> webdriver.Chrome:
     opts.add_argument("--disable-features=TranslateUI")
     opts.add_argument("--disable-ipc-flooding-protection")
 
+    # Папка загрузок создается при запуске браузера, а не при импорте модуля
+    DOWNLOAD_DIR.mkdir(exist_ok=True)
+
     # КРИТИЧЕСКИ ВАЖНЫЕ настройки для ПРИНУДИТЕЛЬНОГО скачивания Excel файлов
     prefs = {
         "download.default_directory": str(DOWNLOAD_DIR.absolute()),
@@ -112,6 +137,10 @@ def get_driver(headless: bool = True) -> webdriver.Chrome:
     }
     opts.add_experimental_option("prefs", prefs)
 
+    # Performance лог с событиями Network.* - для отслеживания сетевой активности (network_idle)
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    opts.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
     # Убираем детекцию автоматизации
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option('useAutomationExtension', False)
@@ -309,13 +338,14 @@ def wait_download(start_ts: float, timeout: int = 60, driver=None) -> Path:
     raise TimeoutError("Download timeout")
 
 
-def apply_cdp_download_settings(driver):
-    """Применяет CDP настройки скачивания."""
+def apply_cdp_download_settings(driver, download_dir: Path = None):
+    """Применяет CDP настройки скачивания (download_dir - своя папка сессии, по умолчанию DOWNLOAD_DIR)."""
     logger.info("🔧 Применяем CDP настройки скачивания...")
+    Path(download_dir or DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
     try:
         params = {
             "behavior": "allow",              # Разрешаем скачивание без вопросов
-            "downloadPath": str(DOWNLOAD_DIR.absolute())  # Путь, куда скачивать файлы
+            "downloadPath": str(Path(download_dir or DOWNLOAD_DIR).absolute())  # Путь, куда скачивать файлы
         }
         driver.execute_cdp_cmd("Page.setDownloadBehavior", params)
         logger.info("✅ CDP настройки скачивания применены")
@@ -0,0 +1,372 @@
+"""
+Модуль для записи и воспроизведения HTTP-обменов реальной сессии Teleopti.
+
+Запись: локальный обратный прокси (RecordingProxy) пересылает запросы браузера на
+сервер Teleopti и сохраняет каждый обмен (страницы формы, postback'и, xlsx) в кассету.
+Браузер открывает отчет через прокси - адрес отчета подменяется переменной окружения
+WFM_REPORT_URL. На каждое соединение браузера открывается свое соединение с сервером,
+поэтому NTLM-авторизация проходит через прокси; ответы 401 (рукопожатие) не пишутся.
+
+Воспроизведение: ReplayServer отдает записанные ответы без сети. Запрос сопоставляется
+с записью по методу, пути и полям (query + поля формы POST); служебные поля ASP.NET
+(__VIEWSTATE и т.п.) не учитываются. Из одинаково подходящих записей берется наименее
+использованная, при равенстве - более ранняя, поэтому повторный прогон детерминирован.
+
+Кассета - папка с exchanges.jsonl (метаданные обменов), bodies/ (тела ответов как есть)
+и calls.json (вызовы download_report с ожидаемыми метриками, пишет replay_session.py).
+"""
+
+import hashlib
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from loguru import logger
+
+
+# === Константы ===
+REPLAY_HOST = "127.0.0.1"
+DEFAULT_REPLAY_PORT = 8765
+UPSTREAM_TIMEOUT = 300
+
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+    "transfer-encoding", "upgrade", "content-length", "content-encoding",
+})
+# Служебные поля ASP.NET зависят от предыдущего ответа, а не от параметров отчета
+IGNORED_FIELDS = frozenset({
+    "__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION", "__PREVIOUSPAGE", "__LASTFOCUS", "_",
+})
+TEXT_CONTENT_TYPES = ("text/", "javascript", "json", "xml")
+
+
+def origin_of(url: str) -> str:
+    """Возвращает scheme://host[:port] адреса."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def request_fields(target: str, body: bytes, content_type: str) -> Dict[str, List[str]]:
+    """
+    Поля запроса для сопоставления: параметры query и поля формы POST.
+
+    Args:
+        target: Путь запроса с query
+        body: Тело запроса
+        content_type: Content-Type запроса
+
+    Returns:
+        Dict[str, List[str]]: Поля (для тела не-формы - его sha256 в поле "__body__")
+    """
+    fields = parse_qs(urlsplit(target).query, keep_blank_values=True)
+    if body:
+        if "application/x-www-form-urlencoded" in (content_type or ""):
+            for name, values in parse_qs(body.decode("utf-8", "replace"), keep_blank_values=True).items():
+                fields.setdefault(name, []).extend(values)
+        else:
+            fields["__body__"] = [hashlib.sha256(body).hexdigest()]
+    return fields
+
+
+def _rewrite(body: bytes, headers: List[Tuple[str, str]], source: str, target: str) -> Tuple[bytes, List[Tuple[str, str]]]:
+    """Заменяет адрес source на target в текстовом теле и заголовке Location."""
+    content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+    if any(marker in content_type for marker in TEXT_CONTENT_TYPES):
+        body = body.replace(source.encode(), target.encode())
+    headers = [(k, v.replace(source, target) if k.lower() == "location" else v) for k, v in headers]
+    return body, headers
+
+
+class Cassette:
+    """Класс кассеты: записанные обмены и их сопоставление с запросами"""
+
+    def __init__(self, root: Path):
+        """
+        Инициализация (существующие обмены загружаются из exchanges.jsonl).
+
+        Args:
+            root: Папка кассеты
+        """
+        self.root = Path(root)
+        self.exchanges: List[Dict[str, Any]] = []
+        self._served: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        index = self.root / "exchanges.jsonl"
+        if index.exists():
+            with open(index, encoding="utf-8") as f:
+                self.exchanges = [json.loads(line) for line in f if line.strip()]
+
+    @property
+    def upstream(self) -> Optional[str]:
+        """Адрес сервера, с которого записана кассета."""
+        return self.exchanges[0]["upstream"] if self.exchanges else None
+
+    def add(self, upstream: str, method: str, target: str, fields: Dict[str, List[str]], status: int,
+            reason: str, headers: List[Tuple[str, str]], body: bytes, elapsed_ms: float) -> Dict[str, Any]:
+        """
+        Сохраняет обмен (тело ответа - в bodies/, метаданные - строкой exchanges.jsonl).
+
+        Returns:
+            Dict[str, Any]: Записанный обмен
+        """
+        with self._lock:
+            seq = len(self.exchanges)
+            body_path = Path("bodies") / f"{seq:06d}.bin"
+            (self.root / "bodies").mkdir(parents=True, exist_ok=True)
+            (self.root / body_path).write_bytes(body)
+            exchange = {
+                "seq": seq,
+                "upstream": upstream,
+                "method": method,
+                "path": urlsplit(target).path,
+                "target": target,
+                "fields": fields,
+                "status": status,
+                "reason": reason,
+                "headers": headers,
+                "body": body_path.as_posix(),
+                "elapsed_ms": round(elapsed_ms, 1),
+            }
+            self.exchanges.append(exchange)
+            with open(self.root / "exchanges.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+        return exchange
+
+    def body(self, exchange: Dict[str, Any]) -> bytes:
+        """Тело ответа обмена."""
+        return (self.root / exchange["body"]).read_bytes()
+
+    def match(self, method: str, target: str, fields: Dict[str, List[str]],
+              strict: bool = False) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """
+        Подбирает запись для запроса.
+
+        Args:
+            method: HTTP метод
+            target: Путь запроса с query
+            fields: Поля запроса (request_fields)
+            strict: Только полное совпадение полей
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], List[str]]: (обмен или None, поля с отличиями)
+        """
+        path = urlsplit(target).path
+        best, best_rank, best_diff = None, None, []
+        with self._lock:
+            for exchange in self.exchanges:
+                if exchange["method"] != method or exchange["path"] != path:
+                    continue
+                recorded = exchange["fields"]
+                names = (set(recorded) | set(fields)) - IGNORED_FIELDS
+                diff = sorted(name for name in names if recorded.get(name) != fields.get(name))
+                if strict and diff:
+                    continue
+                rank = (len(diff), self._served.get(exchange["seq"], 0), exchange["seq"])
+                if best_rank is None or rank < best_rank:
+                    best, best_rank, best_diff = exchange, rank, diff
+            if best is not None:
+                self._served[best["seq"]] = self._served.get(best["seq"], 0) + 1
+        return best, best_diff
+
+    def reset(self) -> None:
+        """Сбрасывает счетчики использования (новый прогон с начала кассеты)."""
+        with self._lock:
+            self._served.clear()
+
+
+class _ServerBase:
+    """Общий запуск ThreadingHTTPServer на localhost в фоновом потоке"""
+
+    handler_class = None
+
+    def __init__(self, cassette: Cassette, port: int = DEFAULT_REPLAY_PORT):
+        self.cassette = cassette
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес сервера для WFM_REPORT_URL."""
+        return f"http://{REPLAY_HOST}:{self.port}"
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        handler = type(self.handler_class.__name__, (self.handler_class,), {"owner": self})
+        self._server = ThreadingHTTPServer((REPLAY_HOST, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    """Пересылает запросы на сервер Teleopti и записывает обмены"""
+
+    protocol_version = "HTTP/1.1"
+    owner = None
+
+    def do_GET(self):
+        self._forward()
+
+    do_POST = do_HEAD = do_GET
+
+    def _upstream_connection(self, fresh: bool = False) -> http.client.HTTPConnection:
+        """Соединение с сервером для этого соединения браузера (нужно для NTLM)."""
+        connection = getattr(self, "_upstream", None)
+        if connection is None or fresh:
+            if connection is not None:
+                connection.close()
+            parts = urlsplit(self.owner.upstream)
+            factory = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            connection = factory(parts.netloc, timeout=UPSTREAM_TIMEOUT)
+            self._upstream = connection
+        return connection
+
+    def _forward(self):
+        owner = self.owner
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        headers = {
+            k: v.replace(owner.base_url, owner.upstream)
+            for k, v in self.headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() != "host"
+        }
+        headers["Host"] = urlsplit(owner.upstream).netloc
+        # Тела пишутся в кассету как есть - без сжатия
+        headers["Accept-Encoding"] = "identity"
+
+        started = time.perf_counter()
+        try:
+            try:
+                connection = self._upstream_connection()
+                connection.request(self.command, self.path, body, headers)
+                response = connection.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                # Сервер закрыл keep-alive соединение - повторяем в новом
+                connection = self._upstream_connection(fresh=True)
+                connection.request(self.command, self.path, body, headers)
+                response = connection.getresponse()
+            data = response.read()
+        except Exception as e:
+            logger.error(f"❌ Прокси записи: {self.command} {self.path[:80]} - {e}")
+            self.send_error(502, str(e))
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        response_headers = [(k, v) for k, v in response.getheaders() if k.lower() not in HOP_BY_HOP_HEADERS]
+        if response.status != 401:
+            fields = request_fields(self.path, body, self.headers.get("Content-Type", ""))
+            exchange = owner.cassette.add(owner.upstream, self.command, self.path, fields, response.status,
+                                          response.reason, response_headers, data, elapsed_ms)
+            logger.debug(f"📼 #{exchange['seq']} {self.command} {self.path[:80]} → {response.status} ({len(data)} байт)")
+
+        data, response_headers = _rewrite(data, response_headers, owner.upstream, owner.base_url)
+        self.send_response(response.status, response.reason)
+        for name, value in response_headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def finish(self):
+        super().finish()
+        if getattr(self, "_upstream", None) is not None:
+            self._upstream.close()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RecordingProxy(_ServerBase):
+    """Класс обратного прокси, записывающего обмены с сервером Teleopti в кассету"""
+
+    handler_class = _RecordingHandler
+
+    def __init__(self, cassette: Cassette, upstream: str, port: int = DEFAULT_REPLAY_PORT):
+        """
+        Инициализация прокси.
+
+        Args:
+            cassette: Кассета для записи
+            upstream: Адрес сервера (scheme://host[:port])
+            port: Порт прокси на localhost
+        """
+        super().__init__(cassette, port)
+        self.upstream = origin_of(upstream)
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Отдает записанные ответы"""
+
+    protocol_version = "HTTP/1.1"
+    owner = None
+
+    def do_GET(self):
+        owner = self.owner
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        fields = request_fields(self.path, body, self.headers.get("Content-Type", ""))
+        exchange, diff = owner.cassette.match(self.command, self.path, fields, strict=owner.strict)
+
+        if exchange is None:
+            owner.unmatched.append(f"{self.command} {self.path}")
+            logger.warning(f"⚠️ Нет записи для {self.command} {self.path[:100]}")
+            self.send_error(404, "Not recorded")
+            return
+        if diff:
+            owner.mismatched.append(f"{self.command} {self.path}: {', '.join(diff[:5])}")
+            logger.warning(f"⚠️ {self.command} {self.path[:60]}: отдана запись #{exchange['seq']}, "
+                           f"отличаются поля: {', '.join(diff[:5])}")
+        if owner.latency:
+            time.sleep(exchange["elapsed_ms"] / 1000)
+
+        data, headers = _rewrite(owner.cassette.body(exchange), exchange["headers"],
+                                 exchange["upstream"], owner.base_url)
+        self.send_response(exchange["status"], exchange["reason"])
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    do_POST = do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(_ServerBase):
+    """Класс сервера воспроизведения кассеты без сети"""
+
+    handler_class = _ReplayHandler
+
+    def __init__(self, cassette: Cassette, port: int = DEFAULT_REPLAY_PORT,
+                 strict: bool = False, latency: bool = False):
+        """
+        Инициализация сервера.
+
+        Args:
+            cassette: Записанная кассета
+            port: Порт на localhost
+            strict: Отдавать только записи с полным совпадением полей (иначе 404)
+            latency: Выдерживать записанное время ответа сервера
+        """
+        super().__init__(cassette, port)
+        self.strict = strict
+        self.latency = latency
+        self.unmatched: List[str] = []
+        self.mismatched: List[str] = []
@@ -0,0 +1,171 @@
+"""
+Модуль для сборки Свода (замена запроса Power Query "Свод по заметкам").
+
+Повторяет шаги запроса из pivot.txt:
+1. Свод по заметкам (ДатаБезВремени → дата)
+2. + Массовые_проблемы по "Номер массовой" (Название, Регион)
+3. + MassiveIncidents по "Номер массовой" (Старт из первых 12 цифр "Что_происходит", Окончание)
+4. + р_мр по региону (Макрорегион)
+5. Месяц, Неделя (вс), Неделя (ISO) и пустая колонка "Всего жалоб"
+
+Источники - выгрузки CSV/XLSX или таблицы Access через ODBC (если установлен pyodbc).
+Результат записывается листом "Отчет" - тем, что читает process_excel_data.
+"""
+
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+from loguru import logger
+
+from .date_time_utils import parse_datetime_series
+
+try:
+    import pyodbc
+except ImportError:  # pyodbc нужен только для чтения Access напрямую
+    pyodbc = None
+
+
+# === Константы ===
+SVOD_SHEET = "Отчет"
+NOTES_TABLE = "Свод по заметкам"
+MASSIVE_TABLE = "MassiveIncidents"
+ACCESS_DRIVER = "{Microsoft Access Driver (*.mdb, *.accdb)}"
+COMPLAINTS_COLUMN = "Всего жалоб"
+
+
+def read_table(source: Path, table: Optional[str] = None) -> pd.DataFrame:
+    """
+    Читает таблицу из CSV, XLSX (лист table или первый) или базы Access (таблица table).
+
+    Args:
+        source: Путь к файлу
+        table: Имя листа/таблицы
+
+    Returns:
+        pd.DataFrame: Данные таблицы
+    """
+    source = Path(source)
+    suffix = source.suffix.lower()
+
+    if suffix == ".csv":
+        return pd.read_csv(source)
+    if suffix in (".xlsx", ".xlsm", ".xls"):
+        return pd.read_excel(source, sheet_name=table if table else 0)
+    if suffix in (".accdb", ".mdb"):
+        if pyodbc is None:
+            raise ImportError("Для чтения Access установите pyodbc (или выгрузите таблицу в CSV/XLSX)")
+        if not table:
+            raise ValueError("Для базы Access нужно указать имя таблицы")
+        conn = pyodbc.connect(f"DRIVER={ACCESS_DRIVER};DBQ={source}")
+        try:
+            return pd.read_sql(f"SELECT * FROM [{table}]", conn)
+        finally:
+            conn.close()
+
+    raise ValueError(f"Неподдерживаемый формат источника: {source}")
+
+
+def extract_start_from_text(series: pd.Series) -> pd.Series:
+    """
+    Векторно извлекает "Старт" из текста "Что_происходит": первые 12 цифр как ДДММГГГГЧЧММ.
+
+    Args:
+        series: Колонка "Что_происходит"
+
+    Returns:
+        pd.Series: Колонка datetime64 (NaT, если цифр меньше 12 или дата некорректна)
+    """
+    # Как Text.Select(txt, {"0".."9"}): все цифры текста подряд, затем первые 12
+    digits = series.astype("string").str.replace(r"\D+", "", regex=True)
+    core = digits.str.extract(r"^(\d{12})", expand=False)
+    return pd.to_datetime(core, format="%d%m%Y%H%M", errors="coerce")
+
+
+def _week_of_year(dates: pd.Series, first_weekday: int) -> pd.Series:
+    """
+    Аналог Date.WeekOfYear: неделя 1 содержит 1 января, недели начинаются с first_weekday.
+
+    Args:
+        dates: Колонка datetime64
+        first_weekday: Первый день недели (0 - понедельник, 6 - воскресенье)
+
+    Returns:
+        pd.Series: Номер недели (Int64)
+    """
+    jan1 = dates.dt.to_period("Y").dt.start_time
+    jan1_offset = (jan1.dt.dayofweek - first_weekday) % 7
+    return ((dates.dt.dayofyear - 1 + jan1_offset) // 7 + 1).astype("Int64")
+
+
+def build_svod(notes: pd.DataFrame, mass_problems: pd.DataFrame, massive: pd.DataFrame,
+               macro: pd.DataFrame) -> pd.DataFrame:
+    """
+    Собирает Свод из заметок и справочников.
+
+    Args:
+        notes: "Свод по заметкам" (Номер массовой, ДатаБезВремени, ...)
+        mass_problems: Массовые проблемы (load_mass_problems: Номер массовой, Название, Регион)
+        massive: MassiveIncidents (Номер, Что_происходит, Окончание)
+        macro: Справочник р_мр (регион, мр)
+
+    Returns:
+        pd.DataFrame: Строки листа "Отчет"
+    """
+    svod = notes.copy()
+    svod["Номер массовой"] = pd.to_numeric(svod["Номер массовой"], errors="coerce").astype("Int64")
+    svod["ДатаБезВремени"] = parse_datetime_series(svod["ДатаБезВремени"], "%d.%m.%Y").dt.normalize()
+
+    # 2. Название и регион
+    names = mass_problems[["Номер массовой", "Название", "Регион"]].copy()
+    names["Номер массовой"] = pd.to_numeric(names["Номер массовой"], errors="coerce").astype("Int64")
+    names["Регион"] = names["Регион"].astype("string")
+    svod = svod.join(names.set_index("Номер массовой"), on="Номер массовой")
+
+    # 3. Период инцидента
+    period = pd.DataFrame({
+        "Номер массовой": pd.to_numeric(massive["Номер"], errors="coerce").astype("Int64"),
+        "Старт": extract_start_from_text(massive["Что_происходит"]),
+        "Окончание": parse_datetime_series(massive["Окончание"], "%d.%m.%Y %H:%M"),
+    })
+    svod = svod.join(period.set_index("Номер массовой"), on="Номер массовой")
+
+    # 4. Макрорегион
+    macro_map = macro[["регион", "мр"]].astype("string").rename(columns={"мр": "Макрорегион"})
+    svod = svod.join(macro_map.set_index("регион"), on="Регион")
+
+    # 5. Календарные колонки
+    svod["Месяц"] = svod["ДатаБезВремени"].dt.month.astype("Int64")
+    svod["Неделя (вс)"] = _week_of_year(svod["ДатаБезВремени"], first_weekday=6)
+    svod["Неделя (ISO)"] = _week_of_year(svod["ДатаБезВремени"], first_weekday=0)
+    svod[COMPLAINTS_COLUMN] = pd.NA
+
+    svod = svod.reset_index(drop=True)
+    without_start = int(svod["Старт"].isna().sum())
+    if without_start:
+        logger.warning(f"⚠️ Строк без 'Старт' (нет в MassiveIncidents или не распознан текст): {without_start}")
+    logger.info(f"✅ Свод собран: {len(svod)} строк")
+    return svod
+
+
+def write_svod_sheet(svod: pd.DataFrame, out_path: Path) -> None:
+    """
+    Записывает Свод листом "Отчет" (остальные листы существующей книги сохраняются).
+
+    Args:
+        svod: Строки Свода
+        out_path: Путь к xlsx
+    """
+    out_path = Path(out_path)
+    sheet = svod.copy()
+    # Дата без времени - как в Power Query (type date)
+    sheet["ДатаБезВремени"] = sheet["ДатаБезВремени"].dt.date
+
+    if out_path.exists():
+        with pd.ExcelWriter(out_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+            sheet.to_excel(writer, sheet_name=SVOD_SHEET, index=False)
+    else:
+        with pd.ExcelWriter(out_path, engine="openpyxl", datetime_format="DD.MM.YYYY HH:MM",
+                            date_format="DD.MM.YYYY") as writer:
+            sheet.to_excel(writer, sheet_name=SVOD_SHEET, index=False)
+
+    logger.success(f"💾 Лист '{SVOD_SHEET}' записан: {out_path} ({len(sheet)} строк)")
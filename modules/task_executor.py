@@ -0,0 +1,156 @@
+"""
+Модуль для выполнения списка задач выгрузки в одной сессии браузера.
+
+Одинаковые окна (тот же набор регионов и то же время) выгружаются один раз:
+результат берется из кэша сессии и раздается всем задачам с этим окном.
+Окна, полностью покрытые сохраненной детализацией дня региона (metrics_engine),
+считаются по префиксным суммам без выгрузки. В одной вкладке с parsers > 0 выгрузка,
+разбор и запись идут конвейером (pipeline_executor).
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from tqdm import tqdm
+
+from .browser_session import BrowserRecycleError, run_report_task
+from .metrics_engine import MetricsEngine
+from .pipeline_executor import run_pipeline
+from .task_planner import task_cache_key
+
+
+def run_tasks(
+    session,
+    profile,
+    tasks: List[Dict[str, Any]],
+    on_result: Callable[[Dict[str, Any]], None],
+    tabs: int = 1,
+    cache: Optional[Dict[Tuple, Tuple[int, float]]] = None,
+    store=None,
+    parsers: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Выполняет задачи, не выгружая повторно одинаковые окна.
+
+    Args:
+        session: Запущенная BrowserSession
+        profile: RunProfile
+        tasks: Задачи из task_planner
+        on_result: Функция, вызываемая для каждого результата {"task", "lost", "excess", "error"}
+        tabs: Количество вкладок (1 - последовательно в основной вкладке)
+        cache: Кэш результатов сессии (ключ task_cache_key → (lost, excess))
+        store: ResultsStore для сохранения результатов (необязательно)
+        parsers: Размер пула разбора для конвейера (0 - разбор в потоке браузера)
+
+    Returns:
+        List[Dict[str, Any]]: Результаты всех задач
+    """
+    if cache is None:
+        cache = {}
+
+    # Группируем задачи по окну: выгружается только первая задача группы
+    groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for task in tasks:
+        groups.setdefault(task_cache_key(task), []).append(task)
+
+    cached_before = set(k for k in groups if k in cache)
+    to_download = [group[0] for key, group in groups.items() if key not in cache]
+    logger.info(f"🗂️ Задач: {len(tasks)}, уникальных окон: {len(groups)}, к выгрузке: {len(to_download)}")
+
+    results: List[Dict[str, Any]] = []
+    if profile is not None:
+        profile.add_planned(len(tasks))
+
+    def fan_out(key: Tuple, record: Dict[str, Any], downloaded: bool = True) -> None:
+        group = groups.pop(key, [])
+        for i, task in enumerate(group):
+            task_record = dict(record, task=task)
+            # Выгруженная задача учтена исполнителем, остальные - результаты без выгрузки
+            if profile is not None and (i > 0 or not downloaded):
+                profile.record_task(record["error"] is None, cached=record["error"] is None)
+            # Первая задача группы уже сохранена при выгрузке, остальные - копии результата
+            if store is not None and record["error"] is None and (i > 0 or key in cached_before):
+                store.upsert(task["mass_number"], task["win_start"], task["win_end"], record["lost"],
+                             record["excess"], region=task["region"], run_id=getattr(profile, "run_id", None))
+            results.append(task_record)
+            on_result(task_record)
+
+    # Окна, уже посчитанные в этой сессии
+    for key in list(cached_before):
+        lost, excess = cache[key]
+        fan_out(key, {"lost": lost, "excess": excess, "error": None}, downloaded=False)
+
+    # Окна, покрытые сохраненной детализацией дня региона - один векторный расчет на день
+    if store is not None and to_download:
+        engine = MetricsEngine.from_store(store, sorted({task["win_start"].date() for task in to_download}))
+        remaining = []
+        for task, answer in zip(to_download, engine.evaluate_tasks(to_download)):
+            if answer is None:
+                remaining.append(task)
+                continue
+            key = task_cache_key(task)
+            cache[key] = answer
+            store.upsert(task["mass_number"], task["win_start"], task["win_end"], answer[0], answer[1],
+                         region=task["region"], intervals=engine.interval_rows(task),
+                         run_id=getattr(profile, "run_id", None))
+            fan_out(key, {"lost": answer[0], "excess": answer[1], "error": None}, downloaded=False)
+        if len(remaining) < len(to_download):
+            logger.info(f"🧮 Посчитано по сохраненным интервалам: {len(to_download) - len(remaining)}, "
+                        f"к выгрузке: {len(remaining)}")
+        to_download = remaining
+
+    if tabs > 1 and to_download:
+        # Вкладки работают через CDP (websockets) - модуль нужен только в этом режиме
+        from .multi_tab_executor import run_tasks_in_tabs
+
+        for record in run_tasks_in_tabs(session.driver, to_download, tabs, profile=profile, store=store):
+            key = task_cache_key(record["task"])
+            if record["error"] is None:
+                cache[key] = (record["lost"], record["excess"])
+            fan_out(key, record)
+        return results
+
+    if parsers > 0 and to_download:
+        def write(record: Dict[str, Any]) -> None:
+            task = record["task"]
+            key = task_cache_key(task)
+            intervals = record.pop("intervals")
+            profile.record_task(record["error"] is None)
+            if record["error"] is None:
+                cache[key] = (record["lost"], record["excess"])
+                if store is not None:
+                    store.upsert(task["mass_number"], task["win_start"], task["win_end"], record["lost"],
+                                 record["excess"], region=task["region"], intervals=intervals,
+                                 run_id=getattr(profile, "run_id", None))
+            fan_out(key, record)
+
+        run_pipeline(session, profile, to_download, write, parsers=parsers)
+        return results
+
+    progress_bar = tqdm(
+        to_download,
+        desc="Обработка задач",
+        unit="окно",
+        colour="green",
+        bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]"
+    )
+    for task in progress_bar:
+        progress_bar.set_description(f"Обработка: {task['mass_number']} ({task['win_start'].date()})")
+        key = task_cache_key(task)
+        record = {"lost": None, "excess": None, "error": None}
+        try:
+            logger.info(f"🚀 Запускаем download_report для {task['mass_number']} {task['win_start'].date()}")
+            record["lost"], record["excess"] = run_report_task(
+                session, profile, task["workload_params"], task["win_start"], task["win_end"],
+                store=store, mass_number=task["mass_number"], region=task["region"],
+                intervals=(task["interval_from"], task["interval_to"]) if "interval_from" in task else None
+            )
+            cache[key] = (record["lost"], record["excess"])
+        except BrowserRecycleError:
+            raise
+        except Exception as exc:
+            logger.error(f"❌ ОШИБКА для строки #{task['row_index']} MassID {task['mass_number']} {task['region']}: {exc}")
+            record["error"] = str(exc)
+        fan_out(key, record)
+    progress_bar.close()
+
+    return results
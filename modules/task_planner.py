@@ -0,0 +1,180 @@
+"""
+Модуль для планирования задач выгрузки.
+
+Задача - это одно окно (строка Свода × день) с параметрами рабочей нагрузки:
+{"row_index", "mass_number", "region", "workload_params", "win_start", "win_end",
+"interval_from", "interval_to"}. Интервалы ("Интервал от"/"Интервал до", округление до
+15 минут) считаются при планировании, форма отчета получает их готовыми.
+
+Для стандартного режима окна строятся таблицей задач (build_task_table) - один
+векторный проход по всем строкам Свода вместо windows_for_row в цикле.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Tuple
+import pandas as pd
+from loguru import logger
+
+from .data_processing import validate_region_in_config
+from .date_time_utils import (
+    expand_daily_windows,
+    interval_columns,
+    format_time_intervals,
+    prepare_datetime_for_report
+)
+from .excel_manager import calculate_time_window_for_date, normalize_date_column
+
+
+def _make_task(idx, row: pd.Series, cfg: Dict[str, Any], win_start, win_end) -> Dict[str, Any]:
+    """Создает словарь задачи для одного временного окна."""
+    region = row["Регион"]
+    win_start = prepare_datetime_for_report(win_start)
+    win_end = prepare_datetime_for_report(win_end)
+    interval_from, interval_to = format_time_intervals(win_start, win_end)
+    return {
+        "row_index": idx,
+        "mass_number": row["Номер массовой"],
+        "region": region,
+        "workload_params": cfg["regions"][region],
+        "win_start": win_start,
+        "win_end": win_end,
+        "interval_from": interval_from,
+        "interval_to": interval_to,
+    }
+
+
+def build_task_table(df: pd.DataFrame, cfg: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Строит таблицу задач по всем дневным окнам всех строк Свода.
+
+    Args:
+        df: Строки Свода (после parse_datetime_columns)
+        cfg: Конфигурация из YAML
+
+    Returns:
+        pd.DataFrame: Колонки row_index, mass_number, region, win_start, win_end,
+            interval_from, interval_to; отсортирована по окну и строке
+    """
+    # Строки с регионом не из конфигурации пропускаем
+    known_regions = [region for region, params in cfg["regions"].items() if params]
+    known = df["Регион"].isin(known_regions)
+    unknown = sorted(set(df.loc[~known, "Регион"].dropna().astype(str)))
+    if unknown:
+        logger.warning(f"❌ Regions not found in YAML config → skip: {unknown}")
+        logger.info(f"Available regions in config: {list(cfg['regions'].keys())}")
+    rows = df[known]
+
+    table = expand_daily_windows(rows)
+    table["mass_number"] = rows["Номер массовой"].reindex(table["row_index"]).to_numpy()
+    table["region"] = rows["Регион"].reindex(table["row_index"]).to_numpy()
+    table["interval_from"], table["interval_to"] = interval_columns(table["win_start"], table["win_end"])
+
+    table = table.sort_values(["win_start", "win_end", "row_index"], kind="stable").reset_index(drop=True)
+    return table[["row_index", "mass_number", "region", "win_start", "win_end", "interval_from", "interval_to"]]
+
+
+def tasks_from_table(table: pd.DataFrame, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Преобразует таблицу задач в список словарей для исполнителей.
+
+    Args:
+        table: Таблица из build_task_table
+        cfg: Конфигурация из YAML
+
+    Returns:
+        List[Dict[str, Any]]: Список задач
+    """
+    tasks = []
+    for row in table.itertuples(index=False):
+        tasks.append({
+            "row_index": row.row_index,
+            "mass_number": row.mass_number,
+            "region": row.region,
+            "workload_params": cfg["regions"][row.region],
+            "win_start": row.win_start.to_pydatetime(),
+            "win_end": row.win_end.to_pydatetime(),
+            "interval_from": row.interval_from,
+            "interval_to": row.interval_to,
+        })
+    return tasks
+
+
+def task_cache_key(task: Dict[str, Any]) -> Tuple:
+    """
+    Возвращает ключ кэша задачи: регионы рабочей нагрузки и границы окна.
+
+    Args:
+        task: Задача
+
+    Returns:
+        Tuple: Ключ кэша
+    """
+    return (
+        tuple(str(i) for i in task["workload_params"]),
+        task["win_start"],
+        task["win_end"],
+    )
+
+
+def build_tasks_for_date(df: pd.DataFrame, target_date: date, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Строит задачи для строк Свода на указанную дату (режим --auto-date-processing).
+
+    Args:
+        df: Строки Свода, отфильтрованные по дате
+        target_date: Дата обработки
+        cfg: Конфигурация из YAML
+
+    Returns:
+        List[Dict[str, Any]]: Список задач
+    """
+    tasks = []
+    for idx, row in df.iterrows():
+        if not validate_region_in_config(row["Регион"], cfg):
+            continue
+        win_start, win_end = calculate_time_window_for_date(row, target_date)
+        tasks.append(_make_task(idx, row, cfg, win_start, win_end))
+
+    logger.info(f"🗂️ Запланировано задач: {len(tasks)} (дата {target_date.strftime('%d.%m.%Y')})")
+    return tasks
+
+
+def build_tasks_for_all_windows(df: pd.DataFrame, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Строит задачи по всем дневным окнам всех строк Свода (стандартный режим).
+
+    Args:
+        df: Строки Свода
+        cfg: Конфигурация из YAML
+
+    Returns:
+        List[Dict[str, Any]]: Список задач
+    """
+    tasks = tasks_from_table(build_task_table(df, cfg), cfg)
+    logger.info(f"🗂️ Запланировано задач: {len(tasks)} (все дневные окна)")
+    return tasks
+
+
+def build_tasks_for_dates(df: pd.DataFrame, dates: List[date], cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Строит задачи сразу для нескольких дат (каждая строка считается за свою "ДатаБезВремени").
+
+    Args:
+        df: Строки Свода
+        dates: Даты обработки
+        cfg: Конфигурация из YAML
+
+    Returns:
+        List[Dict[str, Any]]: Список задач по всем датам
+    """
+    row_dates = normalize_date_column(df["ДатаБезВремени"])
+    tasks = []
+    for target_date in dates:
+        df_for_date = df[row_dates == target_date]
+        if df_for_date.empty:
+            logger.warning(f"⚠️ Не найдено проблем для даты {target_date.strftime('%d.%m.%Y')}")
+            continue
+        tasks.extend(build_tasks_for_date(df_for_date, target_date, cfg))
+
+    logger.info(f"🗂️ Всего запланировано задач: {len(tasks)} (дат: {len(dates)})")
+    return tasks
@@ -0,0 +1,312 @@
+"""
+Модуль для режима службы: слежение за папкой или файлом Свода.
+
+Браузер (WebDriver, CDP настройки и навыки) запускается один раз и остается
+готовым к работе. Служба опрашивает mtime файлов и при появлении нового или
+изменении существующего Свода обрабатывает только новые и измененные строки.
+Отпечатки обработанных строк и их результаты хранятся в файле состояния, поэтому
+после обновления Power Query уже посчитанные значения дописываются без браузера.
+
+Строки выполняются тем же исполнителем, что и в main.py (task_executor.run_tasks):
+кэш окон живет всю сессию службы, результаты сохраняются в хранилище результатов,
+а в книгу пишутся одной пачкой после обработки Свода.
+"""
+
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from loguru import logger
+
+from .browser_session import BrowserRecycleError
+from .cleanup_manager import cleanup_downloaded_files
+from .data_processing import process_excel_data, validate_region_in_config
+from .excel_manager import save_results_batch_to_original_file
+from .post_processor import post_process_excel_file
+from .run_profile import RUNS_DIR
+from .task_executor import run_tasks
+from .task_planner import build_tasks_for_date
+
+
+# === Константы ===
+DEFAULT_WATCH_INTERVAL = 5.0
+DEFAULT_STATE_PATH = RUNS_DIR / "watch_state.json"
+RESULT_COLUMNS = ("Потерянные", "Превышение")
+
+
+def row_fingerprint(row: pd.Series) -> str:
+    """
+    Возвращает отпечаток строки Свода по полям, влияющим на результат.
+
+    Args:
+        row: Строка Свода
+
+    Returns:
+        str: sha1 от номера массовой, региона, даты и окна проблемы
+    """
+    parts = [
+        row.get("Номер массовой"),
+        row.get("Регион"),
+        row.get("ДатаБезВремени"),
+        row.get("Старт"),
+        row.get("Окончание"),
+    ]
+    raw = "|".join("" if pd.isna(p) else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def row_target_date(row: pd.Series) -> date:
+    """
+    Возвращает дату, за которую считается строка: "ДатаБезВремени", иначе дата "Старт".
+
+    Args:
+        row: Строка Свода
+
+    Returns:
+        date: Дата обработки строки
+    """
+    value = row.get("ДатаБезВремени")
+    if value is not None and pd.notna(value) and str(value).strip() != "":
+        if isinstance(value, str):
+            return datetime.strptime(value.strip(), "%d.%m.%Y").date()
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return pd.to_datetime(value).date()
+    return row["Старт"].date()
+
+
+def _has_result(row: pd.Series) -> bool:
+    """Проверяет, заполнены ли в строке колонки результатов."""
+    for column in RESULT_COLUMNS:
+        if column not in row.index or pd.isna(row[column]) or str(row[column]).strip() == "":
+            return False
+    return True
+
+
+class WatchService:
+    """Класс службы, обрабатывающей Свод при его появлении или изменении"""
+
+    def __init__(
+        self,
+        session,
+        profile,
+        cfg: Dict[str, Any],
+        watch_path: Path,
+        interval: float = DEFAULT_WATCH_INTERVAL,
+        state_path: Path = DEFAULT_STATE_PATH,
+        store=None,
+        parsers: int = 0,
+    ):
+        """
+        Инициализация службы.
+
+        Args:
+            session: Запущенная BrowserSession
+            profile: RunProfile
+            cfg: Конфигурация из YAML
+            watch_path: Папка-инбокс (*.xlsx) или конкретный файл Свода
+            interval: Период опроса в секундах
+            state_path: Файл состояния (отпечатки строк и результаты)
+            store: ResultsStore для результатов и детализации (необязательно)
+            parsers: Размер пула разбора для конвейера (0 - разбор в потоке браузера)
+        """
+        self.session = session
+        self.profile = profile
+        self.cfg = cfg
+        self.watch_path = Path(watch_path)
+        self.interval = interval
+        self.state_path = Path(state_path)
+        self.store = store
+        self.parsers = parsers
+        # Кэш окон run_tasks на всю сессию службы: одинаковые окна разных Сводов выгружаются один раз
+        self.cache: Dict[Tuple, Tuple[int, float]] = {}
+
+        self.state = self._load_state()
+        # Файлы, изменение которых замечено, но еще не "устоялось": path -> (mtime, size)
+        self._pending: Dict[str, Tuple[float, int]] = {}
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Загружает состояние службы из файла."""
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось прочитать состояние {self.state_path}: {e}")
+        return {"files": {}}
+
+    def _save_state(self) -> None:
+        """Сохраняет состояние службы в файл."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _candidates(self) -> List[Path]:
+        """Возвращает файлы, за которыми следит служба."""
+        if self.watch_path.is_dir():
+            # ~$*.xlsx - файлы блокировки открытой в Excel книги
+            return sorted(p for p in self.watch_path.glob("*.xlsx") if not p.name.startswith("~$"))
+        if self.watch_path.exists():
+            return [self.watch_path]
+        return []
+
+    def _changed_files(self) -> List[Path]:
+        """
+        Возвращает файлы, которые изменились и не менялись в течение одного интервала опроса.
+
+        Returns:
+            List[Path]: Файлы, готовые к обработке
+        """
+        ready = []
+        for path in self._candidates():
+            key = str(path.resolve())
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signature = (stat.st_mtime, stat.st_size)
+
+            known = self.state["files"].get(key, {})
+            if known.get("mtime") == stat.st_mtime and known.get("size") == stat.st_size:
+                self._pending.pop(key, None)
+                continue
+
+            # Ждем, пока файл перестанет меняться (Excel/Power Query еще может писать)
+            if self._pending.get(key) == signature:
+                self._pending.pop(key)
+                ready.append(path)
+            else:
+                self._pending[key] = signature
+        return ready
+
+    def _mark_seen(self, path: Path) -> None:
+        """Запоминает текущие mtime/size файла, чтобы собственная запись не считалась изменением."""
+        stat = path.stat()
+        entry = self.state["files"].setdefault(str(path.resolve()), {"rows": {}})
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+
+    def process_workbook(self, path: Path) -> int:
+        """
+        Обрабатывает новые и измененные строки одного Свода.
+
+        Args:
+            path: Путь к файлу Свода
+
+        Returns:
+            int: Количество записанных результатов
+        """
+        logger.info(f"📥 Обнаружен новый/измененный Свод: {path}")
+        entry = self.state["files"].setdefault(str(path.resolve()), {"rows": {}})
+        known_rows: Dict[str, Dict[str, Any]] = entry["rows"]
+
+        with self.profile.phase("process_excel_data"):
+            df = process_excel_data(path)
+
+        saves: List[Dict[str, Any]] = []
+        fingerprints: Dict[Any, str] = {}
+        rows_by_date: Dict[date, List[Any]] = {}
+        for idx, row in df.iterrows():
+            fingerprint = row_fingerprint(row)
+            cached = known_rows.get(fingerprint)
+            target_date = row_target_date(row)
+
+            if cached is not None:
+                if _has_result(row):
+                    continue
+                # Строка уже считалась, но результат пропал после обновления Свода
+                saves.append({"row_index": idx, "mass_number": row["Номер массовой"], "date": target_date,
+                              "lost": cached["lost"], "excess": cached["excess"]})
+                continue
+
+            if not validate_region_in_config(row["Регион"], self.cfg):
+                continue
+            fingerprints[idx] = fingerprint
+            rows_by_date.setdefault(target_date, []).append(idx)
+
+        with self.profile.phase("task_planner"):
+            tasks = []
+            for target_date, indexes in rows_by_date.items():
+                tasks.extend(build_tasks_for_date(df.loc[indexes], target_date, self.cfg))
+
+        def on_result(record):
+            if record["error"] is not None:
+                return
+            task = record["task"]
+            known_rows[fingerprints[task["row_index"]]] = {
+                "mass_number": str(task["mass_number"]), "lost": record["lost"], "excess": record["excess"]
+            }
+            saves.append({"row_index": task["row_index"], "mass_number": task["mass_number"],
+                          "date": task["win_start"].date(), "lost": record["lost"], "excess": record["excess"]})
+
+        try:
+            if tasks:
+                run_tasks(self.session, self.profile, tasks, on_result, cache=self.cache,
+                          store=self.store, parsers=self.parsers)
+        finally:
+            # Посчитанное сохраняется одной пачкой, даже если браузер упал посреди Свода
+            self._save_state()
+            written = 0
+            if saves:
+                with self.profile.phase("save_results"):
+                    written = save_results_batch_to_original_file(saves, path)
+
+        if written:
+            try:
+                with self.profile.phase("post_process_excel_file"):
+                    post_process_excel_file(path)
+            except Exception as e:
+                logger.error(f"❌ Ошибка при постобработке данных: {e}")
+
+        self._mark_seen(path)
+        self._save_state()
+        logger.info(f"✅ Свод обработан: новых/измененных строк {len(tasks)}, записано результатов {written}")
+        return written
+
+    def poll_once(self) -> int:
+        """
+        Один цикл опроса: обрабатывает все изменившиеся файлы.
+
+        Returns:
+            int: Количество обработанных файлов
+        """
+        processed = 0
+        for path in self._changed_files():
+            try:
+                self.process_workbook(path)
+                processed += 1
+            except PermissionError as pe:
+                # Файл открыт в Excel - попробуем на следующем цикле
+                logger.warning(f"⚠️ Файл {path} заблокирован, повторим позже: {pe}")
+            except BrowserRecycleError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработки {path}: {e}")
+                logger.exception("Полный traceback:")
+                # Не повторяем обработку до следующего изменения файла
+                self._mark_seen(path)
+                self._save_state()
+            finally:
+                cleanup_downloaded_files()
+        return processed
+
+    def run_forever(self, max_cycles: Optional[int] = None) -> None:
+        """
+        Запускает цикл опроса до Ctrl+C.
+
+        Args:
+            max_cycles: Ограничение числа циклов (None - без ограничения)
+        """
+        logger.info(f"👀 Служба запущена: следим за {self.watch_path} (опрос каждые {self.interval}с)")
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                if self.poll_once():
+                    self.profile.save()
+                cycles += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            logger.info("🛑 Служба остановлена пользователем")
@@ -0,0 +1,561 @@
+"""
+Модуль для общей очереди задач: несколько машин делят один запуск.
+
+Координатор раскладывает строки Свода в задачи и кладет их в очередь, воркеры
+(main.py --worker на любых машинах) берут задачи в аренду (lease), выполняют
+download_report + calc_metrics и возвращают результат. Если воркер умер,
+аренда истекает и задача снова становится доступной. Книгу пишет только
+координатор.
+
+Очередь обслуживает один запуск за раз: новый координатор отменяет незакрытые
+запуски (их результаты уже некому забрать), при выходе координатор закрывает свой
+запуск, а воркеры берут задачи только последнего открытого запуска.
+
+Реализации:
+- SqliteWorkQueue - файл SQLite (например, на общей сетевой папке)
+- InMemoryWorkQueue - очередь в памяти процесса (для проверок без сети)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+from .browser_session import BrowserRecycleError, run_report_task
+
+
+# === Константы ===
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_INTERVAL = 5.0
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+RUN_OPEN = "open"
+RUN_DONE = "done"
+RUN_CANCELLED = "cancelled"
+CANCELLED_ERROR = "Запуск координатора отменен"
+
+
+def default_worker_id() -> str:
+    """Возвращает идентификатор воркера: имя машины и PID."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def encode_task(task: Dict[str, Any]) -> str:
+    """
+    Сериализует задачу task_planner в JSON.
+
+    Args:
+        task: Задача (datetime окна, numpy-типы индекса)
+
+    Returns:
+        str: JSON строка
+    """
+    payload = {
+        "row_index": int(task["row_index"]),
+        "mass_number": str(task["mass_number"]),
+        "region": str(task["region"]),
+        "workload_params": [str(i) for i in task["workload_params"]],
+        "win_start": task["win_start"].isoformat(),
+        "win_end": task["win_end"].isoformat(),
+    }
+    if "interval_from" in task:
+        payload["interval_from"] = task["interval_from"]
+        payload["interval_to"] = task["interval_to"]
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def decode_task(payload: str) -> Dict[str, Any]:
+    """
+    Восстанавливает задачу из JSON.
+
+    Args:
+        payload: JSON строка из encode_task
+
+    Returns:
+        Dict[str, Any]: Задача
+    """
+    task = json.loads(payload)
+    task["win_start"] = datetime.fromisoformat(task["win_start"])
+    task["win_end"] = datetime.fromisoformat(task["win_end"])
+    return task
+
+
+class SqliteWorkQueue:
+    """Класс очереди задач в файле SQLite"""
+
+    def __init__(self, db_path: Path, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Инициализация очереди (таблица создается при необходимости).
+
+        Args:
+            db_path: Путь к файлу очереди
+            lease_seconds: Длительность аренды задачи
+            max_attempts: Сколько раз задачу можно выдать, прежде чем она станет failed
+        """
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lost INTEGER,
+                    excess REAL,
+                    error TEXT,
+                    collected INTEGER NOT NULL DEFAULT 0,
+                    updated REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, lease_until)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    started REAL NOT NULL,
+                    finished REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Открывает соединение (отдельное на каждую операцию - безопасно для разных машин)."""
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def put_tasks(self, run_id: str, tasks: List[Dict[str, Any]]) -> int:
+        """
+        Открывает запуск и добавляет его задачи в очередь; незакрытые прошлые запуски отменяются.
+
+        Args:
+            run_id: Идентификатор запуска координатора
+            tasks: Задачи task_planner
+
+        Returns:
+            int: Количество добавленных задач
+        """
+        now = time.time()
+        rows = [(run_id, encode_task(task), STATUS_PENDING, now) for task in tasks]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for row in conn.execute("SELECT run_id FROM runs WHERE status = ? AND run_id != ?",
+                                    (RUN_OPEN, run_id)).fetchall():
+                logger.warning(f"⚠️ Незакрытый запуск {row['run_id']} отменен")
+                self._close_run(conn, row["run_id"], RUN_CANCELLED, now)
+            conn.execute(
+                "INSERT INTO runs (run_id, status, started) VALUES (?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET status = excluded.status, finished = NULL",
+                (run_id, RUN_OPEN, now)
+            )
+            conn.executemany(
+                "INSERT INTO tasks (run_id, payload, status, updated) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.execute("COMMIT")
+        return len(rows)
+
+    @staticmethod
+    def _close_run(conn, run_id: str, status: str, now: float) -> None:
+        """Закрывает запуск; у отмененного запуска незавершенные задачи снимаются с очереди."""
+        conn.execute("UPDATE runs SET status = ?, finished = ? WHERE run_id = ?", (status, now, run_id))
+        if status == RUN_CANCELLED:
+            conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_until = NULL, collected = 1, updated = ? "
+                "WHERE run_id = ? AND status IN (?, ?)",
+                (STATUS_FAILED, CANCELLED_ERROR, now, run_id, STATUS_PENDING, STATUS_LEASED)
+            )
+
+    def close_run(self, run_id: str, status: str = RUN_DONE) -> None:
+        """
+        Закрывает запуск координатора.
+
+        Args:
+            run_id: Идентификатор запуска
+            status: RUN_DONE или RUN_CANCELLED (незавершенные задачи больше не выдаются)
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._close_run(conn, run_id, status, time.time())
+            conn.execute("COMMIT")
+
+    def current_run(self) -> Optional[str]:
+        """
+        Возвращает последний запуск, если он открыт.
+
+        Returns:
+            Optional[str]: run_id или None (запусков нет или последний закрыт)
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT run_id, status FROM runs ORDER BY started DESC LIMIT 1").fetchone()
+        return row["run_id"] if row is not None and row["status"] == RUN_OPEN else None
+
+    def lease(self, worker_id: str, run_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Берет в аренду следующую доступную задачу (новую или с истекшей арендой).
+
+        Args:
+            worker_id: Идентификатор воркера
+            run_id: Брать задачи только этого запуска (None - любого)
+
+        Returns:
+            Dict | None: {"id", "run_id", "task"} или None, если задач нет
+        """
+        now = time.time()
+        query = (
+            "SELECT id, run_id, payload, attempts FROM tasks "
+            "WHERE (status = ? OR (status = ? AND lease_until < ?))"
+        )
+        params: List[Any] = [STATUS_PENDING, STATUS_LEASED, now]
+        if run_id:
+            query += " AND run_id = ?"
+            params.append(run_id)
+        query += " ORDER BY id LIMIT 1"
+
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE - запись блокируется сразу, две машины не возьмут одну задачу
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, error = ?, updated = ? WHERE id = ?",
+                    (STATUS_FAILED, "Аренда истекла слишком много раз", now, row["id"])
+                )
+                conn.execute("COMMIT")
+                return self.lease(worker_id, run_id)
+
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = ?",
+                (STATUS_LEASED, worker_id, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+
+        return {"id": row["id"], "run_id": row["run_id"], "task": decode_task(row["payload"])}
+
+    def complete(self, task_id: int, worker_id: str, lost: int, excess: float) -> bool:
+        """
+        Сохраняет результат задачи.
+
+        Returns:
+            bool: False, если аренда уже передана другому воркеру
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, lost = ?, excess = ?, error = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (STATUS_DONE, lost, excess, time.time(), task_id, worker_id, STATUS_LEASED)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> None:
+        """Возвращает задачу в очередь или помечает failed после max_attempts попыток."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_until = NULL, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (self.max_attempts, STATUS_FAILED, STATUS_PENDING, error, time.time(),
+                 task_id, worker_id, STATUS_LEASED)
+            )
+
+    def collect(self, run_id: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает еще не забранные завершенные задачи запуска и помечает их забранными.
+
+        Args:
+            run_id: Идентификатор запуска
+
+        Returns:
+            List[Dict[str, Any]]: Записи {"task", "lost", "excess", "error"}
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, payload, status, lost, excess, error FROM tasks "
+                "WHERE run_id = ? AND status IN (?, ?) AND collected = 0 ORDER BY id",
+                (run_id, STATUS_DONE, STATUS_FAILED)
+            ).fetchall()
+            conn.executemany("UPDATE tasks SET collected = 1 WHERE id = ?", [(r["id"],) for r in rows])
+            conn.execute("COMMIT")
+
+        return [{
+            "task": decode_task(r["payload"]),
+            "lost": r["lost"],
+            "excess": r["excess"],
+            "error": r["error"] if r["status"] == STATUS_FAILED else None,
+        } for r in rows]
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """Возвращает число задач запуска по статусам."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM tasks WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+    def has_open_tasks(self, run_id: str = None) -> bool:
+        """Есть ли задачи в статусах pending/leased."""
+        query = "SELECT 1 FROM tasks WHERE status IN (?, ?)"
+        params: List[Any] = [STATUS_PENDING, STATUS_LEASED]
+        if run_id:
+            query += " AND run_id = ?"
+            params.append(run_id)
+        with self._connect() as conn:
+            return conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+
+class InMemoryWorkQueue:
+    """Класс очереди задач в памяти процесса (та же семантика, что у SqliteWorkQueue)"""
+
+    def __init__(self, lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """Инициализация очереди (параметры как у SqliteWorkQueue)."""
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._runs: Dict[str, str] = {}
+
+    def put_tasks(self, run_id: str, tasks: List[Dict[str, Any]]) -> int:
+        """Открывает запуск и добавляет его задачи; незакрытые прошлые запуски отменяются."""
+        with self._lock:
+            for other, status in list(self._runs.items()):
+                if status == RUN_OPEN and other != run_id:
+                    logger.warning(f"⚠️ Незакрытый запуск {other} отменен")
+                    self._close_run(other, RUN_CANCELLED)
+            # Порядок словаря - порядок открытия: последний ключ - последний запуск
+            self._runs.pop(run_id, None)
+            self._runs[run_id] = RUN_OPEN
+            for task in tasks:
+                self._rows.append({
+                    "id": len(self._rows) + 1, "run_id": run_id, "payload": encode_task(task),
+                    "status": STATUS_PENDING, "worker": None, "lease_until": None, "attempts": 0,
+                    "lost": None, "excess": None, "error": None, "collected": False,
+                })
+        return len(tasks)
+
+    def _close_run(self, run_id: str, status: str) -> None:
+        """Закрывает запуск (вызывается под блокировкой)."""
+        self._runs[run_id] = status
+        if status == RUN_CANCELLED:
+            for row in self._rows:
+                if row["run_id"] == run_id and row["status"] in (STATUS_PENDING, STATUS_LEASED):
+                    row.update(status=STATUS_FAILED, error=CANCELLED_ERROR, lease_until=None, collected=True)
+
+    def close_run(self, run_id: str, status: str = RUN_DONE) -> None:
+        """Закрывает запуск координатора."""
+        with self._lock:
+            self._close_run(run_id, status)
+
+    def current_run(self) -> Optional[str]:
+        """Возвращает последний запуск, если он открыт."""
+        with self._lock:
+            if not self._runs:
+                return None
+            run_id = next(reversed(self._runs))
+            return run_id if self._runs[run_id] == RUN_OPEN else None
+
+    def lease(self, worker_id: str, run_id: str = None) -> Optional[Dict[str, Any]]:
+        """Берет в аренду следующую доступную задачу."""
+        now = time.time()
+        with self._lock:
+            for row in self._rows:
+                if run_id and row["run_id"] != run_id:
+                    continue
+                available = row["status"] == STATUS_PENDING or (
+                    row["status"] == STATUS_LEASED and row["lease_until"] < now
+                )
+                if not available:
+                    continue
+                if row["attempts"] >= self.max_attempts:
+                    row.update(status=STATUS_FAILED, error="Аренда истекла слишком много раз")
+                    continue
+                row.update(status=STATUS_LEASED, worker=worker_id, lease_until=now + self.lease_seconds,
+                           attempts=row["attempts"] + 1)
+                return {"id": row["id"], "run_id": row["run_id"], "task": decode_task(row["payload"])}
+        return None
+
+    def complete(self, task_id: int, worker_id: str, lost: int, excess: float) -> bool:
+        """Сохраняет результат задачи."""
+        with self._lock:
+            row = self._rows[task_id - 1]
+            if row["worker"] != worker_id or row["status"] != STATUS_LEASED:
+                return False
+            row.update(status=STATUS_DONE, lost=lost, excess=excess, error=None)
+            return True
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> None:
+        """Возвращает задачу в очередь или помечает failed."""
+        with self._lock:
+            row = self._rows[task_id - 1]
+            if row["worker"] != worker_id or row["status"] != STATUS_LEASED:
+                return
+            status = STATUS_FAILED if row["attempts"] >= self.max_attempts else STATUS_PENDING
+            row.update(status=status, error=error, lease_until=None)
+
+    def collect(self, run_id: str) -> List[Dict[str, Any]]:
+        """Возвращает еще не забранные завершенные задачи запуска."""
+        with self._lock:
+            collected = []
+            for row in self._rows:
+                if row["run_id"] != run_id or row["collected"] or row["status"] not in (STATUS_DONE, STATUS_FAILED):
+                    continue
+                row["collected"] = True
+                collected.append({
+                    "task": decode_task(row["payload"]),
+                    "lost": row["lost"],
+                    "excess": row["excess"],
+                    "error": row["error"] if row["status"] == STATUS_FAILED else None,
+                })
+            return collected
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """Возвращает число задач запуска по статусам."""
+        with self._lock:
+            counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+            for row in self._rows:
+                if row["run_id"] == run_id:
+                    counts[row["status"]] += 1
+            return counts
+
+    def has_open_tasks(self, run_id: str = None) -> bool:
+        """Есть ли задачи в статусах pending/leased."""
+        with self._lock:
+            return any(
+                row["status"] in (STATUS_PENDING, STATUS_LEASED) and (not run_id or row["run_id"] == run_id)
+                for row in self._rows
+            )
+
+
+def run_coordinator(queue, run_id: str, tasks: List[Dict[str, Any]],
+                    on_results: Callable[[List[Dict[str, Any]]], None],
+                    poll_interval: float = DEFAULT_POLL_INTERVAL) -> Dict[str, int]:
+    """
+    Кладет задачи в очередь и собирает результаты, пока все задачи не завершатся.
+
+    Запуск закрывается при выходе; если координатор прерван (Ctrl+C, ошибка записи),
+    запуск отменяется и воркеры не тратят время на задачи, результаты которых некому забрать.
+
+    Args:
+        queue: SqliteWorkQueue или InMemoryWorkQueue
+        run_id: Идентификатор запуска
+        tasks: Задачи task_planner
+        on_results: Функция, получающая пачку новых результатов (пишет книгу/CSV)
+        poll_interval: Период опроса очереди в секундах
+
+    Returns:
+        Dict[str, int]: Итоговое число задач по статусам
+    """
+    queue.put_tasks(run_id, tasks)
+    logger.info(f"📤 В очередь добавлено {len(tasks)} задач (run_id={run_id})")
+
+    last_counts = None
+    try:
+        while True:
+            batch = queue.collect(run_id)
+            if batch:
+                on_results(batch)
+
+            counts = queue.counts(run_id)
+            if counts != last_counts:
+                logger.info(f"📊 Очередь: ожидают {counts[STATUS_PENDING]}, в работе {counts[STATUS_LEASED]}, "
+                            f"готово {counts[STATUS_DONE]}, ошибок {counts[STATUS_FAILED]}")
+                last_counts = counts
+
+            if counts[STATUS_PENDING] == 0 and counts[STATUS_LEASED] == 0:
+                # Забираем результаты, завершившиеся между collect и counts
+                batch = queue.collect(run_id)
+                if batch:
+                    on_results(batch)
+                queue.close_run(run_id, RUN_DONE)
+                return counts
+
+            time.sleep(poll_interval)
+    except BaseException:
+        logger.warning(f"⚠️ Координатор прерван - запуск {run_id} отменен")
+        queue.close_run(run_id, RUN_CANCELLED)
+        raise
+
+
+def run_worker(queue, session, profile, worker_id: str = None, run_id: str = None,
+               idle_exit_seconds: float = 60, poll_interval: float = DEFAULT_POLL_INTERVAL) -> int:
+    """
+    Берет задачи из очереди и выполняет их, пока очередь не опустеет.
+
+    Args:
+        queue: SqliteWorkQueue или InMemoryWorkQueue
+        session: Запущенная BrowserSession
+        profile: RunProfile
+        worker_id: Идентификатор воркера (по умолчанию - машина и PID)
+        run_id: Брать задачи только этого запуска (None - последнего открытого)
+        idle_exit_seconds: Завершиться, если задач нет столько секунд
+        poll_interval: Пауза между попытками взять задачу
+
+    Returns:
+        int: Количество выполненных задач
+    """
+    worker_id = worker_id or default_worker_id()
+    logger.info(f"👷 Воркер {worker_id} запущен")
+
+    done = 0
+    idle_since = time.monotonic()
+    while True:
+        # Задачи брошенных запусков никто не заберет - работаем только на текущий запуск
+        current = run_id or queue.current_run()
+        leased = queue.lease(worker_id, current) if current else None
+        if leased is None:
+            if (time.monotonic() - idle_since >= idle_exit_seconds
+                    and (current is None or not queue.has_open_tasks(current))):
+                logger.info(f"✅ Очередь пуста, воркер завершает работу (выполнено задач: {done})")
+                return done
+            time.sleep(poll_interval)
+            continue
+
+        task = leased["task"]
+        logger.info(f"🚀 [{worker_id}] {task['mass_number']} {task['win_start'].date()} (задача #{leased['id']})")
+        try:
+            lost, excess = run_report_task(
+                session, profile, task["workload_params"], task["win_start"], task["win_end"],
+                intervals=(task["interval_from"], task["interval_to"]) if "interval_from" in task else None
+            )
+        except BrowserRecycleError:
+            queue.fail(leased["id"], worker_id, "Браузер воркера не удалось пересоздать")
+            raise
+        except Exception as exc:
+            logger.error(f"❌ ОШИБКА для MassID {task['mass_number']} {task['region']}: {exc}")
+            queue.fail(leased["id"], worker_id, str(exc))
+        else:
+            if not queue.complete(leased["id"], worker_id, lost, excess):
+                logger.warning(f"⚠️ Аренда задачи #{leased['id']} истекла - результат отброшен")
+            done += 1
+        idle_since = time.monotonic()
@@ -2,18 +2,32 @@
 """
 python new_site_report.py — Основной скрипт для выгрузки отчета по причинам обращений с нового сайта.
 Использует модульную архитектуру для лучшей организации кода.
+
+ПАКЕТНЫЙ РЕЖИМ:
+Несколько выгрузок (период + причины) в одной сессии браузера без перезагрузки страницы,
+каждая в свой файл (downloads/reports/<имя задания>.xlsx):
+    python new_site_report.py --start-date 01.08.2025 --end-date 31.08.2025 --daily --headless
+    python new_site_report.py --jobs jobs.json
+jobs.json - список {"start_date": "01.08.2025", "end_date": "02.08.2025", "reasons": [...], "name": "..."}.
+
+Большой период лучше выгружать шардами (день/неделя) в нескольких сессиях браузера:
+упавший шард повторяется отдельно, шарды сливаются в базу без дублей на границах.
+    python new_site_report.py --start-date 01.08.2025 --end-date 31.08.2025 --shard week --workers 3 --headless
 """
 
 import sys
+import json
 import argparse
 from loguru import logger
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
 # Импортируем наши модули
 from modules.selenium_helpers import get_driver, apply_cdp_download_settings, setup_proxy
 from modules.new_site_handler import NewSiteHandler
+from modules.reasons_parser import parse_reasons_report, DEFAULT_REASONS_DB
+from modules.report_shards import shard_jobs, run_sharded_jobs, SHARD_DAYS, DEFAULT_RETRIES
 
 
 # Константы
@@ -69,9 +83,131 @@ def parse_arguments():
         help='Время ожидания загрузки отчета в секундах (по умолчанию: 60)'
     )
 
+    parser.add_argument(
+        '--start-date',
+        help='Пакетный режим: дата начала периода (ДД.ММ.ГГГГ)'
+    )
+
+    parser.add_argument(
+        '--end-date',
+        help='Пакетный режим: дата окончания периода (ДД.ММ.ГГГГ, по умолчанию = дата начала)'
+    )
+
+    parser.add_argument(
+        '--daily',
+        action='store_true',
+        help='Пакетный режим: отдельная выгрузка за каждый день периода (= --shard day)'
+    )
+
+    parser.add_argument(
+        '--shard',
+        choices=list(SHARD_DAYS),
+        default=None,
+        help='Пакетный режим: разбить период на шарды по дню или неделе'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Пакетный режим: число параллельных сессий браузера (по умолчанию: 1)'
+    )
+
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f'Пакетный режим: повторы упавшего задания (по умолчанию: {DEFAULT_RETRIES})'
+    )
+
+    parser.add_argument(
+        '--reason-label',
+        action='append',
+        dest='reason_labels',
+        help='Текст причины в списке (можно указать несколько раз)'
+    )
+
+    parser.add_argument(
+        '--jobs',
+        help='Пакетный режим: JSON файл со списком заданий'
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='Папка для файлов заданий (по умолчанию: downloads/reports)'
+    )
+
+    parser.add_argument(
+        '--reasons-db',
+        default=str(DEFAULT_REASONS_DB),
+        help=f'База SQLite для разобранного отчета (по умолчанию: {DEFAULT_REASONS_DB})'
+    )
+
     return parser.parse_args()
 
 
+def build_jobs(args):
+    """
+    Строит список заданий пакетного режима из аргументов.
+
+    Args:
+        args: Аргументы командной строки
+
+    Returns:
+        list: Задания {"start_date", "end_date", "reasons", "name"} (пустой - пакетный режим не задан)
+    """
+    if args.jobs:
+        with open(args.jobs, encoding='utf-8') as f:
+            jobs = json.load(f)
+        for job in jobs:
+            job.setdefault('reasons', args.reason_labels)
+        return jobs
+
+    if not args.start_date:
+        return []
+
+    start = datetime.strptime(args.start_date, '%d.%m.%Y')
+    end = datetime.strptime(args.end_date, '%d.%m.%Y') if args.end_date else start
+    if end < start:
+        raise ValueError(f"Дата окончания {args.end_date} раньше даты начала {args.start_date}")
+
+    shard = args.shard or ('day' if args.daily else None)
+    if not shard:
+        return [{
+            'start_date': start.strftime('%d.%m.%Y'),
+            'end_date': end.strftime('%d.%m.%Y'),
+            'reasons': args.reason_labels,
+        }]
+
+    return shard_jobs(start, end, shard, args.reason_labels)
+
+
+def open_report_session(session_number, args):
+    """
+    Открывает отдельную сессию браузера с формой отчета для пакетного режима.
+
+    Args:
+        session_number: Номер сессии (своя папка загрузок downloads/session_<N>)
+        args: Аргументы командной строки
+
+    Returns:
+        tuple: (WebDriver, папка загрузок сессии)
+    """
+    download_dir = Path(__file__).resolve().parent / "downloads" / f"session_{session_number}"
+    download_dir.mkdir(parents=True, exist_ok=True)
+
+    driver = get_driver(headless=args.headless)
+    try:
+        apply_cdp_download_settings(driver, download_dir)
+        if not open_new_site(driver, NEW_SITE_URL, logger):
+            raise RuntimeError("не удалось открыть сайт")
+    except Exception:
+        driver.quit()
+        raise
+    return driver, download_dir
+
+
 def open_new_site(driver, url, logger):
     """
     Открывает новый сайт.
@@ -127,6 +263,11 @@ def main():
     """Основная функция."""
     # Парсим аргументы
     args = parse_arguments()
+    try:
+        jobs = build_jobs(args)
+    except Exception as e:
+        logger.error(f"❌ Некорректные параметры пакетного режима: {e}")
+        return 1
 
     # Настраиваем логирование
     logger.info("🚀 Запуск скрипта для работы с новым сайтом отчетов")
@@ -143,6 +284,28 @@ def main():
     setup_proxy()
     logger.info("✅ Прокси настроен")
 
+    if jobs:
+        # Пакетный режим: задания (шарды) в своих сессиях браузера, без ожидания пользователя
+        logger.info(f"📦 Пакетный режим: {len(jobs)} заданий")
+        try:
+            results = run_sharded_jobs(
+                jobs,
+                open_session=lambda session_number: open_report_session(session_number, args),
+                workers=args.workers,
+                retries=args.retries,
+                output_dir=args.output_dir,
+                wait_time=args.wait_time,
+                db_path=Path(args.reasons_db)
+            )
+        except KeyboardInterrupt:
+            logger.info("🛑 Получен сигнал прерывания (Ctrl+C)")
+            return 0
+
+        if not all(result['success'] for result in results):
+            return 1
+        logger.info("✅ Скрипт завершен успешно")
+        return 0
+
     # Создаем WebDriver
     try:
         driver = get_driver(headless=args.headless)
@@ -179,8 +342,12 @@ def main():
                 if success:
                     logger.info("🎉 Отчет успешно обработан и экспортирован в Excel")
 
-                    # Здесь можно добавить дальнейшую обработку файла
-                    # Например, загрузку в базу данных, анализ данных и т.д.
+                    # Разбираем выгрузку потоково в компактную таблицу (номер массовой по обращению)
+                    if report_handler.last_export_path:
+                        try:
+                            parse_reasons_report(report_handler.last_export_path, Path(args.reasons_db))
+                        except Exception as e:
+                            logger.error(f"❌ Ошибка разбора отчета по причинам обращений: {e}")
 
                 else:
                     logger.error("❌ Не удалось обработать отчет")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+python replay_session.py — запись реальной сессии Teleopti и ее воспроизведение без сети.
+
+ЗАПИСЬ (нужен доступ к Teleopti): несколько вызовов download_report через записывающий
+прокси; в кассету попадают страницы формы, postback'и и xlsx, в calls.json - вызовы и
+посчитанные метрики (эталон для сравнения):
+    python replay_session.py record --cassette cassettes/august --calls calls.json --no-headless
+calls.json - список {"region_ids": ["..."], "start": "01.08.2025 10:00", "end": "01.08.2025 12:30",
+"intervals": ["10:00", "12:30"]} ("intervals" необязательно).
+
+ВОСПРОИЗВЕДЕНИЕ на любой машине (бенчмарк и регрессия формы, экспорта и разбора):
+    python replay_session.py bench --cassette cassettes/august --repeat 3
+Код возврата 1, если метрики разошлись с эталоном или запросы не нашлись в кассете.
+
+Сервер кассеты для ручной отладки (main.py запускается с WFM_REPORT_URL=http://127.0.0.1:8765):
+    python replay_session.py serve --cassette cassettes/august
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+
+
+# Константы
+DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+DEFAULT_PORT = 8765
+
+
+def parse_arguments():
+    """
+    Парсит аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Парсированные аргументы
+    """
+    parser = argparse.ArgumentParser(description="Запись и воспроизведение сессии Teleopti")
+    parser.add_argument("mode", choices=["record", "serve", "bench"], help="Режим работы")
+    parser.add_argument("--cassette", required=True, help="Папка кассеты")
+    parser.add_argument("--calls", help="JSON с вызовами download_report (режим record)", default=None)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Порт прокси/сервера на localhost")
+    parser.add_argument("--upstream", default=None, help="Адрес сервера Teleopti (по умолчанию - из адреса отчета)")
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз прогнать вызовы (режим bench)")
+    parser.add_argument("--strict", action="store_true", help="Отдавать только записи с полным совпадением полей")
+    parser.add_argument("--latency", action="store_true", help="Выдерживать записанное время ответов сервера")
+    parser.add_argument("--no-headless", action="store_true", help="Запуск с видимым браузером")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    return parser.parse_args()
+
+
+def load_calls(path: Path):
+    """
+    Читает вызовы download_report.
+
+    Args:
+        path: calls.json
+
+    Returns:
+        List[Dict[str, Any]]: Вызовы {"region_ids", "start", "end", "intervals"[, "lost", "excess"]}
+    """
+    calls = json.loads(Path(path).read_text(encoding="utf-8"))
+    for call in calls:
+        datetime.strptime(call["start"], DATETIME_FORMAT)
+        datetime.strptime(call["end"], DATETIME_FORMAT)
+    return calls
+
+
+def run_calls(calls, headless: bool, repeat: int = 1):
+    """
+    Выполняет вызовы download_report + calc_metrics_detailed в одном браузере.
+
+    Args:
+        calls: Вызовы из calls.json
+        headless: Запуск в headless режиме
+        repeat: Количество прогонов
+
+    Returns:
+        List[Dict[str, Any]]: Результаты {"call", "lost", "excess", "download_s", "parse_s", "error"}
+    """
+    from modules.selenium_helpers import get_driver, apply_cdp_download_settings
+    from modules.download_manager import download_report
+    from modules.data_processing import calc_metrics_detailed
+
+    driver = get_driver(headless=headless)
+    apply_cdp_download_settings(driver)
+    results = []
+    try:
+        for run in range(1, repeat + 1):
+            for call in calls:
+                result = {"call": call, "run": run, "lost": None, "excess": None, "error": None}
+                try:
+                    started = time.perf_counter()
+                    xlsx_path = download_report(
+                        driver, call["region_ids"],
+                        datetime.strptime(call["start"], DATETIME_FORMAT),
+                        datetime.strptime(call["end"], DATETIME_FORMAT),
+                        intervals=tuple(call["intervals"]) if call.get("intervals") else None,
+                    )
+                    result["download_s"] = round(time.perf_counter() - started, 3)
+                    started = time.perf_counter()
+                    result["lost"], result["excess"], _ = calc_metrics_detailed(xlsx_path)
+                    result["parse_s"] = round(time.perf_counter() - started, 3)
+                except Exception as e:
+                    logger.error(f"❌ Вызов {call['start']} - {call['end']}: {e}")
+                    result["error"] = str(e)
+                results.append(result)
+    finally:
+        driver.quit()
+    return results
+
+
+def record(args) -> int:
+    """Записывает кассету: вызовы из --calls через записывающий прокси."""
+    from modules.selenium_helpers import DEFAULT_REPORT_URL, setup_proxy
+    from modules.session_replay import Cassette, RecordingProxy, origin_of
+
+    if not args.calls:
+        logger.error("❌ Для записи нужен --calls")
+        return 1
+    cassette_dir = Path(args.cassette)
+    if (cassette_dir / "exchanges.jsonl").exists():
+        logger.error(f"❌ Кассета {cassette_dir} уже записана - укажите новую папку")
+        return 1
+
+    calls = load_calls(Path(args.calls))
+    setup_proxy()
+    proxy = RecordingProxy(Cassette(cassette_dir), args.upstream or origin_of(DEFAULT_REPORT_URL), port=args.port).start()
+    logger.info(f"📼 Запись: {proxy.base_url} → {proxy.upstream}, вызовов: {len(calls)}")
+    try:
+        results = run_calls(calls, headless=not args.no_headless)
+    finally:
+        proxy.stop()
+
+    recorded = []
+    for result in results:
+        if result["error"] is None:
+            recorded.append(dict(result["call"], lost=result["lost"], excess=result["excess"]))
+    (cassette_dir / "calls.json").write_text(json.dumps(recorded, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"✅ Записано обменов: {len(proxy.cassette.exchanges)}, вызовов с эталоном: {len(recorded)}/{len(calls)}")
+    return 0 if len(recorded) == len(calls) else 1
+
+
+def serve(args) -> int:
+    """Отдает кассету до Ctrl+C."""
+    from modules.session_replay import Cassette, ReplayServer
+
+    server = ReplayServer(Cassette(Path(args.cassette)), port=args.port,
+                          strict=args.strict, latency=args.latency).start()
+    logger.info(f"▶️ Кассета {args.cassette}: WFM_REPORT_URL={server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+def bench(args) -> int:
+    """Прогоняет записанные вызовы против кассеты и сравнивает метрики с эталоном."""
+    from modules.session_replay import Cassette, ReplayServer
+
+    cassette_dir = Path(args.cassette)
+    calls = load_calls(cassette_dir / "calls.json")
+    cassette = Cassette(cassette_dir)
+
+    server = ReplayServer(cassette, port=args.port, strict=args.strict, latency=args.latency).start()
+    logger.info(f"▶️ Воспроизведение {cassette_dir}: обменов {len(cassette.exchanges)}, вызовов {len(calls)} × {args.repeat}")
+    try:
+        results = run_calls(calls, headless=not args.no_headless, repeat=args.repeat)
+    finally:
+        server.stop()
+
+    failures = 0
+    for result in results:
+        call = result["call"]
+        ok = result["error"] is None and result["lost"] == call["lost"] and result["excess"] == call["excess"]
+        failures += not ok
+        timing = (f"выгрузка {result['download_s']:.2f}с, разбор {result['parse_s']:.2f}с"
+                  if result["error"] is None else result["error"])
+        logger.info(f"{'✅' if ok else '❌'} #{result['run']} {call['start']} - {call['end']}: "
+                    f"lost={result['lost']} (эталон {call['lost']}), excess={result['excess']} "
+                    f"(эталон {call['excess']}); {timing}")
+
+    timed = [r for r in results if r["error"] is None]
+    if timed:
+        logger.info(f"⏱️ В среднем: выгрузка {sum(r['download_s'] for r in timed) / len(timed):.2f}с, "
+                    f"разбор {sum(r['parse_s'] for r in timed) / len(timed):.3f}с")
+    if server.unmatched or server.mismatched:
+        logger.warning(f"⚠️ Запросов без записи: {len(server.unmatched)}, с неполным совпадением: {len(server.mismatched)}")
+    return 1 if failures or server.unmatched else 0
+
+
+def main() -> int:
+    """Основная функция."""
+    args = parse_arguments()
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    # Адрес отчета читается при импорте modules - подменяем его до импорта
+    os.environ["WFM_REPORT_URL"] = f"http://127.0.0.1:{args.port}"
+
+    # Отчеты должны идти через форму, а не из архива: иначе запись пропустит обмены,
+    # а воспроизведение не проверит форму
+    from modules.report_archive import configure_report_archive
+    configure_report_archive(enabled=False)
+    return {"record": record, "serve": serve, "bench": bench}[args.mode](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Проверки пакетной записи результатов в лист "Отчет"."""
+
+from datetime import date
+
+from openpyxl import Workbook, load_workbook
+
+from modules.excel_manager import save_results_batch_to_original_file
+
+
+def write_svod(path, rows) -> None:
+    """Пишет лист "Отчет" со строками (Номер массовой, ДатаБезВремени)."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Отчет"
+    sheet.append(["Номер массовой", "ДатаБезВремени", "Потерянные", "Превышение"])
+    for mass_number, day in rows:
+        sheet.append([mass_number, day, None, None])
+    workbook.save(path)
+
+
+def lost_column(path):
+    sheet = load_workbook(path)["Отчет"]
+    return [sheet.cell(row=row, column=3).value for row in range(2, sheet.max_row + 1)]
+
+
+def test_changed_workbook_matches_row_by_mass_number_and_date(tmp_path):
+    svod = tmp_path / "svod.xlsx"
+    # Книга изменилась после чтения: строки сдвинулись, массовая 1000 есть за две даты
+    write_svod(svod, [("999", "31.08.2025"), ("1000", "01.09.2025"), ("1000", "02.09.2025")])
+
+    written = save_results_batch_to_original_file([
+        {"row_index": 0, "mass_number": "1000", "date": date(2025, 9, 2), "lost": 20, "excess": 0.2},
+        {"row_index": 5, "mass_number": "1000", "date": date(2025, 9, 1), "lost": 10, "excess": 0.1},
+    ], svod)
+
+    assert written == 2
+    assert lost_column(svod) == [None, 10, 20]
+
+
+def test_ambiguous_row_is_skipped(tmp_path):
+    svod = tmp_path / "svod.xlsx"
+    write_svod(svod, [("999", "31.08.2025"), ("1000", "01.09.2025"), ("1000", "01.09.2025")])
+
+    written = save_results_batch_to_original_file([
+        {"row_index": 0, "mass_number": "1000", "date": date(2025, 9, 1), "lost": 10, "excess": 0.1},
+    ], svod)
+
+    assert written == 0
+    assert lost_column(svod) == [None, None, None]
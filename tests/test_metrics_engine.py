@@ -0,0 +1,80 @@
+"""Проверки расчета окон по интервалам: совпадение с calc_metrics_detailed, покрытие окна, текущий день."""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from modules.data_processing import calc_metrics_detailed
+from modules.metrics_engine import DayMetrics, MetricsEngine, window_quarters
+from modules.results_store import ResultsStore
+
+HEADERS = ["Период", "Расчетные звонки", "Спрогнозированные звонки", "Отвеченные звонки"]
+
+
+def day_rows(seed: int = 1) -> pd.DataFrame:
+    """Детализация дня региона: 96 четвертей со случайными звонками."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "period": [f"{q // 4:02d}:{q % 4 * 15:02d}" for q in range(96)],
+        "calc": rng.integers(0, 120, 96).astype(float),
+        "fcst": rng.integers(1, 100, 96).astype(float),
+        "answ": rng.integers(0, 110, 96).astype(float),
+    })
+
+
+def write_report(path, rows: pd.DataFrame) -> None:
+    """Пишет отчет как у Teleopti: данные на 2-м листе, заголовки на 5-й строке, строка "Итого:"."""
+    workbook = Workbook()
+    sheet = workbook.create_sheet("Данные")
+    for column, header in enumerate(HEADERS, start=1):
+        sheet.cell(row=5, column=column, value=header)
+    for number, row in enumerate(rows.itertuples(index=False), start=6):
+        for column, value in enumerate((row.period, row.calc, row.fcst, row.answ), start=1):
+            sheet.cell(row=number, column=column, value=value)
+    total_row = 6 + len(rows)
+    sheet.cell(row=total_row, column=1, value="Итого:")
+    for column, name in enumerate(("calc", "fcst", "answ"), start=2):
+        sheet.cell(row=total_row, column=column, value=float(rows[name].sum()))
+    workbook.save(path)
+
+
+def test_window_matches_report_of_same_rows(tmp_path):
+    day = day_rows()
+    metrics = DayMetrics.from_intervals(day)
+
+    for interval_from, interval_to in [("10:00", "12:30"), ("00:00", "01:00"), ("23:15", "00:00"), ("07:45", "08:00")]:
+        start, end = window_quarters(interval_from, interval_to)
+        # Отчет за окно содержит четверти от "Интервал от" до "Интервал до" (исключительно)
+        report = tmp_path / f"report_{start}_{end}.xlsx"
+        write_report(report, day.iloc[start:end])
+        lost, excess, _ = calc_metrics_detailed(report)
+
+        assert metrics.window(start, end) == (lost, excess), (interval_from, interval_to)
+
+
+def test_window_not_fully_covered_is_not_answered():
+    day = day_rows().drop(index=[41])  # нет четверти 10:15
+    engine = MetricsEngine()
+    engine.add_day("Москва", date(2025, 9, 1), day)
+
+    def task(interval_from, interval_to):
+        return {"region": "Москва", "win_start": datetime(2025, 9, 1, 8, 0),
+                "interval_from": interval_from, "interval_to": interval_to}
+
+    answers = engine.evaluate_tasks([task("10:00", "11:00"), task("11:00", "12:00"), task("09:00", "10:15")])
+    assert answers[0] is None
+    assert answers[1] is not None
+    assert answers[2] is not None
+
+
+def test_from_store_skips_current_day(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    today = datetime.combine(date.today(), datetime.min.time())
+    for day in (today, today - timedelta(days=1)):
+        store.upsert("1000", day, day + timedelta(hours=23, minutes=45), 0, 0.0, region="Москва",
+                     intervals=day_rows().assign(lost=0.0))
+
+    engine = MetricsEngine.from_store(store, [today.date() - timedelta(days=1), today.date()])
+    assert list(engine.days) == [("Москва", today.date() - timedelta(days=1))]
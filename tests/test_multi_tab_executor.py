@@ -0,0 +1,128 @@
+"""Проверки многовкладочной выгрузки: скачивания относятся к вкладкам по событиям браузера."""
+
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from modules import multi_tab_executor
+from modules.data_processing import calc_metrics_detailed
+from modules.multi_tab_executor import FORM_SCRIPT, MultiTabExecutor
+
+HEADERS = ["Период", "Расчетные звонки", "Спрогнозированные звонки", "Отвеченные звонки"]
+
+
+def write_report(path, calc: float) -> None:
+    """Пишет отчет как у Teleopti (2-й лист, заголовки на 5-й строке) с четвертями по calc звонков."""
+    workbook = Workbook()
+    sheet = workbook.create_sheet("Данные")
+    for column, header in enumerate(HEADERS, start=1):
+        sheet.cell(row=5, column=column, value=header)
+    rows = [("10:00", calc, 50.0, 40.0), ("10:15", calc, 50.0, 45.0)]
+    for number, row in enumerate(rows, start=6):
+        for column, value in enumerate(row, start=1):
+            sheet.cell(row=number, column=column, value=value)
+    total = ("Итого:", calc * 2, 100.0, 85.0)
+    for column, value in enumerate(total, start=1):
+        sheet.cell(row=6 + len(rows), column=column, value=value)
+    workbook.save(path)
+
+
+class FakeCdpClient:
+    """Браузер с общей папкой загрузок: Excel скачивается из iframe, вторая вкладка заканчивает первой."""
+
+    def __init__(self, ws_url):
+        self.listeners = []
+        self.download_path = None
+        self.tabs = 0
+        self.workload = {}
+        self.pending = []
+
+    async def connect(self):
+        return self
+
+    async def close(self):
+        await asyncio.gather(*self.pending)
+
+    def add_listener(self, method, callback, session_id=None):
+        listener = {"method": method, "callback": callback, "session_id": session_id}
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, method, params, session_id=None):
+        for listener in list(self.listeners):
+            if listener["method"] == method and listener["session_id"] in (None, session_id):
+                listener["callback"](params)
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        if method == "Browser.setDownloadBehavior" and params["behavior"] == "allowAndName":
+            self.download_path = Path(params["downloadPath"])
+        return {}
+
+    async def create_tab(self, url="about:blank", isolated_context=True):
+        self.tabs += 1
+        return {"target_id": f"target-{self.tabs}", "session_id": f"session-{self.tabs}", "context_id": None}
+
+    async def close_tab(self, tab):
+        pass
+
+    async def evaluate(self, expression, session_id, timeout=60):
+        action, arg = json.loads("[" + expression[len(FORM_SCRIPT) + 1:-1] + "]")
+        if action == "ready":
+            return True
+        if action == "select_interval":
+            return arg["variants"][0]
+        if action == "clear_workload":
+            return False
+        if action == "add_workload":
+            self.workload[session_id] = arg["ids"]
+            return arg["ids"]
+        if action == "click_excel":
+            self.start_download(session_id)
+            return True
+        return None
+
+    def start_download(self, session_id):
+        number = session_id.split("-")[1]
+        guid = f"guid-{number}"
+        # Файл именуется guid в общей папке, кнопка Excel находится во фрейме вкладки
+        write_report(self.download_path / guid, calc=float(self.workload[session_id][0]))
+        self.emit("Page.frameAttached", {"frameId": f"frame-{number}"}, session_id)
+        self.emit("Browser.downloadWillBegin", {"frameId": f"frame-{number}", "guid": guid,
+                                                "suggestedFilename": "report.xlsx"})
+
+        async def complete():
+            await asyncio.sleep(0.3 if number == "1" else 0.05)
+            self.emit("Browser.downloadProgress", {"guid": guid, "state": "completed"})
+        self.pending.append(asyncio.ensure_future(complete()))
+
+
+def test_two_tabs_get_their_own_downloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(multi_tab_executor, "CdpClient", FakeCdpClient)
+    monkeypatch.setattr(multi_tab_executor, "get_browser_ws_url", lambda driver: "ws://fake")
+    monkeypatch.setattr(multi_tab_executor, "get_report_archive", lambda: None)
+
+    def task(mass_number, workload):
+        return {"mass_number": mass_number, "region": "Москва", "workload_params": [workload],
+                "win_start": datetime(2025, 9, 1, 10, 0), "win_end": datetime(2025, 9, 1, 10, 30),
+                "interval_from": "10:00", "interval_to": "10:30"}
+
+    executor = MultiTabExecutor(None, tabs=2, download_root=tmp_path)
+    results = asyncio.run(executor.run([task("1000", "60"), task("1001", "90")]))
+
+    expected = {}
+    for mass_number, calc in (("1000", 60.0), ("1001", 90.0)):
+        write_report(tmp_path / f"expected_{mass_number}.xlsx", calc)
+        expected[mass_number] = calc_metrics_detailed(tmp_path / f"expected_{mass_number}.xlsx")[:2]
+
+    assert expected["1000"] != expected["1001"]
+    assert all(r["error"] is None for r in results)
+    # Вторая вкладка скачала файл раньше, но каждая задача получила свой отчет
+    assert [r["task"]["mass_number"] for r in results] == ["1001", "1000"]
+    assert {r["task"]["mass_number"]: (r["lost"], r["excess"]) for r in results} == expected
+    assert sorted(p.parent.name for p in tmp_path.glob("tab_*/*.xlsx")) == ["tab_1", "tab_2"]
@@ -0,0 +1,64 @@
+"""Проверки режима службы: пакетная запись, хранилище результатов, кэш окон."""
+
+from openpyxl import Workbook, load_workbook
+
+from modules import excel_manager, task_executor, watch_service
+from modules.results_store import ResultsStore
+from modules.run_profile import RunProfile
+from modules.watch_service import WatchService
+
+CFG = {"regions": {"Москва": ["1"], "Казань": ["2"]}}
+
+
+def write_svod(path, rows) -> None:
+    """Пишет лист "Отчет" со строками (Номер массовой, Регион, Старт, Окончание, ДатаБезВремени)."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Отчет"
+    sheet.append(["Номер массовой", "Регион", "Старт", "Окончание", "ДатаБезВремени"])
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def test_rows_are_written_in_one_batch_and_stored(tmp_path, monkeypatch):
+    downloads = []
+
+    def run_report_task(session, profile, workload_params, win_start, win_end, store=None, mass_number=None,
+                        region=None, intervals=None):
+        downloads.append((tuple(workload_params), win_start, win_end))
+        if store is not None:
+            store.upsert(mass_number, win_start, win_end, 10, 0.25, region=region)
+        return 10, 0.25
+
+    saves = []
+
+    def save_batch(results, path):
+        saves.append(len(results))
+        return excel_manager.save_results_batch_to_original_file(results, path)
+
+    monkeypatch.setattr(task_executor, "run_report_task", run_report_task)
+    monkeypatch.setattr(watch_service, "save_results_batch_to_original_file", save_batch)
+    monkeypatch.setattr(watch_service, "post_process_excel_file", lambda path: None)
+
+    svod = tmp_path / "svod.xlsx"
+    write_svod(svod, [
+        ("1000", "Москва", "01.09.2025 10:00", "01.09.2025 12:00", "01.09.2025"),
+        ("1001", "Москва", "01.09.2025 10:00", "01.09.2025 12:00", "01.09.2025"),
+        ("1002", "Казань", "02.09.2025 08:00", "02.09.2025 09:00", "02.09.2025"),
+        ("1003", "Неизвестный", "02.09.2025 08:00", "02.09.2025 09:00", "02.09.2025"),
+    ])
+    store = ResultsStore(tmp_path / "results.sqlite")
+    profile = RunProfile(runs_dir=tmp_path / "runs")
+    service = WatchService(None, profile, CFG, svod, state_path=tmp_path / "state.json", store=store)
+
+    assert service.process_workbook(svod) == 3
+    # Одинаковое окно двух строк выгружено один раз, книга записана одной пачкой
+    assert len(downloads) == 2
+    assert saves == [3]
+    assert sorted(store.query()["mass_number"]) == ["1000", "1001", "1002"]
+
+    sheet = load_workbook(svod)["Отчет"]
+    header = [cell.value for cell in sheet[1]]
+    lost = header.index("Потерянные") + 1
+    assert [sheet.cell(row=row, column=lost).value for row in range(2, 6)] == [10, 10, 10, None]
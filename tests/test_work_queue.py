@@ -0,0 +1,102 @@
+"""Проверки общей очереди задач: координатор и воркер, истекшая аренда, брошенные запуски."""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from modules import work_queue
+from modules.work_queue import (
+    InMemoryWorkQueue,
+    SqliteWorkQueue,
+    STATUS_DONE,
+    STATUS_FAILED,
+    run_coordinator,
+    run_worker,
+)
+
+
+def make_task(row_index: int) -> dict:
+    """Задача task_planner на окно 10:00-12:00 с номером массовой по индексу строки."""
+    return {
+        "row_index": row_index,
+        "mass_number": str(1000 + row_index),
+        "region": "Москва",
+        "workload_params": ["1"],
+        "win_start": datetime(2025, 9, 1, 10, 0),
+        "win_end": datetime(2025, 9, 1, 12, 0),
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_queue(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == "memory":
+            return InMemoryWorkQueue(**kwargs)
+        return SqliteWorkQueue(tmp_path / "queue.sqlite", **kwargs)
+    return factory
+
+
+@pytest.fixture
+def fake_report(monkeypatch):
+    """Подменяет выгрузку отчета: lost = 7, excess = 0.5."""
+    def run_report_task(session, profile, workload_params, win_start, win_end, intervals=None):
+        return 7, 0.5
+    monkeypatch.setattr(work_queue, "run_report_task", run_report_task)
+
+
+def test_coordinator_worker_round_trip(make_queue, fake_report):
+    queue = make_queue()
+    tasks = [make_task(i) for i in range(3)]
+    collected = []
+    outcome = {}
+
+    coordinator = threading.Thread(target=lambda: outcome.update(
+        run_coordinator(queue, "run-1", tasks, collected.extend, poll_interval=0.01)
+    ))
+    coordinator.start()
+    deadline = time.monotonic() + 5
+    while queue.current_run() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    done = run_worker(queue, None, None, worker_id="w1", idle_exit_seconds=0.05, poll_interval=0.01)
+    coordinator.join(timeout=5)
+
+    assert done == 3
+    assert outcome[STATUS_DONE] == 3
+    assert sorted(r["task"]["row_index"] for r in collected) == [0, 1, 2]
+    assert all(r["lost"] == 7 and r["error"] is None for r in collected)
+    # Завершенный запуск закрыт - воркерам больше нечего брать
+    assert queue.current_run() is None
+
+
+def test_expired_lease_is_recovered(make_queue):
+    queue = make_queue(lease_seconds=0.05)
+    queue.put_tasks("run-1", [make_task(0)])
+
+    dead = queue.lease("dead-worker", "run-1")
+    assert queue.lease("w2", "run-1") is None
+
+    time.sleep(0.1)
+    recovered = queue.lease("w2", "run-1")
+    assert recovered["id"] == dead["id"]
+
+    # Результат воркера, потерявшего аренду, отбрасывается
+    assert queue.complete(dead["id"], "dead-worker", 1, 1.0) is False
+    assert queue.complete(recovered["id"], "w2", 5, 0.5) is True
+    assert [r["lost"] for r in queue.collect("run-1")] == [5]
+
+
+def test_new_run_cancels_abandoned_run(make_queue):
+    queue = make_queue()
+    queue.put_tasks("old", [make_task(0), make_task(1)])
+    queue.put_tasks("new", [make_task(2)])
+
+    assert queue.current_run() == "new"
+    assert queue.counts("old")[STATUS_FAILED] == 2
+    assert not queue.has_open_tasks("old")
+
+    leased = queue.lease("w1", queue.current_run())
+    assert leased["run_id"] == "new"
+    assert queue.lease("w1", queue.current_run()) is None